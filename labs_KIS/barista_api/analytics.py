@@ -0,0 +1,200 @@
+from datetime import date
+from typing import Optional
+import os
+
+from sqlalchemy import case, func, select, true
+from sqlalchemy.orm import Session
+import logging
+
+import models
+
+logger = logging.getLogger("coffee_business_api")
+
+# Аналитика закупок читается из сводки purchase_daily_totals (rollups.py):
+# GROUP BY выполняется по дневным итогам, а не по всей истории закупок
+
+PERIOD_COLUMNS = {
+    'day': models.PurchaseDailyTotal.day,
+    'week': models.PurchaseDailyTotal.week_start,
+    'month': models.PurchaseDailyTotal.month_start,
+}
+
+
+def _totals():
+    return (func.sum(models.PurchaseDailyTotal.total_amount).label('total_amount'),
+            func.sum(models.PurchaseDailyTotal.purchases_count).label('purchases_count'))
+
+
+def _in_range(query, date_from: Optional[date], date_to: Optional[date]):
+    if date_from is not None:
+        query = query.where(models.PurchaseDailyTotal.day >= date_from)
+    if date_to is not None:
+        query = query.where(models.PurchaseDailyTotal.day <= date_to)
+    return query
+
+
+def get_spend_by_period(db: Session, period: str, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    logger.info("Расходы на закупки по периодам: %s, с %s по %s", period, date_from, date_to)
+    column = PERIOD_COLUMNS[period]
+    query = select(column.label('period_start'), *_totals()).group_by(column).order_by(column)
+    return db.execute(_in_range(query, date_from, date_to)).all()
+
+
+def _spend_by_group(db: Session, key_column, name_column, join_model, date_from: Optional[date],
+                    date_to: Optional[date], limit: int):
+    totals = _totals()
+    query = select(key_column.label('key'), *totals)
+    group = [key_column]
+    if join_model is not None:
+        query = query.add_columns(name_column.label('name')).outerjoin(join_model, join_model.id == key_column)
+        group.append(name_column)
+    query = query.group_by(*group).order_by(totals[0].desc(), key_column).limit(limit)
+    return db.execute(_in_range(query, date_from, date_to)).all()
+
+
+def get_spend_by_supplier(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                          limit: int = 100):
+    logger.info("Расходы на закупки по поставщикам, с %s по %s", date_from, date_to)
+    return _spend_by_group(db, models.PurchaseDailyTotal.supplier, None, None, date_from, date_to, limit)
+
+
+def get_spend_by_coffee_type(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                             limit: int = 100):
+    logger.info("Расходы на закупки по типам кофе, с %s по %s", date_from, date_to)
+    return _spend_by_group(db, models.PurchaseDailyTotal.coffee_product_type_id, models.CoffeeProductType.name,
+                           models.CoffeeProductType, date_from, date_to, limit)
+
+
+def get_spend_by_employee(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                          limit: int = 100):
+    logger.info("Расходы на закупки по сотрудникам, с %s по %s", date_from, date_to)
+    return _spend_by_group(db, models.PurchaseDailyTotal.employee_id, models.Employee.full_name,
+                           models.Employee, date_from, date_to, limit)
+
+
+# Метрики заявок на обслуживание читаются из сводок service_request_status_totals
+# и service_request_monthly_totals: объем чтения зависит от числа рабочих мест и статусов,
+# а не от числа заявок
+
+# Статусы закрытых заявок (через запятую); заявки в остальных статусах считаются открытыми
+SERVICE_REQUEST_CLOSED_STATUSES = [
+    status_id.strip() for status_id in os.getenv('SERVICE_REQUEST_CLOSED_STATUSES', '').split(',') if status_id.strip()
+]
+
+
+def check_closed_statuses():
+    # Без списка закрытых статусов открытыми считаются все заявки: число открытых заявок,
+    # самая ранняя и средний возраст открытых совпадают с итогами по всем заявкам
+    if not SERVICE_REQUEST_CLOSED_STATUSES:
+        logger.warning("Не задан SERVICE_REQUEST_CLOSED_STATUSES: все заявки на обслуживание считаются открытыми")
+
+
+def _is_open(status_column):
+    if not SERVICE_REQUEST_CLOSED_STATUSES:
+        return true()
+    return status_column.notin_(SERVICE_REQUEST_CLOSED_STATUSES)
+
+
+def _average_age(days_sum, count, today: date) -> Optional[float]:
+    # Средний возраст в днях по сумме порядковых номеров дат
+    if not count:
+        return None
+    return round(today.toordinal() - float(days_sum) / count, 1)
+
+
+def get_workplace_request_metrics(db: Session, min_open_requests: int = 0, skip: int = 0, limit: int = 100):
+    logger.info("Метрики заявок по рабочим местам, открытых не менее %s", min_open_requests)
+    totals = models.ServiceRequestStatusTotal
+    workplace = models.Workplace
+    is_open = _is_open(totals.status_id)
+    open_requests = func.coalesce(func.sum(case((is_open, totals.requests_count), else_=0)), 0)
+    query = (
+        select(workplace.id, workplace.location, workplace.equipment_status_id,
+               func.coalesce(func.sum(totals.requests_count), 0),
+               open_requests,
+               func.min(case((is_open, totals.oldest_request_date))),
+               func.sum(case((is_open, totals.request_days_sum), else_=0)))
+        .outerjoin(totals, totals.workplace_id == workplace.id)
+        .group_by(workplace.id, workplace.location, workplace.equipment_status_id)
+        .order_by(open_requests.desc(), workplace.id)
+        .offset(skip).limit(limit)
+    )
+    if min_open_requests > 0:
+        query = query.having(open_requests >= min_open_requests)
+
+    today = date.today()
+    return [
+        {
+            'workplace_id': workplace_id,
+            'location': location,
+            'equipment_status_id': equipment_status_id,
+            'total_requests': total_requests,
+            'open_requests': open_count,
+            'oldest_open_request_date': oldest_open,
+            'average_open_age_days': _average_age(open_days_sum, open_count, today),
+        }
+        for workplace_id, location, equipment_status_id, total_requests, open_count, oldest_open, open_days_sum
+        in db.execute(query)
+    ]
+
+
+def get_status_request_metrics(db: Session):
+    logger.info("Метрики заявок по статусам")
+    totals = models.ServiceRequestStatusTotal
+    status = models.EquipmentServiceStatus
+    query = (
+        select(totals.status_id, status.name, func.sum(totals.requests_count),
+               func.min(totals.oldest_request_date), func.sum(totals.request_days_sum))
+        .outerjoin(status, status.id == totals.status_id)
+        .group_by(totals.status_id, status.name)
+        .order_by(totals.status_id)
+    )
+    today = date.today()
+    return [
+        {
+            'status_id': status_id,
+            'name': name,
+            'is_open': status_id not in SERVICE_REQUEST_CLOSED_STATUSES,
+            'requests_count': requests_count,
+            'oldest_request_date': oldest,
+            'average_age_days': _average_age(days_sum, requests_count, today),
+        }
+        for status_id, name, requests_count, oldest, days_sum in db.execute(query)
+    ]
+
+
+def get_workplaces_by_monthly_requests(db: Session, month_start: date, min_requests: int = 0, limit: int = 100):
+    logger.info("Рабочие места с числом заявок за %s больше %s", f"{month_start:%m.%Y}", min_requests)
+    monthly = models.ServiceRequestMonthlyTotal
+    query = (
+        select(monthly.workplace_id, models.Workplace.location, monthly.month_start, monthly.requests_count)
+        .outerjoin(models.Workplace, models.Workplace.id == monthly.workplace_id)
+        .where(monthly.month_start == month_start, monthly.requests_count > min_requests)
+        .order_by(monthly.requests_count.desc(), monthly.workplace_id)
+        .limit(limit)
+    )
+    return db.execute(query).mappings().all()
+
+
+def get_equipment_health(db: Session):
+    logger.info("Состояние оборудования рабочих мест")
+    totals = models.ServiceRequestStatusTotal
+    open_by_workplace = (
+        select(totals.workplace_id,
+               func.sum(case((_is_open(totals.status_id), totals.requests_count), else_=0)).label('open_requests'))
+        .group_by(totals.workplace_id)
+        .subquery()
+    )
+    open_requests = func.coalesce(open_by_workplace.c.open_requests, 0)
+    status = models.EquipmentServiceStatus
+    query = (
+        select(status.id.label('equipment_status_id'), status.name,
+               func.count(models.Workplace.id).label('workplaces_count'),
+               func.coalesce(func.sum(case((open_requests > 0, 1), else_=0)), 0).label('workplaces_with_open_requests'),
+               func.coalesce(func.sum(open_requests), 0).label('open_requests'))
+        .outerjoin(models.Workplace, models.Workplace.equipment_status_id == status.id)
+        .outerjoin(open_by_workplace, open_by_workplace.c.workplace_id == models.Workplace.id)
+        .group_by(status.id, status.name)
+        .order_by(status.id)
+    )
+    return db.execute(query).mappings().all()
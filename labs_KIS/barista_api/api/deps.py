@@ -0,0 +1,94 @@
+import hashlib
+from datetime import date, datetime, time, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from sqlalchemy.orm import Session
+from typing import Callable, Coroutine, Any, Iterator, Optional
+
+import change_tracking
+from database import SessionLocal
+
+
+def get_db(request: Request) -> Iterator[Session]:
+    # Одна сессия на запрос; фиксацию выполняет UnitOfWorkRoute
+    db = SessionLocal()
+    request.state.db = db
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class UnitOfWorkRoute(APIRoute):
+    # Фиксирует транзакцию сессии запроса один раз, после успешного выполнения
+    # обработчика и до отправки ответа. Функции crud только выполняют flush,
+    # поэтому несколько операций записи в одном запросе попадают в одну транзакцию
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        route_handler = super().get_route_handler()
+
+        async def unit_of_work_handler(request: Request) -> Response:
+            response = await route_handler(request)
+            db = getattr(request.state, "db", None)
+            if db is not None and response.status_code < 400 and (
+                    db.new or db.dirty or db.deleted or change_tracking.has_changes(db)):
+                await run_in_threadpool(db.commit)
+            return response
+
+        return unit_of_work_handler
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def _not_modified_since(if_modified_since: Optional[str], modified_at: datetime) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return modified_at.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    except (TypeError, ValueError):
+        return False
+
+
+def conditional_get(*tables: str, daily: bool = False) -> Callable[[Request, Response], None]:
+    # Условные GET запросы: ETag строится по версиям таблиц из table_versions
+    # (change_tracking.py), а не по содержимому ответа, поэтому неизмененные данные
+    # возвращаются как 304 до выборки строк и сериализации. Версии увеличиваются
+    # в транзакции записи и общие для всех процессов приложения; запись в обход
+    # приложения (другие системы, ручной SQL) версии не меняет
+    # daily - ответ зависит и от текущей даты (возраст заявок, текущий месяц):
+    # ETag и Last-Modified меняются в начале каждых суток
+
+    def check_not_modified(request: Request, response: Response):
+        versions = change_tracking.read_versions(tables)
+        modified_at = max(modified for _, modified in versions.values())
+        key = ",".join(f"{table}={versions[table][0]}" for table in tables)
+        if daily:
+            today = date.today()
+            midnight = datetime.combine(today, time()).astimezone(timezone.utc).replace(tzinfo=None)
+            modified_at = max(modified_at, midnight)
+            key = f"{key}:{today.isoformat()}"
+        key = f"{key}:{request.url.path}?{request.url.query}"
+        etag = f'"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+        headers = {"ETag": etag, "Last-Modified": format_datetime(modified_at.replace(tzinfo=timezone.utc), usegmt=True)}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            not_modified = _etag_matches(if_none_match, etag)
+        else:
+            not_modified = _not_modified_since(request.headers.get("if-modified-since"), modified_at)
+        if not_modified:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response.headers.update(headers)
+
+    return check_not_modified
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from barista_api.api.v1.endpoints import (
+    analytics,
     business_processes,
     clients,
     coffee_product_types,
@@ -11,8 +12,10 @@ from barista_api.api.v1.endpoints import (
     purchases,
     service_requests,
     workplaces,
-    etl
+    etl,
+    system
 )
+from async_database import ASYNC_DATABASE_ENABLED
 
 api_router = APIRouter()
 
@@ -27,3 +30,10 @@ api_router.include_router(purchases.router)
 api_router.include_router(service_requests.router)
 api_router.include_router(workplaces.router)
 api_router.include_router(etl.router)
+api_router.include_router(system.router)
+api_router.include_router(analytics.router)
+
+if ASYNC_DATABASE_ENABLED:
+    # Чтение списков и записей через AsyncSession
+    from barista_api.api.v1.endpoints import async_reads
+    async_reads.replace_sync_reads(api_router)
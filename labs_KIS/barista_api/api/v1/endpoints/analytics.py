@@ -0,0 +1,85 @@
+from datetime import date
+from enum import Enum
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+import analytics
+import schemas
+from barista_api.api.deps import conditional_get, get_db
+
+router = APIRouter(prefix="/analytics", tags=["Аналитика"])
+
+# Период группировки расходов
+AnalyticsPeriod = Enum("AnalyticsPeriod", {name: name for name in analytics.PERIOD_COLUMNS}, type=str)
+
+
+def date_range(date_from: Optional[date] = None, date_to: Optional[date] = None):
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(status_code=400, detail="Начало периода позже его окончания")
+    return date_from, date_to
+
+
+@router.get("/purchases/by-period", response_model=List[schemas.SpendByPeriod],
+            summary="Расходы на закупки по дням, неделям или месяцам",
+            dependencies=[Depends(conditional_get("purchase_daily_totals"))])
+def read_spend_by_period(period: AnalyticsPeriod = AnalyticsPeriod.day, dates: tuple = Depends(date_range),
+                         db: Session = Depends(get_db)):
+    return analytics.get_spend_by_period(db, period.value, *dates)
+
+
+@router.get("/purchases/by-supplier", response_model=List[schemas.SpendByGroup],
+            summary="Расходы на закупки по поставщикам",
+            dependencies=[Depends(conditional_get("purchase_daily_totals"))])
+def read_spend_by_supplier(dates: tuple = Depends(date_range), limit: int = Query(100, ge=1, le=1000),
+                           db: Session = Depends(get_db)):
+    return analytics.get_spend_by_supplier(db, *dates, limit=limit)
+
+
+@router.get("/purchases/by-coffee-type", response_model=List[schemas.SpendByGroup],
+            summary="Расходы на закупки по типам кофе",
+            dependencies=[Depends(conditional_get("purchase_daily_totals", "coffee_product_types"))])
+def read_spend_by_coffee_type(dates: tuple = Depends(date_range), limit: int = Query(100, ge=1, le=1000),
+                              db: Session = Depends(get_db)):
+    return analytics.get_spend_by_coffee_type(db, *dates, limit=limit)
+
+
+@router.get("/purchases/by-employee", response_model=List[schemas.SpendByGroup],
+            summary="Расходы на закупки по сотрудникам",
+            dependencies=[Depends(conditional_get("purchase_daily_totals", "employees"))])
+def read_spend_by_employee(dates: tuple = Depends(date_range), limit: int = Query(100, ge=1, le=1000),
+                           db: Session = Depends(get_db)):
+    return analytics.get_spend_by_employee(db, *dates, limit=limit)
+
+
+@router.get("/service-requests/by-workplace", response_model=List[schemas.WorkplaceRequestMetrics],
+            summary="Открытые заявки на обслуживание по рабочим местам",
+            dependencies=[Depends(conditional_get("service_request_status_totals", "workplaces", daily=True))])
+def read_workplace_request_metrics(min_open_requests: int = Query(0, ge=0), skip: int = Query(0, ge=0),
+                                   limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    return analytics.get_workplace_request_metrics(db, min_open_requests=min_open_requests, skip=skip, limit=limit)
+
+
+@router.get("/service-requests/by-status", response_model=List[schemas.StatusRequestMetrics],
+            summary="Заявки на обслуживание по статусам",
+            dependencies=[Depends(conditional_get("service_request_status_totals", "equipment_service_statuses", daily=True))])
+def read_status_request_metrics(db: Session = Depends(get_db)):
+    return analytics.get_status_request_metrics(db)
+
+
+@router.get("/service-requests/by-month", response_model=List[schemas.WorkplaceMonthlyRequests],
+            summary="Рабочие места с числом заявок за месяц больше заданного",
+            dependencies=[Depends(conditional_get("service_request_monthly_totals", "workplaces", daily=True))])
+def read_workplaces_by_monthly_requests(month: Optional[date] = Query(None, description="Любой день месяца, по умолчанию текущий"),
+                                        min_requests: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000),
+                                        db: Session = Depends(get_db)):
+    month_start = (month or date.today()).replace(day=1)
+    return analytics.get_workplaces_by_monthly_requests(db, month_start, min_requests=min_requests, limit=limit)
+
+
+@router.get("/equipment/health", response_model=List[schemas.EquipmentHealth],
+            summary="Рабочие места и открытые заявки по статусам оборудования",
+            dependencies=[Depends(conditional_get("service_request_status_totals", "workplaces", "equipment_service_statuses"))])
+def read_equipment_health(db: Session = Depends(get_db)):
+    return analytics.get_equipment_health(db)
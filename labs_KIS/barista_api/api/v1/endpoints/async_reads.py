@@ -0,0 +1,93 @@
+import re
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+import async_crud
+import crud
+import schemas
+from async_database import get_async_db
+from filters import ListQuery, resource_filters
+from pagination import set_next_cursor
+from serialization import FAST_LIST_SERIALIZATION, RowListSerializer, json_response, sparse_fields
+
+# Асинхронные маршруты чтения (DB_ASYNC=true). Заменяют синхронные GET списков
+# и записей с теми же путями, поэтому запросы чтения обслуживаются без потоков
+# пула Starlette; запись остается синхронной
+
+# prefix, теги, схема, функции списка и записи, текст 404, строки быстрого пути списка.
+# Справочники статусов и типов продукции обслуживаются из кэша (cache.py)
+ASYNC_READ_ROUTES = [
+    ("/business_processes", ["Бизнес-процессы"], schemas.BusinessProcess,
+     async_crud.get_business_processes, async_crud.get_business_process,
+     "Бизнес-процесс не найден", crud.BUSINESS_PROCESS_ROWS),
+    ("/clients", ["Клиенты"], schemas.Client,
+     async_crud.get_clients, async_crud.get_client, "Клиент не найден", crud.CLIENT_ROWS),
+    ("/departments", ["Отделы"], schemas.Department,
+     async_crud.get_departments, async_crud.get_department, "Отдел не найден", crud.DEPARTMENT_ROWS),
+    ("/employees", ["Сотрудники"], schemas.Employee,
+     async_crud.get_employees, async_crud.get_employee, "Сотрудник не найден", crud.EMPLOYEE_ROWS),
+    ("/projects", ["Проекты"], schemas.Project,
+     async_crud.get_projects, async_crud.get_project, "Проект не найден", crud.PROJECT_ROWS),
+    ("/purchases", ["Закупки"], schemas.Purchase,
+     async_crud.get_purchases, async_crud.get_purchase, "Закупка не найдена", crud.PURCHASE_ROWS),
+    ("/service_requests", ["Заявки на обслуживание"], schemas.ServiceRequest,
+     async_crud.get_service_requests, async_crud.get_service_request,
+     "Заявка на обслуживание не найдена", crud.SERVICE_REQUEST_ROWS),
+    ("/workplaces", ["Рабочие места"], schemas.Workplace,
+     async_crud.get_workplaces, async_crud.get_workplace, "Рабочее место не найдено", crud.WORKPLACE_ROWS),
+]
+
+
+def build_async_read_router(prefix, tags, schema, list_items, get_item, not_found_detail, rows) -> APIRouter:
+    router = APIRouter(prefix=prefix, tags=tags)
+
+    async def read_items(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                         list_query: ListQuery = Depends(resource_filters(prefix.strip('/'))),
+                         selected: RowListSerializer = Depends(sparse_fields(rows)),
+                         db: AsyncSession = Depends(get_async_db)):
+        if FAST_LIST_SERIALIZATION or selected.projected:
+            page = await async_crud.get_rows(db, selected, skip=skip, limit=limit, after=after, list_query=list_query)
+            set_next_cursor(response, page)
+            return json_response(response, selected.dump_json(page))
+        items = await list_items(db, skip=skip, limit=limit, after=after, list_query=list_query)
+        set_next_cursor(response, items)
+        return items
+
+    async def read_item(item_id: str, db: AsyncSession = Depends(get_async_db)):
+        db_item = await get_item(db, item_id)
+        if db_item is None:
+            raise HTTPException(status_code=404, detail=not_found_detail)
+        return db_item
+
+    router.add_api_route("/", read_items, methods=["GET"], response_model=List[schema],
+                         name=f"read_{prefix.strip('/')}_async")
+    router.add_api_route("/{item_id}", read_item, methods=["GET"], response_model=schema,
+                         name=f"read_{prefix.strip('/')}_item_async")
+    return router
+
+
+routers = [build_async_read_router(*route) for route in ASYNC_READ_ROUTES]
+
+
+def _route_key(path: str) -> str:
+    return re.sub(r"\{[^}]+\}", "{}", path)
+
+
+def replace_sync_reads(api_router: APIRouter):
+    # Удаляет синхронные GET с путями асинхронных маршрутов и подключает асинхронные
+    # в конец, чтобы они не перекрывали другие GET маршруты с постоянными путями
+    # Зависимости заменяемых маршрутов (условные запросы и т.п.) переносятся на асинхронные
+    async_keys = {_route_key(route.path) for router in routers for route in router.routes}
+    replaced = {
+        _route_key(route.path): route for route in api_router.routes
+        if isinstance(route, APIRoute) and "GET" in route.methods and _route_key(route.path) in async_keys
+    }
+    api_router.routes[:] = [route for route in api_router.routes if route not in replaced.values()]
+    for router in routers:
+        for route in router.routes:
+            sync_route = replaced.get(_route_key(route.path))
+            if sync_route is not None:
+                route.dependencies = list(sync_route.dependencies)
+        api_router.include_router(router)
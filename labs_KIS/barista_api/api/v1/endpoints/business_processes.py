@@ -1,19 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 import crud
+import export
+import models
 import schemas
-from database import SessionLocal
+from filters import ListQuery, resource_filters
+from pagination import set_next_cursor
+from serialization import FAST_LIST_SERIALIZATION, RowListSerializer, json_response, sparse_fields
+from barista_api.api.deps import get_db, UnitOfWorkRoute
 
-router = APIRouter(prefix="/business_processes", tags=["Бизнес-процессы"])
+router = APIRouter(prefix="/business_processes", tags=["Бизнес-процессы"], route_class=UnitOfWorkRoute)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.post("/bulk", response_model=schemas.BulkResult, summary="Пакетное создание")
+def create_business_processes_bulk(business_processes: List[schemas.BusinessProcessCreate] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                                   db: Session = Depends(get_db)):
+    return crud.bulk_create(db, models.BusinessProcess, business_processes)
+
+@router.patch("/bulk", response_model=schemas.BulkResult, summary="Пакетное обновление")
+def update_business_processes_bulk(business_processes: List[schemas.BusinessProcessPatch] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                                   db: Session = Depends(get_db)):
+    return crud.bulk_update(db, models.BusinessProcess, business_processes)
+
+@router.delete("/bulk", response_model=schemas.BulkResult, summary="Пакетное удаление")
+def delete_business_processes_bulk(request: schemas.BulkDelete, db: Session = Depends(get_db)):
+    return crud.bulk_delete(db, models.BusinessProcess, request.ids)
+
+@router.get("/export", summary="Выгрузка бизнес-процессов в файл (csv, ndjson, parquet)")
+def export_business_processes(export_format: export.ExportFormat = Query(export.ExportFormat.csv, alias="format"),
+                              list_query: ListQuery = Depends(resource_filters("business_processes"))):
+    return export.export_response(models.BusinessProcess, crud.BUSINESS_PROCESS_KEYSET, list_query, export_format.value)
 
 @router.post("/", response_model=schemas.BusinessProcess, status_code=status.HTTP_201_CREATED)
 def create_business_process(business_process: schemas.BusinessProcessCreate, db: Session = Depends(get_db)):
@@ -27,8 +44,16 @@ def read_business_process(process_id: str, db: Session = Depends(get_db)):
     return db_process
 
 @router.get("/", response_model=List[schemas.BusinessProcess])
-def read_business_processes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    processes = crud.get_business_processes(db, skip=skip, limit=limit)
+def read_business_processes(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                            list_query: ListQuery = Depends(resource_filters("business_processes")),
+                            selected: RowListSerializer = Depends(sparse_fields(crud.BUSINESS_PROCESS_ROWS)),
+                            db: Session = Depends(get_db)):
+    if FAST_LIST_SERIALIZATION or selected.projected:
+        rows = crud.get_rows(db, selected, skip=skip, limit=limit, after=after, list_query=list_query)
+        set_next_cursor(response, rows)
+        return json_response(response, selected.dump_json(rows))
+    processes = crud.get_business_processes(db, skip=skip, limit=limit, after=after, list_query=list_query)
+    set_next_cursor(response, processes)
     return processes
 
 @router.put("/{process_id}", response_model=schemas.BusinessProcess)
@@ -1,20 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 import crud
+import export
+import models
 import schemas
-from database import SessionLocal
+from filters import ListQuery, resource_filters
+from pagination import set_next_cursor
+from serialization import FAST_LIST_SERIALIZATION, RowListSerializer, json_response, sparse_fields
+from barista_api.api.deps import get_db, conditional_get, UnitOfWorkRoute
 
-router = APIRouter(prefix="/clients", tags=["Клиенты"])
+router = APIRouter(prefix="/clients", tags=["Клиенты"], route_class=UnitOfWorkRoute)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.post("/bulk", response_model=schemas.BulkResult, summary="Пакетное создание")
+def create_clients_bulk(clients: List[schemas.ClientCreate] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                        db: Session = Depends(get_db)):
+    return crud.bulk_create(db, models.Client, clients)
+
+
+@router.patch("/bulk", response_model=schemas.BulkResult, summary="Пакетное обновление")
+def update_clients_bulk(clients: List[schemas.ClientPatch] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                        db: Session = Depends(get_db)):
+    return crud.bulk_update(db, models.Client, clients)
+
+
+@router.delete("/bulk", response_model=schemas.BulkResult, summary="Пакетное удаление")
+def delete_clients_bulk(request: schemas.BulkDelete, db: Session = Depends(get_db)):
+    return crud.bulk_delete(db, models.Client, request.ids)
+
+@router.get("/export", summary="Выгрузка клиентов в файл (csv, ndjson, parquet)")
+def export_clients(export_format: export.ExportFormat = Query(export.ExportFormat.csv, alias="format"),
+                   list_query: ListQuery = Depends(resource_filters("clients"))):
+    return export.export_response(models.Client, crud.CLIENT_KEYSET, list_query, export_format.value)
 
 
 @router.post("/", response_model=schemas.Client, status_code=status.HTTP_201_CREATED)
@@ -22,7 +41,7 @@ def create_client(client: schemas.ClientCreate, db: Session = Depends(get_db)):
     return crud.create_client(db=db, client=client)
 
 
-@router.get("/{client_id}", response_model=schemas.Client)
+@router.get("/{client_id}", response_model=schemas.Client, dependencies=[Depends(conditional_get("clients"))])
 def read_client(client_id: str, db: Session = Depends(get_db)):
     db_client = crud.get_client(db, client_id=client_id)
     if db_client is None:
@@ -30,9 +49,17 @@ def read_client(client_id: str, db: Session = Depends(get_db)):
     return db_client
 
 
-@router.get("/", response_model=List[schemas.Client])
-def read_clients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    clients = crud.get_clients(db, skip=skip, limit=limit)
+@router.get("/", response_model=List[schemas.Client], dependencies=[Depends(conditional_get("clients"))])
+def read_clients(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                 list_query: ListQuery = Depends(resource_filters("clients")),
+                 selected: RowListSerializer = Depends(sparse_fields(crud.CLIENT_ROWS)),
+                 db: Session = Depends(get_db)):
+    if FAST_LIST_SERIALIZATION or selected.projected:
+        rows = crud.get_rows(db, selected, skip=skip, limit=limit, after=after, list_query=list_query)
+        set_next_cursor(response, rows)
+        return json_response(response, selected.dump_json(rows))
+    clients = crud.get_clients(db, skip=skip, limit=limit, after=after, list_query=list_query)
+    set_next_cursor(response, clients)
     return clients
 
 
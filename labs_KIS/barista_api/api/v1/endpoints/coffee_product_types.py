@@ -1,27 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 import crud
 import schemas
-from database import SessionLocal
+from cache import TTLCache, snapshot
+from pagination import set_next_cursor
+from barista_api.api.deps import get_db, UnitOfWorkRoute
 
-router = APIRouter(prefix="/coffee_product_types", tags=["Типы кофейной продукции"])
+router = APIRouter(prefix="/coffee_product_types", tags=["Типы кофейной продукции"], route_class=UnitOfWorkRoute)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Справочник читается при каждой загрузке экрана: ответы хранятся в памяти
+# до записи в таблицу coffee_product_types или истечения TTL
+coffee_types_cache = TTLCache("coffee_product_types", ["coffee_product_types"])
 
 @router.get("/", response_model=List[schemas.CoffeeProductType])
-def read_coffee_product_types(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_coffee_product_types(db, skip=skip, limit=limit)
+def read_coffee_product_types(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                              db: Session = Depends(get_db)):
+    coffee_types = coffee_types_cache.get_or_load(
+        ("list", skip, limit, after),
+        lambda: snapshot(crud.get_coffee_product_types(db, skip=skip, limit=limit, after=after), schemas.CoffeeProductType)
+    )
+    set_next_cursor(response, coffee_types)
+    return coffee_types
 
 @router.get("/{coffee_type_id}", response_model=schemas.CoffeeProductType)
 def read_coffee_product_type(coffee_type_id: str, db: Session = Depends(get_db)):
-    db_coffee_type = crud.get_coffee_product_type(db, coffee_type_id=coffee_type_id)
+    db_coffee_type = coffee_types_cache.get_or_load(
+        ("item", coffee_type_id),
+        lambda: snapshot(crud.get_coffee_product_type(db, coffee_type_id=coffee_type_id), schemas.CoffeeProductType)
+    )
     if db_coffee_type is None:
         raise HTTPException(status_code=404, detail="Тип кофейной продукции не найден")
     return db_coffee_type
\ No newline at end of file
@@ -1,24 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 import crud
+import export
+import models
 import schemas
-from database import SessionLocal
+from filters import ListQuery, resource_filters
+from pagination import set_next_cursor
+from serialization import FAST_LIST_SERIALIZATION, RowListSerializer, json_response, sparse_fields
+from barista_api.api.deps import get_db, UnitOfWorkRoute
 
-router = APIRouter(prefix="/departments", tags=["Отделы"])
+router = APIRouter(prefix="/departments", tags=["Отделы"], route_class=UnitOfWorkRoute)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.post("/bulk", response_model=schemas.BulkResult, summary="Пакетное создание")
+def create_departments_bulk(departments: List[schemas.DepartmentCreate] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                            db: Session = Depends(get_db)):
+    return crud.bulk_create(db, models.Department, departments)
+
+@router.patch("/bulk", response_model=schemas.BulkResult, summary="Пакетное обновление")
+def update_departments_bulk(departments: List[schemas.DepartmentPatch] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                            db: Session = Depends(get_db)):
+    return crud.bulk_update(db, models.Department, departments)
+
+@router.delete("/bulk", response_model=schemas.BulkResult, summary="Пакетное удаление")
+def delete_departments_bulk(request: schemas.BulkDelete, db: Session = Depends(get_db)):
+    return crud.bulk_delete(db, models.Department, request.ids)
+
+@router.get("/export", summary="Выгрузка отделов в файл (csv, ndjson, parquet)")
+def export_departments(export_format: export.ExportFormat = Query(export.ExportFormat.csv, alias="format"),
+                       list_query: ListQuery = Depends(resource_filters("departments"))):
+    return export.export_response(models.Department, crud.DEPARTMENT_KEYSET, list_query, export_format.value)
 
 @router.post("/", response_model=schemas.Department, status_code=status.HTTP_201_CREATED)
 def create_department(department: schemas.DepartmentCreate, db: Session = Depends(get_db)):
     return crud.create_department(db=db, department=department)
 
+@router.get("/with-details", response_model=List[schemas.DepartmentWithManager], summary="Отделы с руководителями")
+def read_departments_with_details(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                                  list_query: ListQuery = Depends(resource_filters("departments")),
+                                  db: Session = Depends(get_db)):
+    departments = crud.get_departments_with_manager(db, skip=skip, limit=limit, after=after, list_query=list_query)
+    set_next_cursor(response, departments)
+    return departments
+
+@router.get("/{department_id}/with-details", response_model=schemas.DepartmentWithManager)
+def read_department_with_details(department_id: str, db: Session = Depends(get_db)):
+    db_department = crud.get_department_with_manager(db, department_id=department_id)
+    if db_department is None:
+        raise HTTPException(status_code=404, detail="Отдел не найден")
+    return db_department
+
 @router.get("/{department_id}", response_model=schemas.Department)
 def read_department(department_id: str, db: Session = Depends(get_db)):
     db_department = crud.get_department(db, department_id=department_id)
@@ -27,8 +59,16 @@ def read_department(department_id: str, db: Session = Depends(get_db)):
     return db_department
 
 @router.get("/", response_model=List[schemas.Department])
-def read_departments(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    departments = crud.get_departments(db, skip=skip, limit=limit)
+def read_departments(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                     list_query: ListQuery = Depends(resource_filters("departments")),
+                     selected: RowListSerializer = Depends(sparse_fields(crud.DEPARTMENT_ROWS)),
+                     db: Session = Depends(get_db)):
+    if FAST_LIST_SERIALIZATION or selected.projected:
+        rows = crud.get_rows(db, selected, skip=skip, limit=limit, after=after, list_query=list_query)
+        set_next_cursor(response, rows)
+        return json_response(response, selected.dump_json(rows))
+    departments = crud.get_departments(db, skip=skip, limit=limit, after=after, list_query=list_query)
+    set_next_cursor(response, departments)
     return departments
 
 @router.put("/{department_id}", response_model=schemas.Department)
@@ -1,20 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 import crud
+import export
+import models
 import schemas
-from database import SessionLocal
+from filters import ListQuery, resource_filters
+from pagination import set_next_cursor
+from serialization import FAST_LIST_SERIALIZATION, RowListSerializer, json_response, sparse_fields
+from barista_api.api.deps import get_db, conditional_get, UnitOfWorkRoute
 
-router = APIRouter(prefix="/employees", tags=["Сотрудники"])
+router = APIRouter(prefix="/employees", tags=["Сотрудники"], route_class=UnitOfWorkRoute)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.post("/bulk", response_model=schemas.BulkResult, summary="Пакетное создание")
+def create_employees_bulk(employees: List[schemas.EmployeeCreate] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                          db: Session = Depends(get_db)):
+    return crud.bulk_create(db, models.Employee, employees)
+
+
+@router.patch("/bulk", response_model=schemas.BulkResult, summary="Пакетное обновление")
+def update_employees_bulk(employees: List[schemas.EmployeePatch] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                          db: Session = Depends(get_db)):
+    return crud.bulk_update(db, models.Employee, employees)
+
+
+@router.delete("/bulk", response_model=schemas.BulkResult, summary="Пакетное удаление")
+def delete_employees_bulk(request: schemas.BulkDelete, db: Session = Depends(get_db)):
+    return crud.bulk_delete(db, models.Employee, request.ids)
+
+@router.get("/export", summary="Выгрузка сотрудников в файл (csv, ndjson, parquet)")
+def export_employees(export_format: export.ExportFormat = Query(export.ExportFormat.csv, alias="format"),
+                     list_query: ListQuery = Depends(resource_filters("employees"))):
+    return export.export_response(models.Employee, crud.EMPLOYEE_KEYSET, list_query, export_format.value)
 
 
 @router.post("/", response_model=schemas.Employee, status_code=status.HTTP_201_CREATED)
@@ -22,7 +41,24 @@ def create_employee(employee: schemas.EmployeeCreate, db: Session = Depends(get_
     return crud.create_employee(db=db, employee=employee)
 
 
-@router.get("/{employee_id}", response_model=schemas.Employee)
+@router.get("/with-details", response_model=List[schemas.EmployeeWithDetails], summary="Сотрудники с отделом, рабочим местом и статусом оборудования", dependencies=[Depends(conditional_get("employees", "departments", "workplaces", "equipment_service_statuses"))])
+def read_employees_with_details(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                                list_query: ListQuery = Depends(resource_filters("employees")),
+                                db: Session = Depends(get_db)):
+    employees = crud.get_employees_with_details(db, skip=skip, limit=limit, after=after, list_query=list_query)
+    set_next_cursor(response, employees)
+    return employees
+
+
+@router.get("/{employee_id}/with-details", response_model=schemas.EmployeeWithDetails, dependencies=[Depends(conditional_get("employees", "departments", "workplaces", "equipment_service_statuses"))])
+def read_employee_with_details(employee_id: str, db: Session = Depends(get_db)):
+    db_employee = crud.get_employee_with_details(db, employee_id=employee_id)
+    if db_employee is None:
+        raise HTTPException(status_code=404, detail="Сотрудник не найден")
+    return db_employee
+
+
+@router.get("/{employee_id}", response_model=schemas.Employee, dependencies=[Depends(conditional_get("employees"))])
 def read_employee(employee_id: str, db: Session = Depends(get_db)):
     db_employee = crud.get_employee(db, employee_id=employee_id)
     if db_employee is None:
@@ -30,9 +66,17 @@ def read_employee(employee_id: str, db: Session = Depends(get_db)):
     return db_employee
 
 
-@router.get("/", response_model=List[schemas.Employee])
-def read_employees(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    employees = crud.get_employees(db, skip=skip, limit=limit)
+@router.get("/", response_model=List[schemas.Employee], dependencies=[Depends(conditional_get("employees"))])
+def read_employees(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                   list_query: ListQuery = Depends(resource_filters("employees")),
+                   selected: RowListSerializer = Depends(sparse_fields(crud.EMPLOYEE_ROWS)),
+                   db: Session = Depends(get_db)):
+    if FAST_LIST_SERIALIZATION or selected.projected:
+        rows = crud.get_rows(db, selected, skip=skip, limit=limit, after=after, list_query=list_query)
+        set_next_cursor(response, rows)
+        return json_response(response, selected.dump_json(rows))
+    employees = crud.get_employees(db, skip=skip, limit=limit, after=after, list_query=list_query)
+    set_next_cursor(response, employees)
     return employees
 
 
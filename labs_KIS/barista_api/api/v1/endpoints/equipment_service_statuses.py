@@ -1,28 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 import crud
 import schemas
-from database import SessionLocal
+from cache import TTLCache, snapshot
+from pagination import set_next_cursor
+from barista_api.api.deps import get_db, UnitOfWorkRoute
 
-router = APIRouter(prefix="/equipment_service_statuses", tags=["Статусы оборудования"])
+router = APIRouter(prefix="/equipment_service_statuses", tags=["Статусы оборудования"], route_class=UnitOfWorkRoute)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Справочник читается при каждой загрузке экрана: ответы хранятся в памяти
+# до записи в таблицу equipment_service_statuses или истечения TTL
+statuses_cache = TTLCache("equipment_service_statuses", ["equipment_service_statuses"])
 
 @router.get("/", response_model=List[schemas.EquipmentServiceStatus])
-def read_equipment_service_statuses(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    statuses = crud.get_equipment_service_statuses(db, skip=skip, limit=limit)
+def read_equipment_service_statuses(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                                    db: Session = Depends(get_db)):
+    statuses = statuses_cache.get_or_load(
+        ("list", skip, limit, after),
+        lambda: snapshot(crud.get_equipment_service_statuses(db, skip=skip, limit=limit, after=after), schemas.EquipmentServiceStatus)
+    )
+    set_next_cursor(response, statuses)
     return statuses
 
 @router.get("/{status_id}", response_model=schemas.EquipmentServiceStatus)
 def read_equipment_service_status(status_id: str, db: Session = Depends(get_db)):
-    db_status = crud.get_equipment_service_status(db, status_id=status_id)
+    db_status = statuses_cache.get_or_load(
+        ("item", status_id),
+        lambda: snapshot(crud.get_equipment_service_status(db, status_id=status_id), schemas.EquipmentServiceStatus)
+    )
     if db_status is None:
         raise HTTPException(status_code=404, detail="Статус оборудования не найден")
     return db_status
\ No newline at end of file
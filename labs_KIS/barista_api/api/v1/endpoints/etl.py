@@ -1,25 +1,30 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from enum import Enum
 import os
 import logging
+import shutil
 import tempfile
 
-from database import SessionLocal
-from etl_pipeline import ETLPipeline
+import etl_jobs
+from etl_pipeline import MODEL_MAPPING, ON_CONFLICT_MODES
 
 router = APIRouter(prefix="/etl", tags=["ETL процессы"])
 
+# Сущности, доступные для загрузки из файла
+ETLModelType = Enum("ETLModelType", {name: name for name in MODEL_MAPPING}, type=str)
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Обработка строк с уже существующим ID
+ETLConflictMode = Enum("ETLConflictMode", {name: name for name in ON_CONFLICT_MODES}, type=str)
+
+# Размер блока при записи загружаемого файла на диск
+UPLOAD_BLOCK_SIZE = 1024 * 1024
 
+# Файлы больше этого размера обрабатываются потоково, пакетами строк
+STREAMING_THRESHOLD = 20 * 1024 * 1024
 
-def process_etl_file(file: UploadFile, db: Session):
+
+def save_upload_file(file: UploadFile) -> str:
     # Проверка формата файла
     allowed_extensions = {'.csv', '.xls', '.xlsx'}
     file_extension = os.path.splitext(file.filename)[1].lower()
@@ -30,65 +35,58 @@ def process_etl_file(file: UploadFile, db: Session):
             detail=f"Неподдерживаемый формат файла. Разрешенные форматы: {', '.join(allowed_extensions)}"
         )
 
-    # Создаем временный файл
+    # Создаем временный файл, копируя загрузку блоками фиксированного размера
     with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-        content = file.file.read()
-        temp_file.write(content)
-        temp_file_path = temp_file.name
+        shutil.copyfileobj(file.file, temp_file, UPLOAD_BLOCK_SIZE)
+        return temp_file.name
+
 
+def process_etl_file(file: UploadFile, model_type: str, on_conflict: str):
+    temp_file_path = save_upload_file(file)
+
+    # Временный файл удаляет фоновая задача после завершения
     try:
-        # Запуск ETL процесса только для сотрудников
-        pipeline = ETLPipeline(temp_file_path, db, model_type="employees")
-        validation_errors, added_count = pipeline.run()
-
-        # Проверяем, есть ли КРИТИЧЕСКИЕ ошибки валидации
-        critical_errors = bool(
-            validation_errors['missing_columns'] or
-            validation_errors['duplicate_ids']
-        )
+        streaming = os.path.getsize(temp_file_path) > STREAMING_THRESHOLD
+        job = etl_jobs.submit_job(file.filename, temp_file_path, model_type=model_type, streaming=streaming,
+                                  on_conflict=on_conflict)
+    except etl_jobs.ETLQueueFullError as e:
+        os.unlink(temp_file_path)
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception:
+        os.unlink(temp_file_path)
+        raise
+
+    return job.to_dict()
 
-        response_data = {
-            "Имя файла": file.filename,
-            "Тип данных": "employees",
-            "Ошибки валидации": validation_errors,
-            "Добавлено записей": added_count
-        }
-
-        if critical_errors:
-            response_data.update({
-                "Статус": "error",
-                "Текст": "Файл содержит критические ошибки валидации"
-            })
-            raise HTTPException(
-                status_code=400,
-                detail=response_data
-            )
-
-        # Успешная обработка (возможно с некритическими ошибками)
-        response_data.update({
-            "Статус": "success",
-            "Текст": "Файл успешно обработан"
-        })
-        return response_data
-
-    finally:
-        # Удаляем временный файл
-        if os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
-
-
-@router.post("/upload-employees", summary="Загрузка сотрудников из файла")
-async def upload_employees(
-        file: UploadFile = File(...),
-        db: Session = Depends(get_db)
-):
+
+async def upload_file(file: UploadFile, model_type: str, on_conflict: str = 'skip'):
     try:
-        return process_etl_file(file, db)
+        # Запись файла выполняется в пуле потоков, обработка - в фоновой задаче
+        return await run_in_threadpool(process_etl_file, file, model_type, on_conflict)
     except HTTPException as he:
         raise he
     except Exception as e:
-        logging.error(f"Ошибка при обработке файла сотрудников: {e}")
+        logging.error("Ошибка при обработке файла %s: %s", model_type, e)
         raise HTTPException(
             status_code=500,
             detail=f"Внутренняя ошибка сервера при обработке файла: {str(e)}"
         )
+
+
+@router.post("/upload-employees", summary="Загрузка сотрудников из файла", status_code=status.HTTP_202_ACCEPTED)
+async def upload_employees(file: UploadFile = File(...), on_conflict: ETLConflictMode = ETLConflictMode.skip):
+    return await upload_file(file, "employees", on_conflict.value)
+
+
+@router.post("/upload/{model_type}", summary="Загрузка данных сущности из файла", status_code=status.HTTP_202_ACCEPTED)
+async def upload_entity(model_type: ETLModelType, file: UploadFile = File(...),
+                        on_conflict: ETLConflictMode = ETLConflictMode.skip):
+    return await upload_file(file, model_type.value, on_conflict.value)
+
+
+@router.get("/jobs/{job_id}", summary="Статус ETL задачи")
+def read_etl_job(job_id: str):
+    job = etl_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="ETL задача не найдена")
+    return job.to_dict()
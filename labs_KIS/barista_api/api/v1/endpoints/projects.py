@@ -1,19 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 import crud
+import export
+import models
 import schemas
-from database import SessionLocal
+from filters import ListQuery, resource_filters
+from pagination import set_next_cursor
+from serialization import FAST_LIST_SERIALIZATION, RowListSerializer, json_response, sparse_fields
+from barista_api.api.deps import get_db, UnitOfWorkRoute
 
-router = APIRouter(prefix="/projects", tags=["Проекты"])
+router = APIRouter(prefix="/projects", tags=["Проекты"], route_class=UnitOfWorkRoute)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.post("/bulk", response_model=schemas.BulkResult, summary="Пакетное создание")
+def create_projects_bulk(projects: List[schemas.ProjectCreate] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                         db: Session = Depends(get_db)):
+    return crud.bulk_create(db, models.Project, projects)
+
+@router.patch("/bulk", response_model=schemas.BulkResult, summary="Пакетное обновление")
+def update_projects_bulk(projects: List[schemas.ProjectPatch] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                         db: Session = Depends(get_db)):
+    return crud.bulk_update(db, models.Project, projects)
+
+@router.delete("/bulk", response_model=schemas.BulkResult, summary="Пакетное удаление")
+def delete_projects_bulk(request: schemas.BulkDelete, db: Session = Depends(get_db)):
+    return crud.bulk_delete(db, models.Project, request.ids)
+
+@router.get("/export", summary="Выгрузка проектов в файл (csv, ndjson, parquet)")
+def export_projects(export_format: export.ExportFormat = Query(export.ExportFormat.csv, alias="format"),
+                    list_query: ListQuery = Depends(resource_filters("projects"))):
+    return export.export_response(models.Project, crud.PROJECT_KEYSET, list_query, export_format.value)
 
 @router.post("/", response_model=schemas.Project, status_code=status.HTTP_201_CREATED)
 def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)):
@@ -27,8 +44,16 @@ def read_project(project_id: str, db: Session = Depends(get_db)):
     return db_project
 
 @router.get("/", response_model=List[schemas.Project])
-def read_projects(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    projects = crud.get_projects(db, skip=skip, limit=limit)
+def read_projects(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                  list_query: ListQuery = Depends(resource_filters("projects")),
+                  selected: RowListSerializer = Depends(sparse_fields(crud.PROJECT_ROWS)),
+                  db: Session = Depends(get_db)):
+    if FAST_LIST_SERIALIZATION or selected.projected:
+        rows = crud.get_rows(db, selected, skip=skip, limit=limit, after=after, list_query=list_query)
+        set_next_cursor(response, rows)
+        return json_response(response, selected.dump_json(rows))
+    projects = crud.get_projects(db, skip=skip, limit=limit, after=after, list_query=list_query)
+    set_next_cursor(response, projects)
     return projects
 
 @router.put("/{project_id}", response_model=schemas.Project)
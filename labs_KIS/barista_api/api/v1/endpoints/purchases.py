@@ -1,19 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 import crud
+import export
+import models
 import schemas
-from database import SessionLocal
+from filters import ListQuery, resource_filters
+from pagination import set_next_cursor
+from serialization import FAST_LIST_SERIALIZATION, RowListSerializer, json_response, sparse_fields
+from barista_api.api.deps import get_db, UnitOfWorkRoute
 
-router = APIRouter(prefix="/purchases", tags=["Закупки"])
+router = APIRouter(prefix="/purchases", tags=["Закупки"], route_class=UnitOfWorkRoute)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.post("/bulk", response_model=schemas.BulkResult, summary="Пакетное создание")
+def create_purchases_bulk(purchases: List[schemas.PurchaseCreate] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                          db: Session = Depends(get_db)):
+    return crud.bulk_create(db, models.Purchase, purchases)
+
+@router.patch("/bulk", response_model=schemas.BulkResult, summary="Пакетное обновление")
+def update_purchases_bulk(purchases: List[schemas.PurchasePatch] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                          db: Session = Depends(get_db)):
+    return crud.bulk_update(db, models.Purchase, purchases)
+
+@router.delete("/bulk", response_model=schemas.BulkResult, summary="Пакетное удаление")
+def delete_purchases_bulk(request: schemas.BulkDelete, db: Session = Depends(get_db)):
+    return crud.bulk_delete(db, models.Purchase, request.ids)
+
+@router.get("/export", summary="Выгрузка закупок в файл (csv, ndjson, parquet)")
+def export_purchases(export_format: export.ExportFormat = Query(export.ExportFormat.csv, alias="format"),
+                     list_query: ListQuery = Depends(resource_filters("purchases"))):
+    return export.export_response(models.Purchase, crud.PURCHASE_KEYSET, list_query, export_format.value)
 
 @router.post("/", response_model=schemas.Purchase, status_code=status.HTTP_201_CREATED)
 def create_purchase(purchase: schemas.PurchaseCreate, db: Session = Depends(get_db)):
@@ -27,8 +44,16 @@ def read_purchase(purchase_id: str, db: Session = Depends(get_db)):
     return db_purchase
 
 @router.get("/", response_model=List[schemas.Purchase])
-def read_purchases(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    purchases = crud.get_purchases(db, skip=skip, limit=limit)
+def read_purchases(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                   list_query: ListQuery = Depends(resource_filters("purchases")),
+                   selected: RowListSerializer = Depends(sparse_fields(crud.PURCHASE_ROWS)),
+                   db: Session = Depends(get_db)):
+    if FAST_LIST_SERIALIZATION or selected.projected:
+        rows = crud.get_rows(db, selected, skip=skip, limit=limit, after=after, list_query=list_query)
+        set_next_cursor(response, rows)
+        return json_response(response, selected.dump_json(rows))
+    purchases = crud.get_purchases(db, skip=skip, limit=limit, after=after, list_query=list_query)
+    set_next_cursor(response, purchases)
     return purchases
 
 @router.put("/{purchase_id}", response_model=schemas.Purchase)
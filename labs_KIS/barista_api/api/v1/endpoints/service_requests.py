@@ -1,19 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 import crud
+import export
+import models
 import schemas
-from database import SessionLocal
+from filters import ListQuery, resource_filters
+from pagination import set_next_cursor
+from serialization import FAST_LIST_SERIALIZATION, RowListSerializer, json_response, sparse_fields
+from barista_api.api.deps import get_db, UnitOfWorkRoute
 
-router = APIRouter(prefix="/service_requests", tags=["Заявки на обслуживание"])
+router = APIRouter(prefix="/service_requests", tags=["Заявки на обслуживание"], route_class=UnitOfWorkRoute)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.post("/bulk", response_model=schemas.BulkResult, summary="Пакетное создание")
+def create_service_requests_bulk(service_requests: List[schemas.ServiceRequestCreate] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                                 db: Session = Depends(get_db)):
+    return crud.bulk_create(db, models.ServiceRequest, service_requests)
+
+@router.patch("/bulk", response_model=schemas.BulkResult, summary="Пакетное обновление")
+def update_service_requests_bulk(service_requests: List[schemas.ServiceRequestPatch] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                                 db: Session = Depends(get_db)):
+    return crud.bulk_update(db, models.ServiceRequest, service_requests)
+
+@router.delete("/bulk", response_model=schemas.BulkResult, summary="Пакетное удаление")
+def delete_service_requests_bulk(request: schemas.BulkDelete, db: Session = Depends(get_db)):
+    return crud.bulk_delete(db, models.ServiceRequest, request.ids)
+
+@router.get("/export", summary="Выгрузка заявок на обслуживание в файл (csv, ndjson, parquet)")
+def export_service_requests(export_format: export.ExportFormat = Query(export.ExportFormat.csv, alias="format"),
+                            list_query: ListQuery = Depends(resource_filters("service_requests"))):
+    return export.export_response(models.ServiceRequest, crud.SERVICE_REQUEST_KEYSET, list_query, export_format.value)
 
 @router.post("/", response_model=schemas.ServiceRequest, status_code=status.HTTP_201_CREATED)
 def create_service_request(service_request: schemas.ServiceRequestCreate, db: Session = Depends(get_db)):
@@ -27,8 +44,16 @@ def read_service_request(request_id: str, db: Session = Depends(get_db)):
     return db_request
 
 @router.get("/", response_model=List[schemas.ServiceRequest])
-def read_service_requests(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    requests = crud.get_service_requests(db, skip=skip, limit=limit)
+def read_service_requests(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                          list_query: ListQuery = Depends(resource_filters("service_requests")),
+                          selected: RowListSerializer = Depends(sparse_fields(crud.SERVICE_REQUEST_ROWS)),
+                          db: Session = Depends(get_db)):
+    if FAST_LIST_SERIALIZATION or selected.projected:
+        rows = crud.get_rows(db, selected, skip=skip, limit=limit, after=after, list_query=list_query)
+        set_next_cursor(response, rows)
+        return json_response(response, selected.dump_json(rows))
+    requests = crud.get_service_requests(db, skip=skip, limit=limit, after=after, list_query=list_query)
+    set_next_cursor(response, requests)
     return requests
 
 @router.put("/{request_id}", response_model=schemas.ServiceRequest)
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+
+from cache import get_cache_stats
+from database import get_pool_status
+
+router = APIRouter(prefix="/system", tags=["Система"])
+
+
+@router.get("/pool", summary="Состояние пула соединений с БД")
+def read_pool_status():
+    return get_pool_status()
+
+
+@router.get("/cache", summary="Статистика кэшей справочников")
+def read_cache_stats():
+    return get_cache_stats()
@@ -1,34 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 import crud
+import export
+import models
 import schemas
-from database import SessionLocal
+from filters import ListQuery, resource_filters
+from pagination import set_next_cursor
+from serialization import FAST_LIST_SERIALIZATION, RowListSerializer, json_response, sparse_fields
+from barista_api.api.deps import get_db, conditional_get, UnitOfWorkRoute
 
-router = APIRouter(prefix="/workplaces", tags=["Рабочие места"])
+router = APIRouter(prefix="/workplaces", tags=["Рабочие места"], route_class=UnitOfWorkRoute)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.post("/bulk", response_model=schemas.BulkResult, summary="Пакетное создание")
+def create_workplaces_bulk(workplaces: List[schemas.WorkplaceCreate] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                           db: Session = Depends(get_db)):
+    return crud.bulk_create(db, models.Workplace, workplaces)
+
+@router.patch("/bulk", response_model=schemas.BulkResult, summary="Пакетное обновление")
+def update_workplaces_bulk(workplaces: List[schemas.WorkplacePatch] = Body(..., max_length=schemas.BULK_MAX_ITEMS),
+                           db: Session = Depends(get_db)):
+    return crud.bulk_update(db, models.Workplace, workplaces)
+
+@router.delete("/bulk", response_model=schemas.BulkResult, summary="Пакетное удаление")
+def delete_workplaces_bulk(request: schemas.BulkDelete, db: Session = Depends(get_db)):
+    return crud.bulk_delete(db, models.Workplace, request.ids)
+
+@router.get("/export", summary="Выгрузка рабочих мест в файл (csv, ndjson, parquet)")
+def export_workplaces(export_format: export.ExportFormat = Query(export.ExportFormat.csv, alias="format"),
+                      list_query: ListQuery = Depends(resource_filters("workplaces"))):
+    return export.export_response(models.Workplace, crud.WORKPLACE_KEYSET, list_query, export_format.value)
 
 @router.post("/", response_model=schemas.Workplace, status_code=status.HTTP_201_CREATED)
 def create_workplace(workplace: schemas.WorkplaceCreate, db: Session = Depends(get_db)):
     return crud.create_workplace(db=db, workplace=workplace)
 
-@router.get("/{workplace_id}", response_model=schemas.Workplace)
+@router.get("/with-details", response_model=List[schemas.WorkplaceWithStatus], summary="Рабочие места со статусом оборудования", dependencies=[Depends(conditional_get("workplaces", "equipment_service_statuses"))])
+def read_workplaces_with_details(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                                 list_query: ListQuery = Depends(resource_filters("workplaces")),
+                                 db: Session = Depends(get_db)):
+    workplaces = crud.get_workplaces_with_status(db, skip=skip, limit=limit, after=after, list_query=list_query)
+    set_next_cursor(response, workplaces)
+    return workplaces
+
+@router.get("/{workplace_id}/with-details", response_model=schemas.WorkplaceWithStatus, dependencies=[Depends(conditional_get("workplaces", "equipment_service_statuses"))])
+def read_workplace_with_details(workplace_id: str, db: Session = Depends(get_db)):
+    db_workplace = crud.get_workplace_with_status(db, workplace_id=workplace_id)
+    if db_workplace is None:
+        raise HTTPException(status_code=404, detail="Рабочее место не найдено")
+    return db_workplace
+
+@router.get("/{workplace_id}", response_model=schemas.Workplace, dependencies=[Depends(conditional_get("workplaces"))])
 def read_workplace(workplace_id: str, db: Session = Depends(get_db)):
     db_workplace = crud.get_workplace(db, workplace_id=workplace_id)
     if db_workplace is None:
         raise HTTPException(status_code=404, detail="Рабочее место не найдено")
     return db_workplace
 
-@router.get("/", response_model=List[schemas.Workplace])
-def read_workplaces(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    workplaces = crud.get_workplaces(db, skip=skip, limit=limit)
+@router.get("/", response_model=List[schemas.Workplace], dependencies=[Depends(conditional_get("workplaces"))])
+def read_workplaces(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                    list_query: ListQuery = Depends(resource_filters("workplaces")),
+                    selected: RowListSerializer = Depends(sparse_fields(crud.WORKPLACE_ROWS)),
+                    db: Session = Depends(get_db)):
+    if FAST_LIST_SERIALIZATION or selected.projected:
+        rows = crud.get_rows(db, selected, skip=skip, limit=limit, after=after, list_query=list_query)
+        set_next_cursor(response, rows)
+        return json_response(response, selected.dump_json(rows))
+    workplaces = crud.get_workplaces(db, skip=skip, limit=limit, after=after, list_query=list_query)
+    set_next_cursor(response, workplaces)
     return workplaces
 
 @router.put("/{workplace_id}", response_model=schemas.Workplace)
@@ -0,0 +1,156 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import crud
+from filters import ListQuery, NO_FILTERS
+import models
+from serialization import RowListSerializer
+import logging
+
+
+# Журнал чтений: самые частые записи, к нему применяется выборка LOG_READ_SAMPLE_RATE
+read_logger = logging.getLogger("coffee_business_api.reads")
+
+# Асинхронные варианты функций чтения crud для AsyncSession
+
+
+async def get_rows(db: AsyncSession, rows: RowListSerializer, skip: int = 0, limit: int = 100,
+                   after: Optional[str] = None, list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка %s, пропуск=%s, лимит=%s", rows.columns[0].table.name, skip, limit)
+    keyset = list_query.keyset(rows.keyset)
+    result = await db.execute(keyset.apply(list_query.filter(rows.statement(keyset)), skip, limit, after))
+    return keyset.page(result.all(), limit)
+
+
+# Equipment Service Status
+async def get_equipment_service_statuses(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    read_logger.info("Получение списка статусов оборудования, пропуск=%s, лимит=%s", skip, limit)
+    result = await db.scalars(crud.EQUIPMENT_SERVICE_STATUS_KEYSET.apply(select(models.EquipmentServiceStatus), skip, limit, after))
+    return crud.EQUIPMENT_SERVICE_STATUS_KEYSET.page(result.all(), limit)
+
+async def get_equipment_service_status(db: AsyncSession, status_id: str):
+    read_logger.info("Получение статуса оборудования по ID: %s", status_id)
+    return await db.get(models.EquipmentServiceStatus, status_id)
+
+
+# Coffee Product Type
+async def get_coffee_product_types(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    read_logger.info("Получение списка типов кофейной продукции, пропуск=%s, лимит=%s", skip, limit)
+    result = await db.scalars(crud.COFFEE_PRODUCT_TYPE_KEYSET.apply(select(models.CoffeeProductType), skip, limit, after))
+    return crud.COFFEE_PRODUCT_TYPE_KEYSET.page(result.all(), limit)
+
+async def get_coffee_product_type(db: AsyncSession, coffee_type_id: str):
+    read_logger.info("Получение типа кофейной продукции по ID: %s", coffee_type_id)
+    return await db.get(models.CoffeeProductType, coffee_type_id)
+
+
+# Department
+async def get_departments(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                          list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка отделов, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(crud.DEPARTMENT_KEYSET)
+    result = await db.scalars(keyset.apply(list_query.filter(select(models.Department)), skip, limit, after))
+    return keyset.page(result.all(), limit)
+
+
+async def get_department(db: AsyncSession, department_id: str):
+    read_logger.info("Получение отдела по ID: %s", department_id)
+    return await db.get(models.Department, department_id)
+
+
+# Workplace
+async def get_workplaces(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                         list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка рабочих мест, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(crud.WORKPLACE_KEYSET)
+    result = await db.scalars(keyset.apply(list_query.filter(select(models.Workplace)), skip, limit, after))
+    return keyset.page(result.all(), limit)
+
+
+async def get_workplace(db: AsyncSession, workplace_id: str):
+    read_logger.info("Получение рабочего места по ID: %s", workplace_id)
+    return await db.get(models.Workplace, workplace_id)
+
+
+# Employee
+async def get_employees(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                        list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка сотрудников, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(crud.EMPLOYEE_KEYSET)
+    result = await db.scalars(keyset.apply(list_query.filter(select(models.Employee)), skip, limit, after))
+    return keyset.page(result.all(), limit)
+
+
+async def get_employee(db: AsyncSession, employee_id: str):
+    read_logger.info("Получение сотрудника по ID: %s", employee_id)
+    return await db.get(models.Employee, employee_id)
+
+
+# Project
+async def get_projects(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                       list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка проектов, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(crud.PROJECT_KEYSET)
+    result = await db.scalars(keyset.apply(list_query.filter(select(models.Project)), skip, limit, after))
+    return keyset.page(result.all(), limit)
+
+
+async def get_project(db: AsyncSession, project_id: str):
+    read_logger.info("Получение проекта по ID: %s", project_id)
+    return await db.get(models.Project, project_id)
+
+
+# Client
+async def get_clients(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                      list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка клиентов, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(crud.CLIENT_KEYSET)
+    result = await db.scalars(keyset.apply(list_query.filter(select(models.Client)), skip, limit, after))
+    return keyset.page(result.all(), limit)
+
+
+async def get_client(db: AsyncSession, client_id: str):
+    read_logger.info("Получение клиента по ID: %s", client_id)
+    return await db.get(models.Client, client_id)
+
+
+# Business Process
+async def get_business_processes(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                                 list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка бизнес-процессов, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(crud.BUSINESS_PROCESS_KEYSET)
+    result = await db.scalars(keyset.apply(list_query.filter(select(models.BusinessProcess)), skip, limit, after))
+    return keyset.page(result.all(), limit)
+
+
+async def get_business_process(db: AsyncSession, process_id: str):
+    read_logger.info("Получение бизнес-процесса по ID: %s", process_id)
+    return await db.get(models.BusinessProcess, process_id)
+
+
+# Purchase
+async def get_purchases(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                        list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка закупок, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(crud.PURCHASE_KEYSET)
+    result = await db.scalars(keyset.apply(list_query.filter(select(models.Purchase)), skip, limit, after))
+    return keyset.page(result.all(), limit)
+
+
+async def get_purchase(db: AsyncSession, purchase_id: str):
+    read_logger.info("Получение закупки по ID: %s", purchase_id)
+    return await db.get(models.Purchase, purchase_id)
+
+
+# Service Request
+async def get_service_requests(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                               list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка заявок на обслуживание, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(crud.SERVICE_REQUEST_KEYSET)
+    result = await db.scalars(keyset.apply(list_query.filter(select(models.ServiceRequest)), skip, limit, after))
+    return keyset.page(result.all(), limit)
+
+
+async def get_service_request(db: AsyncSession, request_id: str):
+    read_logger.info("Получение заявки на обслуживание по ID: %s", request_id)
+    return await db.get(models.ServiceRequest, request_id)
@@ -0,0 +1,55 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import os
+from typing import AsyncIterator
+
+from database import (
+    DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE, DB_POOL_SIZE, DB_POOL_TIMEOUT, env_flag
+)
+
+# Асинхронный доступ к БД для маршрутов чтения; включается DB_ASYNC=true
+ASYNC_DATABASE_ENABLED = env_flag('DB_ASYNC', 'false')
+
+# Асинхронные драйверы для синхронных драйверов DATABASE_URL
+ASYNC_DRIVERS = {
+    'mssql': 'aioodbc',
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+    'mysql': 'aiomysql',
+}
+
+
+def get_async_database_url() -> str:
+    # ASYNC_DATABASE_URL задается явно или выводится из DATABASE_URL заменой драйвера
+    explicit_url = os.getenv('ASYNC_DATABASE_URL')
+    if explicit_url:
+        return explicit_url
+    url = make_url(DATABASE_URL)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"Нет асинхронного драйвера для {url.get_backend_name()}, задайте ASYNC_DATABASE_URL")
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if ASYNC_DATABASE_ENABLED:
+    async_url = get_async_database_url()
+    async_engine_options = {'echo': False}
+    if make_url(async_url).get_backend_name() != 'sqlite':
+        async_engine_options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    async_engine = create_async_engine(async_url, **async_engine_options)
+    # Объекты остаются доступными после фиксации без повторной загрузки
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Set
+
+import change_tracking
+from pagination import Page
+
+# Время жизни записи кэша справочников в секундах
+REFERENCE_CACHE_TTL = float(os.getenv('REFERENCE_CACHE_TTL', '300'))
+
+# Максимальное число записей в одном кэше
+REFERENCE_CACHE_MAX_SIZE = int(os.getenv('REFERENCE_CACHE_MAX_SIZE', '1024'))
+
+_caches: List["TTLCache"] = []
+
+
+class TTLCache:
+    # LRU кэш с ограниченным размером и временем жизни записей. Кэш привязан
+    # к таблицам и очищается после фиксации записи в любую из них; TTL ограничивает
+    # устаревание при записи из других процессов
+
+    def __init__(self, name: str, tables: Iterable[str],
+                 max_size: int = REFERENCE_CACHE_MAX_SIZE, ttl: float = REFERENCE_CACHE_TTL):
+        self.name = name
+        self.tables: Set[str] = set(tables)
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Номер поколения: значение, загруженное до сброса кэша, не сохраняется
+        self._generation = 0
+
+        _caches.append(self)
+        change_tracking.add_listener(self.invalidate)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] > now:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            if generation != self._generation:
+                return value
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, tables: Iterable[str]):
+        if self.tables.isdisjoint(tables):
+            return
+        with self._lock:
+            self._items.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "Кэш": self.name,
+                "Записей": len(self._items),
+                "Максимум записей": self.max_size,
+                "Время жизни, с": self.ttl,
+                "Попаданий": self.hits,
+                "Промахов": self.misses,
+                "Вытеснений": self.evictions,
+                "Сбросов": self.invalidations,
+            }
+
+
+def snapshot(value: Any, schema) -> Any:
+    # ORM объекты привязаны к сессии запроса, поэтому в кэш попадают схемы ответа
+    if value is None:
+        return None
+    if isinstance(value, list):
+        page = Page(schema.model_validate(item) for item in value)
+        page.next_cursor = getattr(value, 'next_cursor', None)
+        return page
+    return schema.model_validate(value)
+
+
+def get_cache_stats() -> List[Dict[str, Any]]:
+    return [cache.stats() for cache in _caches]
@@ -0,0 +1,150 @@
+import threading
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import event, insert, select, text, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from database import engine
+import models
+
+# Отслеживание записи в таблицы: изменения, сделанные через сессии SQLAlchemy,
+# увеличивают версии таблиц в table_versions в той же транзакции (общие для всех
+# процессов, используются для ETag), а после фиксации публикуются подписчикам
+# внутри процесса (кэши). Запись в обход приложения версии не меняет
+
+_lock = threading.Lock()
+_listeners: List[Callable[[Set[str]], None]] = []
+
+_SESSION_KEY = "changed_tables"
+
+table_versions = models.TableVersion.__table__
+
+# Служебные таблицы, запись в которые не меняет версий
+UNTRACKED_TABLES = {table_versions.name, models.ETLRunId.__tablename__}
+
+# Время изменения таблицы, в которую еще не было записи
+NEVER_MODIFIED = datetime(1970, 1, 1)
+
+
+def add_listener(callback: Callable[[Set[str]], None]):
+    # callback получает множество имен таблиц, измененных зафиксированной транзакцией
+    with _lock:
+        _listeners.append(callback)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def read_versions(tables: Iterable[str]) -> Dict[str, Tuple[int, datetime]]:
+    # Версия и время изменения (UTC) таблиц; для таблиц без записей - (0, NEVER_MODIFIED)
+    tables = list(tables)
+    versions = {table: (0, NEVER_MODIFIED) for table in tables}
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(table_versions.c.table_name, table_versions.c.version, table_versions.c.modified_at)
+            .where(table_versions.c.table_name.in_(tables)))
+        for table, version, modified_at in rows:
+            versions[table] = (version, modified_at)
+    return versions
+
+
+def _bump_versions(session: Session, tables: Iterable[str]):
+    # Таблицы обновляются в одном порядке во всех транзакциях, чтобы не было
+    # взаимных блокировок строк table_versions. Строка версии создается первой записью
+    # в таблицу одной командой upsert: две первые записи из разных транзакций не
+    # нарушают первичный ключ
+    now = utcnow()
+    dialect = session.get_bind().dialect.name
+    for table in sorted(tables):
+        if dialect in ('sqlite', 'postgresql'):
+            dialect_insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+            session.execute(
+                dialect_insert(table_versions).values(table_name=table, version=1, modified_at=now)
+                .on_conflict_do_update(index_elements=[table_versions.c.table_name],
+                                       set_={'version': table_versions.c.version + 1, 'modified_at': now}))
+        elif dialect == 'mssql':
+            session.execute(text(
+                "MERGE INTO table_versions WITH (HOLDLOCK) AS target "
+                "USING (SELECT :table_name AS table_name) AS source "
+                "ON target.table_name = source.table_name "
+                "WHEN MATCHED THEN UPDATE SET version = target.version + 1, modified_at = :modified_at "
+                "WHEN NOT MATCHED THEN INSERT (table_name, version, modified_at) "
+                "VALUES (source.table_name, 1, :modified_at);"
+            ), {'table_name': table, 'modified_at': now})
+        else:
+            result = session.execute(
+                update(table_versions).where(table_versions.c.table_name == table)
+                .values(version=table_versions.c.version + 1, modified_at=now))
+            if result.rowcount == 0:
+                session.execute(insert(table_versions).values(table_name=table, version=1, modified_at=now))
+
+
+def mark_changed(session: Session, *tables: str):
+    # Явная отметка для записи, выполненной в обход ORM (text(), Core)
+    session.info.setdefault(_SESSION_KEY, set()).update(tables)
+
+
+def has_changes(session: Session) -> bool:
+    # Были ли в текущей транзакции сессии операции записи
+    return bool(session.info.get(_SESSION_KEY))
+
+
+def publish(tables: Iterable[str]):
+    tables = set(tables)
+    if not tables:
+        return
+    with _lock:
+        listeners = list(_listeners)
+    for callback in listeners:
+        callback(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    changed = session.info.setdefault(_SESSION_KEY, set())
+    for instance in chain(session.new, session.dirty, session.deleted):
+        table = getattr(instance, "__table__", None)
+        if table is not None:
+            changed.add(table.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_executed_tables(orm_execute_state):
+    # Пакетные insert()/update()/delete() не проходят через flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and table.name not in UNTRACKED_TABLES:
+            mark_changed(orm_execute_state.session, table.name)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_committed_versions(session):
+    # Выполняется после пересчета сводок (rollups.py), которые тоже отмечают таблицы
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    tables = session.info.get(_SESSION_KEY)
+    if tables:
+        _bump_versions(session, tables)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_tables(session):
+    # Освобождение точки сохранения (begin_nested) не фиксирует транзакцию
+    if session.in_nested_transaction():
+        return
+    publish(session.info.pop(_SESSION_KEY, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_tables(session):
+    # После отката к точке сохранения таблицы остаются отмеченными: лишняя
+    # отметка только сбрасывает кэши, пропущенная оставила бы их устаревшими
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_SESSION_KEY, None)
@@ -1,404 +1,644 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+from typing import Any, Callable, Dict, List, Optional
 import models
 import schemas
 import logging
+from filters import ListQuery, NO_FILTERS
+from pagination import Keyset
+from reference_cache import IN_QUERY_CHUNK_SIZE, ReferenceCache
+from serialization import RowListSerializer
+import rollups  # noqa: F401 - пересчет сводных таблиц при фиксации записи
 
 
 logger = logging.getLogger("coffee_business_api")
+# Журнал чтений: самые частые записи, к нему применяется выборка LOG_READ_SAMPLE_RATE
+read_logger = logging.getLogger("coffee_business_api.reads")
+
+# Функции записи выполняют только flush: транзакцию запроса фиксирует UnitOfWorkRoute
+# (api/deps.py), вызывающий код вне API фиксирует ее сам
+
+
+# Быстрый путь списков (serialization.py): только поля ответа, строки без ORM объектов
+def get_rows(db: Session, rows: RowListSerializer, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+             list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка %s, пропуск=%s, лимит=%s", rows.columns[0].table.name, skip, limit)
+    keyset = list_query.keyset(rows.keyset)
+    statement = keyset.apply(list_query.filter(rows.statement(keyset)), skip, limit, after)
+    return keyset.page(db.execute(statement).all(), limit)
 
 
 # Equipment Service Status CRUD
-def get_equipment_service_statuses(db: Session, skip: int = 0, limit: int = 100):
-    logger.info(f"Получение списка статусов оборудования, пропуск={skip}, лимит={limit}")
-    return db.query(models.EquipmentServiceStatus).order_by(models.EquipmentServiceStatus.name).offset(skip).limit(limit).all()
+EQUIPMENT_SERVICE_STATUS_KEYSET = Keyset(models.EquipmentServiceStatus.name, models.EquipmentServiceStatus.id)
+
+def get_equipment_service_statuses(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    read_logger.info("Получение списка статусов оборудования, пропуск=%s, лимит=%s", skip, limit)
+    query = EQUIPMENT_SERVICE_STATUS_KEYSET.apply(db.query(models.EquipmentServiceStatus), skip, limit, after)
+    return EQUIPMENT_SERVICE_STATUS_KEYSET.page(query.all(), limit)
 
 def get_equipment_service_status(db: Session, status_id: str):
-    logger.info(f"Получение статуса оборудования по ID: {status_id}")
-    return db.query(models.EquipmentServiceStatus).filter(models.EquipmentServiceStatus.id == status_id).first()
+    read_logger.info("Получение статуса оборудования по ID: %s", status_id)
+    return db.get(models.EquipmentServiceStatus, status_id)
 
 
 # Coffee Product Type CRUD (только чтение)
-def get_coffee_product_types(db: Session, skip: int = 0, limit: int = 100):
-    logger.info(f"Получение списка типов кофейной продукции, пропуск={skip}, лимит={limit}")
-    return db.query(models.CoffeeProductType).order_by(models.CoffeeProductType.name).offset(skip).limit(limit).all()
+COFFEE_PRODUCT_TYPE_KEYSET = Keyset(models.CoffeeProductType.name, models.CoffeeProductType.id)
+
+def get_coffee_product_types(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    read_logger.info("Получение списка типов кофейной продукции, пропуск=%s, лимит=%s", skip, limit)
+    query = COFFEE_PRODUCT_TYPE_KEYSET.apply(db.query(models.CoffeeProductType), skip, limit, after)
+    return COFFEE_PRODUCT_TYPE_KEYSET.page(query.all(), limit)
 
 def get_coffee_product_type(db: Session, coffee_type_id: str):
-    logger.info(f"Получение типа кофейной продукции по ID: {coffee_type_id}")
-    return db.query(models.CoffeeProductType).filter(models.CoffeeProductType.id == coffee_type_id).first()
+    read_logger.info("Получение типа кофейной продукции по ID: %s", coffee_type_id)
+    return db.get(models.CoffeeProductType, coffee_type_id)
 
 
 # Department CRUD
-def get_departments(db: Session, skip: int = 0, limit: int = 100):
-    logger.info(f"Получение списка отделов, пропуск={skip}, лимит={limit}")
-    return db.query(models.Department).order_by(models.Department.name).offset(skip).limit(limit).all()
+DEPARTMENT_KEYSET = Keyset(models.Department.name, models.Department.id)
+DEPARTMENT_ROWS = RowListSerializer(schemas.Department, models.Department, DEPARTMENT_KEYSET)
+
+def get_departments(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                    list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка отделов, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(DEPARTMENT_KEYSET)
+    query = keyset.apply(list_query.filter(db.query(models.Department)), skip, limit, after)
+    return keyset.page(query.all(), limit)
 
 
 def get_department(db: Session, department_id: str):
-    logger.info(f"Получение отдела по ID: {department_id}")
-    return db.query(models.Department).filter(models.Department.id == department_id).first()
+    read_logger.info("Получение отдела по ID: %s", department_id)
+    return db.get(models.Department, department_id)
+
+
+# Руководитель загружается в том же запросе (LEFT OUTER JOIN)
+DEPARTMENT_DETAILS = [joinedload(models.Department.manager)]
+
+
+def get_departments_with_manager(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                                 list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка отделов с руководителями, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(DEPARTMENT_KEYSET)
+    query = keyset.apply(list_query.filter(db.query(models.Department).options(*DEPARTMENT_DETAILS)), skip, limit, after)
+    return keyset.page(query.all(), limit)
+
+
+def get_department_with_manager(db: Session, department_id: str):
+    read_logger.info("Получение отдела с руководителем по ID: %s", department_id)
+    return db.get(models.Department, department_id, options=DEPARTMENT_DETAILS)
 
 
 def create_department(db: Session, department: schemas.DepartmentCreate):
-    logger.info(f"Создание отдела: {department.name}")
+    logger.info("Создание отдела: %s", department.name)
     db_department = models.Department(**department.dict())
     db.add(db_department)
-    db.commit()
-    db.refresh(db_department)
-    logger.info(f"Создан отдел с ID: {db_department.id}")
+    db.flush()
+    logger.info("Создан отдел с ID: %s", db_department.id)
     return db_department
 
 
 def update_department(db: Session, department_id: str, department: schemas.DepartmentCreate):
-    logger.info(f"Обновление отдела с ID: {department_id}")
-    db_department = db.query(models.Department).filter(models.Department.id == department_id).first()
+    logger.info("Обновление отдела с ID: %s", department_id)
+    db_department = db.get(models.Department, department_id)
     if db_department:
         for key, value in department.dict().items():
             setattr(db_department, key, value)
-        db.commit()
-        db.refresh(db_department)
-        logger.info(f"Обновлен отдел с ID: {department_id}")
+        db.flush()
+        logger.info("Обновлен отдел с ID: %s", department_id)
     else:
-        logger.warning(f"Отдел с ID: {department_id} не найден")
+        logger.warning("Отдел с ID: %s не найден", department_id)
     return db_department
 
 
 def delete_department(db: Session, department_id: str):
-    logger.info(f"Удаление отдела с ID: {department_id}")
-    db_department = db.query(models.Department).filter(models.Department.id == department_id).first()
+    logger.info("Удаление отдела с ID: %s", department_id)
+    db_department = db.get(models.Department, department_id)
     if db_department:
         db.delete(db_department)
-        db.commit()
-        logger.info(f"Удален отдел с ID: {department_id}")
+        db.flush()
+        logger.info("Удален отдел с ID: %s", department_id)
     else:
-        logger.warning(f"Отдел с ID: {department_id} не найден")
+        logger.warning("Отдел с ID: %s не найден", department_id)
     return db_department
 
 
 # Workplace CRUD
-def get_workplaces(db: Session, skip: int = 0, limit: int = 100):
-    logger.info(f"Получение списка рабочих мест, пропуск={skip}, лимит={limit}")
-    return db.query(models.Workplace).order_by(models.Workplace.location).offset(skip).limit(limit).all()
+WORKPLACE_KEYSET = Keyset(models.Workplace.location, models.Workplace.id)
+WORKPLACE_ROWS = RowListSerializer(schemas.Workplace, models.Workplace, WORKPLACE_KEYSET)
+
+def get_workplaces(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                   list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка рабочих мест, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(WORKPLACE_KEYSET)
+    query = keyset.apply(list_query.filter(db.query(models.Workplace)), skip, limit, after)
+    return keyset.page(query.all(), limit)
 
 
 def get_workplace(db: Session, workplace_id: str):
-    logger.info(f"Получение рабочего места по ID: {workplace_id}")
-    return db.query(models.Workplace).filter(models.Workplace.id == workplace_id).first()
+    read_logger.info("Получение рабочего места по ID: %s", workplace_id)
+    return db.get(models.Workplace, workplace_id)
+
+
+WORKPLACE_DETAILS = [joinedload(models.Workplace.equipment_status)]
+
+
+def get_workplaces_with_status(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                               list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка рабочих мест со статусами, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(WORKPLACE_KEYSET)
+    query = keyset.apply(list_query.filter(db.query(models.Workplace).options(*WORKPLACE_DETAILS)), skip, limit, after)
+    return keyset.page(query.all(), limit)
+
+
+def get_workplace_with_status(db: Session, workplace_id: str):
+    read_logger.info("Получение рабочего места со статусом по ID: %s", workplace_id)
+    return db.get(models.Workplace, workplace_id, options=WORKPLACE_DETAILS)
 
 
 def create_workplace(db: Session, workplace: schemas.WorkplaceCreate):
-    logger.info(f"Создание рабочего места в локации: {workplace.location}")
+    logger.info("Создание рабочего места в локации: %s", workplace.location)
     db_workplace = models.Workplace(**workplace.dict())
     db.add(db_workplace)
-    db.commit()
-    db.refresh(db_workplace)
-    logger.info(f"Создано рабочее место с ID: {db_workplace.id}")
+    db.flush()
+    logger.info("Создано рабочее место с ID: %s", db_workplace.id)
     return db_workplace
 
 
 def update_workplace(db: Session, workplace_id: str, workplace: schemas.WorkplaceCreate):
-    logger.info(f"Обновление рабочего места с ID: {workplace_id}")
-    db_workplace = db.query(models.Workplace).filter(models.Workplace.id == workplace_id).first()
+    logger.info("Обновление рабочего места с ID: %s", workplace_id)
+    db_workplace = db.get(models.Workplace, workplace_id)
     if db_workplace:
         for key, value in workplace.dict().items():
             setattr(db_workplace, key, value)
-        db.commit()
-        db.refresh(db_workplace)
-        logger.info(f"Обновлено рабочее место с ID: {workplace_id}")
+        db.flush()
+        logger.info("Обновлено рабочее место с ID: %s", workplace_id)
     else:
-        logger.warning(f"Рабочее место с ID: {workplace_id} не найдено")
+        logger.warning("Рабочее место с ID: %s не найдено", workplace_id)
     return db_workplace
 
 
 def delete_workplace(db: Session, workplace_id: str):
-    logger.info(f"Удаление рабочего места с ID: {workplace_id}")
-    db_workplace = db.query(models.Workplace).filter(models.Workplace.id == workplace_id).first()
+    logger.info("Удаление рабочего места с ID: %s", workplace_id)
+    db_workplace = db.get(models.Workplace, workplace_id)
     if db_workplace:
         db.delete(db_workplace)
-        db.commit()
-        logger.info(f"Удалено рабочее место с ID: {workplace_id}")
+        db.flush()
+        logger.info("Удалено рабочее место с ID: %s", workplace_id)
     else:
-        logger.warning(f"Рабочее место с ID: {workplace_id} не найдено")
+        logger.warning("Рабочее место с ID: %s не найдено", workplace_id)
     return db_workplace
 
 
 # Employee CRUD
-def get_employees(db: Session, skip: int = 0, limit: int = 100):
-    logger.info(f"Получение списка сотрудников, пропуск={skip}, лимит={limit}")
-    return db.query(models.Employee).order_by(models.Employee.full_name).offset(skip).limit(limit).all()
+EMPLOYEE_KEYSET = Keyset(models.Employee.full_name, models.Employee.id)
+EMPLOYEE_ROWS = RowListSerializer(schemas.Employee, models.Employee, EMPLOYEE_KEYSET)
+
+def get_employees(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                  list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка сотрудников, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(EMPLOYEE_KEYSET)
+    query = keyset.apply(list_query.filter(db.query(models.Employee)), skip, limit, after)
+    return keyset.page(query.all(), limit)
 
 
 def get_employee(db: Session, employee_id: str):
-    logger.info(f"Получение сотрудника по ID: {employee_id}")
-    return db.query(models.Employee).filter(models.Employee.id == employee_id).first()
+    read_logger.info("Получение сотрудника по ID: %s", employee_id)
+    return db.get(models.Employee, employee_id)
+
+
+# Отдел, рабочее место и статус оборудования: связи "многие к одному",
+# загружаются одним SELECT с JOIN независимо от числа сотрудников
+EMPLOYEE_DETAILS = [
+    joinedload(models.Employee.department),
+    joinedload(models.Employee.workplace).joinedload(models.Workplace.equipment_status),
+]
+
+
+def get_employees_with_details(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                               list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка сотрудников с подробностями, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(EMPLOYEE_KEYSET)
+    query = keyset.apply(list_query.filter(db.query(models.Employee).options(*EMPLOYEE_DETAILS)), skip, limit, after)
+    return keyset.page(query.all(), limit)
+
+
+def get_employee_with_details(db: Session, employee_id: str):
+    read_logger.info("Получение сотрудника с подробностями по ID: %s", employee_id)
+    return db.get(models.Employee, employee_id, options=EMPLOYEE_DETAILS)
 
 
 def create_employee(db: Session, employee: schemas.EmployeeCreate):
-    logger.info(f"Создание сотрудника: {employee.full_name}")
+    logger.info("Создание сотрудника: %s", employee.full_name)
     db_employee = models.Employee(**employee.dict())
     db.add(db_employee)
-    db.commit()
-    db.refresh(db_employee)
-    logger.info(f"Создан сотрудник с ID: {db_employee.id}")
+    db.flush()
+    logger.info("Создан сотрудник с ID: %s", db_employee.id)
     return db_employee
 
 
 def update_employee(db: Session, employee_id: str, employee: schemas.EmployeeCreate):
-    logger.info(f"Обновление сотрудника с ID: {employee_id}")
-    db_employee = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
+    logger.info("Обновление сотрудника с ID: %s", employee_id)
+    db_employee = db.get(models.Employee, employee_id)
     if db_employee:
         for key, value in employee.dict().items():
             setattr(db_employee, key, value)
-        db.commit()
-        db.refresh(db_employee)
-        logger.info(f"Обновлен сотрудник с ID: {employee_id}")
+        db.flush()
+        logger.info("Обновлен сотрудник с ID: %s", employee_id)
     else:
-        logger.warning(f"Сотрудник с ID: {employee_id} не найден")
+        logger.warning("Сотрудник с ID: %s не найден", employee_id)
     return db_employee
 
 
 def delete_employee(db: Session, employee_id: str):
-    logger.info(f"Удаление сотрудника с ID: {employee_id}")
-    db_employee = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
+    logger.info("Удаление сотрудника с ID: %s", employee_id)
+    db_employee = db.get(models.Employee, employee_id)
     if db_employee:
         db.delete(db_employee)
-        db.commit()
-        logger.info(f"Удален сотрудник с ID: {employee_id}")
+        db.flush()
+        logger.info("Удален сотрудник с ID: %s", employee_id)
     else:
-        logger.warning(f"Сотрудник с ID: {employee_id} не найден")
+        logger.warning("Сотрудник с ID: %s не найден", employee_id)
     return db_employee
 
 
 # Project CRUD
-def get_projects(db: Session, skip: int = 0, limit: int = 100):
-    logger.info(f"Получение списка проектов, пропуск={skip}, лимит={limit}")
-    return db.query(models.Project).order_by(models.Project.start_date.desc()).offset(skip).limit(limit).all()
+PROJECT_KEYSET = Keyset(models.Project.start_date, models.Project.id, descending=True)
+PROJECT_ROWS = RowListSerializer(schemas.Project, models.Project, PROJECT_KEYSET)
+
+def get_projects(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                 list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка проектов, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(PROJECT_KEYSET)
+    query = keyset.apply(list_query.filter(db.query(models.Project)), skip, limit, after)
+    return keyset.page(query.all(), limit)
 
 
 def get_project(db: Session, project_id: str):
-    logger.info(f"Получение проекта по ID: {project_id}")
-    return db.query(models.Project).filter(models.Project.id == project_id).first()
+    read_logger.info("Получение проекта по ID: %s", project_id)
+    return db.get(models.Project, project_id)
 
 
 def create_project(db: Session, project: schemas.ProjectCreate):
-    logger.info(f"Создание проекта: {project.name}")
+    logger.info("Создание проекта: %s", project.name)
     db_project = models.Project(**project.dict())
     db.add(db_project)
-    db.commit()
-    db.refresh(db_project)
-    logger.info(f"Создан проект с ID: {db_project.id}")
+    db.flush()
+    logger.info("Создан проект с ID: %s", db_project.id)
     return db_project
 
 
 def update_project(db: Session, project_id: str, project: schemas.ProjectCreate):
-    logger.info(f"Обновление проекта с ID: {project_id}")
-    db_project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    logger.info("Обновление проекта с ID: %s", project_id)
+    db_project = db.get(models.Project, project_id)
     if db_project:
         for key, value in project.dict().items():
             setattr(db_project, key, value)
-        db.commit()
-        db.refresh(db_project)
-        logger.info(f"Обновлен проект с ID: {project_id}")
+        db.flush()
+        logger.info("Обновлен проект с ID: %s", project_id)
     else:
-        logger.warning(f"Проект с ID: {project_id} не найден")
+        logger.warning("Проект с ID: %s не найден", project_id)
     return db_project
 
 
 def delete_project(db: Session, project_id: str):
-    logger.info(f"Удаление проекта с ID: {project_id}")
-    db_project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    logger.info("Удаление проекта с ID: %s", project_id)
+    db_project = db.get(models.Project, project_id)
     if db_project:
         db.delete(db_project)
-        db.commit()
-        logger.info(f"Удален проект с ID: {project_id}")
+        db.flush()
+        logger.info("Удален проект с ID: %s", project_id)
     else:
-        logger.warning(f"Проект с ID: {project_id} не найден")
+        logger.warning("Проект с ID: %s не найден", project_id)
     return db_project
 
 
 # Client CRUD
-def get_clients(db: Session, skip: int = 0, limit: int = 100):
-    logger.info(f"Получение списка клиентов, пропуск={skip}, лимит={limit}")
-    return db.query(models.Client).order_by(models.Client.full_name).offset(skip).limit(limit).all()
+CLIENT_KEYSET = Keyset(models.Client.full_name, models.Client.id)
+CLIENT_ROWS = RowListSerializer(schemas.Client, models.Client, CLIENT_KEYSET)
+
+def get_clients(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка клиентов, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(CLIENT_KEYSET)
+    query = keyset.apply(list_query.filter(db.query(models.Client)), skip, limit, after)
+    return keyset.page(query.all(), limit)
 
 
 def get_client(db: Session, client_id: str):
-    logger.info(f"Получение клиента по ID: {client_id}")
-    return db.query(models.Client).filter(models.Client.id == client_id).first()
+    read_logger.info("Получение клиента по ID: %s", client_id)
+    return db.get(models.Client, client_id)
 
 
 def create_client(db: Session, client: schemas.ClientCreate):
-    logger.info(f"Создание клиента: {client.full_name}")
+    logger.info("Создание клиента: %s", client.full_name)
     db_client = models.Client(**client.dict())
     db.add(db_client)
-    db.commit()
-    db.refresh(db_client)
-    logger.info(f"Создан клиент с ID: {db_client.id}")
+    db.flush()
+    logger.info("Создан клиент с ID: %s", db_client.id)
     return db_client
 
 
 def update_client(db: Session, client_id: str, client: schemas.ClientCreate):
-    logger.info(f"Обновление клиента с ID: {client_id}")
-    db_client = db.query(models.Client).filter(models.Client.id == client_id).first()
+    logger.info("Обновление клиента с ID: %s", client_id)
+    db_client = db.get(models.Client, client_id)
     if db_client:
         for key, value in client.dict().items():
             setattr(db_client, key, value)
-        db.commit()
-        db.refresh(db_client)
-        logger.info(f"Обновлен клиент с ID: {client_id}")
+        db.flush()
+        logger.info("Обновлен клиент с ID: %s", client_id)
     else:
-        logger.warning(f"Клиент с ID: {client_id} не найден")
+        logger.warning("Клиент с ID: %s не найден", client_id)
     return db_client
 
 
 def delete_client(db: Session, client_id: str):
-    logger.info(f"Удаление клиента с ID: {client_id}")
-    db_client = db.query(models.Client).filter(models.Client.id == client_id).first()
+    logger.info("Удаление клиента с ID: %s", client_id)
+    db_client = db.get(models.Client, client_id)
     if db_client:
         db.delete(db_client)
-        db.commit()
-        logger.info(f"Удален клиент с ID: {client_id}")
+        db.flush()
+        logger.info("Удален клиент с ID: %s", client_id)
     else:
-        logger.warning(f"Клиент с ID: {client_id} не найден")
+        logger.warning("Клиент с ID: %s не найден", client_id)
     return db_client
 
 
 # Business Process CRUD
-def get_business_processes(db: Session, skip: int = 0, limit: int = 100):
-    logger.info(f"Получение списка бизнес-процессов, пропуск={skip}, лимит={limit}")
-    return db.query(models.BusinessProcess).order_by(models.BusinessProcess.name).offset(skip).limit(limit).all()
+BUSINESS_PROCESS_KEYSET = Keyset(models.BusinessProcess.name, models.BusinessProcess.id)
+BUSINESS_PROCESS_ROWS = RowListSerializer(schemas.BusinessProcess, models.BusinessProcess, BUSINESS_PROCESS_KEYSET)
+
+def get_business_processes(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                           list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка бизнес-процессов, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(BUSINESS_PROCESS_KEYSET)
+    query = keyset.apply(list_query.filter(db.query(models.BusinessProcess)), skip, limit, after)
+    return keyset.page(query.all(), limit)
 
 
 def get_business_process(db: Session, process_id: str):
-    logger.info(f"Получение бизнес-процесса по ID: {process_id}")
-    return db.query(models.BusinessProcess).filter(models.BusinessProcess.id == process_id).first()
+    read_logger.info("Получение бизнес-процесса по ID: %s", process_id)
+    return db.get(models.BusinessProcess, process_id)
 
 
 def create_business_process(db: Session, business_process: schemas.BusinessProcessCreate):
-    logger.info(f"Создание бизнес-процесса: {business_process.name}")
+    logger.info("Создание бизнес-процесса: %s", business_process.name)
     db_process = models.BusinessProcess(**business_process.dict())
     db.add(db_process)
-    db.commit()
-    db.refresh(db_process)
-    logger.info(f"Создан бизнес-процесс с ID: {db_process.id}")
+    db.flush()
+    logger.info("Создан бизнес-процесс с ID: %s", db_process.id)
     return db_process
 
 
 def update_business_process(db: Session, process_id: str, business_process: schemas.BusinessProcessCreate):
-    logger.info(f"Обновление бизнес-процесса с ID: {process_id}")
-    db_process = db.query(models.BusinessProcess).filter(models.BusinessProcess.id == process_id).first()
+    logger.info("Обновление бизнес-процесса с ID: %s", process_id)
+    db_process = db.get(models.BusinessProcess, process_id)
     if db_process:
         for key, value in business_process.dict().items():
             setattr(db_process, key, value)
-        db.commit()
-        db.refresh(db_process)
-        logger.info(f"Обновлен бизнес-процесс с ID: {process_id}")
+        db.flush()
+        logger.info("Обновлен бизнес-процесс с ID: %s", process_id)
     else:
-        logger.warning(f"Бизнес-процесс с ID: {process_id} не найден")
+        logger.warning("Бизнес-процесс с ID: %s не найден", process_id)
     return db_process
 
 
 def delete_business_process(db: Session, process_id: str):
-    logger.info(f"Удаление бизнес-процесса с ID: {process_id}")
-    db_process = db.query(models.BusinessProcess).filter(models.BusinessProcess.id == process_id).first()
+    logger.info("Удаление бизнес-процесса с ID: %s", process_id)
+    db_process = db.get(models.BusinessProcess, process_id)
     if db_process:
         db.delete(db_process)
-        db.commit()
-        logger.info(f"Удален бизнес-процесс с ID: {process_id}")
+        db.flush()
+        logger.info("Удален бизнес-процесс с ID: %s", process_id)
     else:
-        logger.warning(f"Бизнес-процесс с ID: {process_id} не найден")
+        logger.warning("Бизнес-процесс с ID: %s не найден", process_id)
     return db_process
 
 
 # Purchase CRUD
-def get_purchases(db: Session, skip: int = 0, limit: int = 100):
-    logger.info(f"Получение списка закупок, пропуск={skip}, лимит={limit}")
-    return db.query(models.Purchase).order_by(models.Purchase.date.desc()).offset(skip).limit(limit).all()
+PURCHASE_KEYSET = Keyset(models.Purchase.date, models.Purchase.id, descending=True)
+PURCHASE_ROWS = RowListSerializer(schemas.Purchase, models.Purchase, PURCHASE_KEYSET)
+
+def get_purchases(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                  list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка закупок, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(PURCHASE_KEYSET)
+    query = keyset.apply(list_query.filter(db.query(models.Purchase)), skip, limit, after)
+    return keyset.page(query.all(), limit)
 
 
 def get_purchase(db: Session, purchase_id: str):
-    logger.info(f"Получение закупки по ID: {purchase_id}")
-    return db.query(models.Purchase).filter(models.Purchase.id == purchase_id).first()
+    read_logger.info("Получение закупки по ID: %s", purchase_id)
+    return db.get(models.Purchase, purchase_id)
 
 
 def create_purchase(db: Session, purchase: schemas.PurchaseCreate):
-    logger.info(f"Создание закупки от поставщика: {purchase.supplier}")
+    logger.info("Создание закупки от поставщика: %s", purchase.supplier)
     db_purchase = models.Purchase(**purchase.dict())
     db.add(db_purchase)
-    db.commit()
-    db.refresh(db_purchase)
-    logger.info(f"Создана закупка с ID: {db_purchase.id}")
+    db.flush()
+    logger.info("Создана закупка с ID: %s", db_purchase.id)
     return db_purchase
 
 
 def update_purchase(db: Session, purchase_id: str, purchase: schemas.PurchaseCreate):
-    logger.info(f"Обновление закупки с ID: {purchase_id}")
-    db_purchase = db.query(models.Purchase).filter(models.Purchase.id == purchase_id).first()
+    logger.info("Обновление закупки с ID: %s", purchase_id)
+    db_purchase = db.get(models.Purchase, purchase_id)
     if db_purchase:
         for key, value in purchase.dict().items():
             setattr(db_purchase, key, value)
-        db.commit()
-        db.refresh(db_purchase)
-        logger.info(f"Обновлена закупка с ID: {purchase_id}")
+        db.flush()
+        logger.info("Обновлена закупка с ID: %s", purchase_id)
     else:
-        logger.warning(f"Закупка с ID: {purchase_id} не найдена")
+        logger.warning("Закупка с ID: %s не найдена", purchase_id)
     return db_purchase
 
 
 def delete_purchase(db: Session, purchase_id: str):
-    logger.info(f"Удаление закупки с ID: {purchase_id}")
-    db_purchase = db.query(models.Purchase).filter(models.Purchase.id == purchase_id).first()
+    logger.info("Удаление закупки с ID: %s", purchase_id)
+    db_purchase = db.get(models.Purchase, purchase_id)
     if db_purchase:
         db.delete(db_purchase)
-        db.commit()
-        logger.info(f"Удалена закупка с ID: {purchase_id}")
+        db.flush()
+        logger.info("Удалена закупка с ID: %s", purchase_id)
     else:
-        logger.warning(f"Закупка с ID: {purchase_id} не найдена")
+        logger.warning("Закупка с ID: %s не найдена", purchase_id)
     return db_purchase
 
 
 # Service Request CRUD
-def get_service_requests(db: Session, skip: int = 0, limit: int = 100):
-    logger.info(f"Получение списка заявок на обслуживание, пропуск={skip}, лимит={limit}")
-    return db.query(models.ServiceRequest).order_by(models.ServiceRequest.request_date.desc()).offset(skip).limit(limit).all()
+SERVICE_REQUEST_KEYSET = Keyset(models.ServiceRequest.request_date, models.ServiceRequest.id, descending=True)
+SERVICE_REQUEST_ROWS = RowListSerializer(schemas.ServiceRequest, models.ServiceRequest, SERVICE_REQUEST_KEYSET)
+
+def get_service_requests(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                         list_query: ListQuery = NO_FILTERS):
+    read_logger.info("Получение списка заявок на обслуживание, пропуск=%s, лимит=%s", skip, limit)
+    keyset = list_query.keyset(SERVICE_REQUEST_KEYSET)
+    query = keyset.apply(list_query.filter(db.query(models.ServiceRequest)), skip, limit, after)
+    return keyset.page(query.all(), limit)
 
 
 def get_service_request(db: Session, request_id: str):
-    logger.info(f"Получение заявки на обслуживание по ID: {request_id}")
-    return db.query(models.ServiceRequest).filter(models.ServiceRequest.id == request_id).first()
+    read_logger.info("Получение заявки на обслуживание по ID: %s", request_id)
+    return db.get(models.ServiceRequest, request_id)
 
 
 def create_service_request(db: Session, service_request: schemas.ServiceRequestCreate):
-    logger.info(f"Создание заявки на обслуживание")
+    logger.info("Создание заявки на обслуживание")
     db_request = models.ServiceRequest(**service_request.dict())
     db.add(db_request)
-    db.commit()
-    db.refresh(db_request)
-    logger.info(f"Создана заявка на обслуживание с ID: {db_request.id}")
+    db.flush()
+    logger.info("Создана заявка на обслуживание с ID: %s", db_request.id)
     return db_request
 
 
 def update_service_request(db: Session, request_id: str, service_request: schemas.ServiceRequestCreate):
-    logger.info(f"Обновление заявки на обслуживание с ID: {request_id}")
-    db_request = db.query(models.ServiceRequest).filter(models.ServiceRequest.id == request_id).first()
+    logger.info("Обновление заявки на обслуживание с ID: %s", request_id)
+    db_request = db.get(models.ServiceRequest, request_id)
     if db_request:
         for key, value in service_request.dict().items():
             setattr(db_request, key, value)
-        db.commit()
-        db.refresh(db_request)
-        logger.info(f"Обновлена заявка на обслуживание с ID: {request_id}")
+        db.flush()
+        logger.info("Обновлена заявка на обслуживание с ID: %s", request_id)
     else:
-        logger.warning(f"Заявка на обслуживание с ID: {request_id} не найдена")
+        logger.warning("Заявка на обслуживание с ID: %s не найдена", request_id)
     return db_request
 
 
 def delete_service_request(db: Session, request_id: str):
-    logger.info(f"Удаление заявки на обслуживание с ID: {request_id}")
-    db_request = db.query(models.ServiceRequest).filter(models.ServiceRequest.id == request_id).first()
+    logger.info("Удаление заявки на обслуживание с ID: %s", request_id)
+    db_request = db.get(models.ServiceRequest, request_id)
     if db_request:
         db.delete(db_request)
-        db.commit()
-        logger.info(f"Удалена заявка на обслуживание с ID: {request_id}")
+        db.flush()
+        logger.info("Удалена заявка на обслуживание с ID: %s", request_id)
     else:
-        logger.warning(f"Заявка на обслуживание с ID: {request_id} не найдена")
-    return db_request
\ No newline at end of file
+        logger.warning("Заявка на обслуживание с ID: %s не найдена", request_id)
+    return db_request
+
+
+# Bulk CRUD
+# Пакетные операции: один проход проверки, запись executemany в транзакции запроса
+# и статус по каждому элементу. Существование записей и внешние ключи проверяются
+# запросами IN по всему пакету; если пакетная запись все же нарушает ограничение БД,
+# элементы записываются по одному в точках сохранения, чтобы определить ошибочные
+
+def _existing_ids(db: Session, model, ids: List[str]) -> set:
+    found = set()
+    unique_ids = list(dict.fromkeys(ids))
+    for start in range(0, len(unique_ids), IN_QUERY_CHUNK_SIZE):
+        chunk = unique_ids[start:start + IN_QUERY_CHUNK_SIZE]
+        found.update(db.scalars(select(model.id).where(model.id.in_(chunk))))
+    return found
+
+
+def _check_rows(db: Session, model, rows: List[Dict[str, Any]], errors: Dict[str, str]):
+    # Обязательные поля и внешние ключи
+    references = ReferenceCache()
+    for column in model.__table__.columns:
+        if not column.nullable and not column.primary_key:
+            for row in rows:
+                if column.name in row and row[column.name] is None and row['id'] not in errors:
+                    errors[row['id']] = f"Поле {column.name} не может быть пустым"
+        if column.foreign_keys:
+            target = next(iter(column.foreign_keys)).column
+            values = {row[column.name] for row in rows if row.get(column.name) is not None}
+            missing = values - references.existing_values(db, target, values)
+            for row in rows:
+                if row.get(column.name) in missing and row['id'] not in errors:
+                    errors[row['id']] = f"Несуществующий {column.name}: {row[column.name]}"
+
+
+def _write_batch(db: Session, rows: List[Dict[str, Any]], execute: Callable[[List[Dict[str, Any]]], Any],
+                 errors: Dict[str, str]):
+    if not rows:
+        return
+    savepoint = db.begin_nested()
+    try:
+        execute(rows)
+        savepoint.commit()
+        return
+    except IntegrityError:
+        savepoint.rollback()
+
+    for row in rows:
+        savepoint = db.begin_nested()
+        try:
+            execute([row])
+            savepoint.commit()
+        except IntegrityError as e:
+            savepoint.rollback()
+            errors[row['id']] = f"Нарушение ограничения БД: {e.orig}"
+
+
+def _bulk_result(ids: List[str], status: str, errors: Dict[str, str]) -> schemas.BulkResult:
+    items = [
+        schemas.BulkItemResult(id=item_id, status="error", detail=errors[item_id]) if item_id in errors
+        else schemas.BulkItemResult(id=item_id, status=status)
+        for item_id in ids
+    ]
+    failed = sum(1 for item in items if item.status == "error")
+    return schemas.BulkResult(processed=len(items), succeeded=len(items) - failed, failed=failed, items=items)
+
+
+def _duplicate_errors(ids: List[str]) -> Dict[str, str]:
+    seen = set()
+    errors = {}
+    for item_id in ids:
+        if item_id in seen:
+            errors[item_id] = "ID повторяется в пакете"
+        seen.add(item_id)
+    return errors
+
+
+def bulk_create(db: Session, model, items: List[Any]) -> schemas.BulkResult:
+    logger.info("Пакетное создание %s: %s записей", model.__tablename__, len(items))
+    rows = [item.model_dump() for item in items]
+    ids = [row['id'] for row in rows]
+    errors = _duplicate_errors(ids)
+    for item_id in _existing_ids(db, model, ids):
+        errors[item_id] = "Запись с таким ID уже существует"
+    _check_rows(db, model, rows, errors)
+
+    new_rows = [row for row in rows if row['id'] not in errors]
+    _write_batch(db, new_rows, lambda batch: db.execute(insert(model), batch), errors)
+    logger.info("Пакетное создание %s: добавлено %s, ошибок %s", model.__tablename__, len(ids) - len(errors), len(errors))
+    return _bulk_result(ids, "created", errors)
+
+
+def bulk_update(db: Session, model, items: List[Any]) -> schemas.BulkResult:
+    logger.info("Пакетное обновление %s: %s записей", model.__tablename__, len(items))
+    # Обновляются только переданные поля
+    rows = [item.model_dump(exclude_unset=True) for item in items]
+    ids = [row['id'] for row in rows]
+    errors = _duplicate_errors(ids)
+    existing = _existing_ids(db, model, ids)
+    for item_id in ids:
+        if item_id not in existing:
+            errors[item_id] = "Запись не найдена"
+    _check_rows(db, model, rows, errors)
+
+    changed_rows = [row for row in rows if row['id'] not in errors and len(row) > 1]
+    _write_batch(db, changed_rows, lambda batch: db.execute(update(model), batch), errors)
+    logger.info("Пакетное обновление %s: обновлено %s, ошибок %s", model.__tablename__, len(ids) - len(errors), len(errors))
+    return _bulk_result(ids, "updated", errors)
+
+
+def bulk_delete(db: Session, model, ids: List[str]) -> schemas.BulkResult:
+    logger.info("Пакетное удаление %s: %s записей", model.__tablename__, len(ids))
+    errors = _duplicate_errors(ids)
+    existing = _existing_ids(db, model, ids)
+    for item_id in ids:
+        if item_id not in existing:
+            errors[item_id] = "Запись не найдена"
+
+    rows = [{'id': item_id} for item_id in ids if item_id not in errors]
+
+    def delete_batch(batch):
+        batch_ids = [row['id'] for row in batch]
+        for start in range(0, len(batch_ids), IN_QUERY_CHUNK_SIZE):
+            db.execute(delete(model).where(model.id.in_(batch_ids[start:start + IN_QUERY_CHUNK_SIZE])))
+
+    _write_batch(db, rows, delete_batch, errors)
+    logger.info("Пакетное удаление %s: удалено %s, ошибок %s", model.__tablename__, len(ids) - len(errors), len(errors))
+    return _bulk_result(ids, "deleted", errors)
@@ -1,14 +1,150 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import QueuePool
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-engine = create_engine(DATABASE_URL, echo=False)
+
+def env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+# Настройки пула соединений
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '20'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+# Время жизни соединения в секундах, -1 - без ограничения
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+# Проверка соединения перед выдачей из пула (разорванные соединения после переключения БД)
+DB_POOL_PRE_PING = env_flag('DB_POOL_PRE_PING', 'true')
+# Передача параметров executemany одним пакетом для pyodbc (пакетная загрузка ETL)
+DB_FAST_EXECUTEMANY = env_flag('DB_FAST_EXECUTEMANY', 'true')
+
+
+class PoolStats:
+    # Счетчики работы пула соединений
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+
+    def increment(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_wait(self, elapsed: float, timed_out: bool):
+        with self._lock:
+            self.waits += 1
+            self.wait_time += elapsed
+            self.max_wait_time = max(self.max_wait_time, elapsed)
+            if timed_out:
+                self.timeouts += 1
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    # QueuePool с учетом ожиданий свободного соединения. Переопределяется только
+    # открытый метод connect(); состояние пула читается открытыми методами,
+    # предел переполнения - из настройки DB_MAX_OVERFLOW
+    def connect(self):
+        exhausted = (
+            self.checkedin() == 0 and
+            DB_MAX_OVERFLOW > -1 and
+            self.overflow() >= DB_MAX_OVERFLOW
+        )
+        if not exhausted:
+            return super().connect()
+
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - started, timed_out)
+
+
+engine_options = {'echo': False}
+
+url = make_url(DATABASE_URL)
+if url.get_backend_name() != 'sqlite':
+    engine_options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+if url.get_backend_name() == 'mssql' and url.get_driver_name() == 'pyodbc':
+    engine_options['fast_executemany'] = DB_FAST_EXECUTEMANY
+
+engine = create_engine(DATABASE_URL, **engine_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_stats.increment('connects')
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_stats.increment('checkouts')
+
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    pool_stats.increment('checkins')
+
+
+@event.listens_for(engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_stats.increment('invalidations')
+
+
+def get_pool_status() -> dict:
+    pool = engine.pool
+    status = {
+        "Тип пула": type(pool).__name__,
+        "Проверка соединений": engine_options.get('pool_pre_ping', False),
+        "Время жизни соединения": engine_options.get('pool_recycle', -1),
+        "Создано соединений": pool_stats.connects,
+        "Выдано соединений": pool_stats.checkouts,
+        "Возвращено соединений": pool_stats.checkins,
+        "Сброшено соединений": pool_stats.invalidations,
+        "Ожиданий соединения": pool_stats.waits,
+        "Время ожидания, с": round(pool_stats.wait_time, 3),
+        "Максимальное ожидание, с": round(pool_stats.max_wait_time, 3),
+        "Таймаутов ожидания": pool_stats.timeouts,
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            "Размер пула": pool.size(),
+            "Максимальное переполнение": engine_options.get('max_overflow', DB_MAX_OVERFLOW),
+            "Таймаут ожидания": pool.timeout(),
+            "Свободно в пуле": pool.checkedin(),
+            "Используется": pool.checkedout(),
+            "Переполнение": max(pool.overflow(), 0),
+        })
+    return status
@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+from database import SessionLocal
+from etl_pipeline import ETLPipeline
+import metrics
+
+logger = logging.getLogger("barista_api")
+
+# Число одновременно выполняемых ETL задач
+ETL_MAX_WORKERS = int(os.getenv('ETL_MAX_WORKERS', '2'))
+
+# Число задач, ожидающих свободного обработчика
+ETL_MAX_PENDING_JOBS = int(os.getenv('ETL_MAX_PENDING_JOBS', '10'))
+
+# Сколько завершенных задач хранится для опроса статуса
+ETL_JOB_HISTORY = int(os.getenv('ETL_JOB_HISTORY', '100'))
+
+
+class ETLQueueFullError(Exception):
+    pass
+
+
+class ETLJob:
+    def __init__(self, file_name: str, file_path: str, model_type: str, streaming: bool, on_conflict: str = 'skip'):
+        self.id = uuid.uuid4().hex
+        self.file_name = file_name
+        self.file_path = file_path
+        self.model_type = model_type
+        self.streaming = streaming
+        self.on_conflict = on_conflict
+        self.status = "queued"
+        self.pipeline: Optional[ETLPipeline] = None
+        self.validation_errors = None
+        self.added_count = 0
+        self.skipped_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("success", "error")
+
+    def to_dict(self) -> dict:
+        progress = self.pipeline.progress if self.pipeline else {}
+        return {
+            "ID задачи": self.id,
+            "Имя файла": self.file_name,
+            "Тип данных": self.model_type,
+            "Режим конфликтов": self.on_conflict,
+            "Статус": self.status,
+            "Прочитано строк": progress.get('rows_read', 0),
+            "Проверено строк": progress.get('rows_validated', 0),
+            "Загружено строк": progress.get('rows_loaded', 0),
+            "Добавлено записей": self.added_count,
+            "Обновлено записей": self.updated_count,
+            "Без изменений": self.unchanged_count,
+            "Пропущено записей": self.skipped_count,
+            "Запросов к БД": self.db_queries,
+            "Время запросов к БД, с": round(self.db_time, 3),
+            "Ошибки валидации": self.validation_errors,
+            "Текст": self.error,
+            "Создана": self.created_at,
+            "Запущена": self.started_at,
+            "Завершена": self.finished_at,
+        }
+
+
+_executor = ThreadPoolExecutor(max_workers=ETL_MAX_WORKERS, thread_name_prefix="etl")
+_slots = threading.BoundedSemaphore(ETL_MAX_WORKERS + ETL_MAX_PENDING_JOBS)
+_jobs: "OrderedDict[str, ETLJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def submit_job(file_name: str, file_path: str, model_type: str = "employees", streaming: bool = False,
+               on_conflict: str = 'skip') -> ETLJob:
+    # Очередь ограничена: при переполнении новая задача не принимается
+    if not _slots.acquire(blocking=False):
+        raise ETLQueueFullError("Очередь ETL задач переполнена")
+
+    job = ETLJob(file_name, file_path, model_type, streaming, on_conflict)
+    with _jobs_lock:
+        _jobs[job.id] = job
+        _prune_jobs()
+
+    try:
+        _executor.submit(_run_job, job)
+    except Exception:
+        _slots.release()
+        raise
+
+    logger.info("ETL задача %s поставлена в очередь (%s, %s)", job.id, file_name, model_type)
+    return job
+
+
+def get_job(job_id: str) -> Optional[ETLJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def _prune_jobs():
+    finished = [job_id for job_id, job in _jobs.items() if job.finished]
+    for job_id in finished[:max(0, len(finished) - ETL_JOB_HISTORY)]:
+        del _jobs[job_id]
+
+
+def _run_job(job: ETLJob):
+    job.status = "running"
+    job.started_at = datetime.now()
+    logger.info("Запуск ETL задачи %s", job.id)
+
+    db = SessionLocal()
+    try:
+        job.pipeline = ETLPipeline(job.file_path, db, model_type=job.model_type, on_conflict=job.on_conflict)
+        # Число запросов к БД на задачу показывает построчные запросы при загрузке
+        with metrics.track_queries() as stats:
+            try:
+                job.validation_errors, job.added_count = job.pipeline.run(streaming=job.streaming)
+            finally:
+                job.db_queries, job.db_time = stats.queries, stats.db_time
+                metrics.ETL_JOB_QUERIES.observe(stats.queries, job.model_type)
+                metrics.ETL_JOB_DB_DURATION.observe(stats.db_time, job.model_type)
+        job.skipped_count = job.pipeline.skipped_count
+        job.updated_count = job.pipeline.updated_count
+        job.unchanged_count = job.pipeline.unchanged_count
+
+        # Проверяем, есть ли КРИТИЧЕСКИЕ ошибки валидации
+        critical_errors = bool(
+            job.validation_errors['missing_columns'] or
+            job.validation_errors['duplicate_ids']
+        )
+        if critical_errors:
+            job.status = "error"
+            job.error = "Файл содержит критические ошибки валидации"
+        else:
+            job.status = "success"
+            job.error = "Файл успешно обработан"
+
+    except Exception as e:
+        logger.error("Ошибка ETL задачи %s: %s", job.id, e)
+        job.status = "error"
+        job.error = f"Внутренняя ошибка сервера при обработке файла: {str(e)}"
+
+    finally:
+        db.close()
+        if os.path.exists(job.file_path):
+            os.unlink(job.file_path)
+        job.finished_at = datetime.now()
+        _slots.release()
+        logger.info("ETL задача %s завершена со статусом %s", job.id, job.status)
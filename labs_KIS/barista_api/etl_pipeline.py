@@ -1,56 +1,168 @@
 import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import Date, Numeric, String, delete, func, insert, select, text, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 import logging
-from typing import Dict, List, Any
-import re
+import uuid
+from typing import Dict, List, Any, Iterator, Tuple
 
+import change_tracking
 import models
+from reference_cache import ReferenceCache, get_reference_cache
+import rollups
+from validation_rules import RuleSet, ValidationResult, format_rows
 
 logger = logging.getLogger("barista_api")
 
+# Размер пакета строк для пакетной загрузки
+DEFAULT_CHUNK_SIZE = 5000
+
+# Обработка строк с уже существующим ID:
+# skip - пропустить, update - обновить непустыми значениями из файла,
+# replace - заменить значения всех столбцов файла (пустые значения записываются как NULL)
+ON_CONFLICT_MODES = ('skip', 'update', 'replace')
+
+# ID строк, обработанных потоковыми ETL процессами, по идентификатору запуска
+ETL_RUN_IDS = models.ETLRunId.__table__
+
+# Модели, доступные для загрузки, по имени таблицы. Список задан явно: сводные
+# таблицы (rollups.py) только вычисляются из исходных и из файла не загружаются
+MODEL_MAPPING = {
+    model.__tablename__: model
+    for model in sorted([
+        models.BusinessProcess,
+        models.Client,
+        models.CoffeeProductType,
+        models.Department,
+        models.Employee,
+        models.EquipmentServiceStatus,
+        models.Project,
+        models.Purchase,
+        models.ServiceRequest,
+        models.Workplace,
+    ], key=lambda model: model.__tablename__)
+}
+
+
+def get_required_fields(model_class) -> List[str]:
+    # Обязательные поля - столбцы таблицы с ограничением NOT NULL
+    return [column.name for column in model_class.__table__.columns if not column.nullable]
+
+
+def get_columns_of_type(model_class, column_type) -> List[str]:
+    return [column.name for column in model_class.__table__.columns if isinstance(column.type, column_type)]
+
 
 class ETLPipeline:
-    def __init__(self, file_path: str, db: Session, model_type: str = "employees"):
+    def __init__(self, file_path: str, db: Session, model_type: str = "employees",
+                 bulk: bool = True, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 reference_cache: ReferenceCache = None, on_conflict: str = 'skip'):
+        if on_conflict not in ON_CONFLICT_MODES:
+            raise ValueError(f"Неизвестный режим on_conflict: {on_conflict}")
+
         self.file_path = file_path
         self.db = db
         self.model_type = model_type
         self.data = None
-
-        # Только модель сотрудников
-        self.model_mapping = {
-            'employees': models.Employee,
-        }
-
-        # Только обязательные поля для сотрудников
+        self.bulk = bulk
+        self.chunk_size = chunk_size
+        self.on_conflict = on_conflict
+        self.skipped_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+
+        # Кэш ключей справочников, общий для validate() и load()
+        self.reference_cache = reference_cache or get_reference_cache()
+
+        # Правила проверки компилируются при первом обращении, результат
+        # последней проверки используется при загрузке
+        self._rules = None
+        self.validation_result = None
+
+        # Счетчики хода выполнения, доступные во время работы процесса
+        self.progress = {'rows_read': 0, 'rows_validated': 0, 'rows_loaded': 0}
+
+        # Состав полей, типы и внешние ключи определяются по моделям SQLAlchemy
+        self.model_mapping = MODEL_MAPPING
         self.required_fields = {
-            'employees': ['id', 'department_id', 'full_name', 'position', 'workplace_id', 'hire_date'],
+            name: get_required_fields(model_class) for name, model_class in MODEL_MAPPING.items()
         }
 
     def extract(self) -> pd.DataFrame:
-        logger.info(f"Начало извлечения данных из {self.file_path} для модели {self.model_type}")
+        logger.info("Начало извлечения данных из %s для модели %s", self.file_path, self.model_type)
         try:
             if self.file_path.endswith(('.xls', '.xlsx')):
-                self.data = pd.read_excel(self.file_path)
+                self.data = pd.read_excel(self.file_path, dtype=str)
             elif self.file_path.endswith('.csv'):
-                self.data = pd.read_csv(self.file_path)
+                self.data = pd.read_csv(self.file_path, dtype=str)
             else:
                 raise ValueError("Неподдерживаемый формат файла")
 
-            logger.info(f"Успешно извлечено {len(self.data)} строк")
+            logger.info("Успешно извлечено %s строк", len(self.data))
+            self.progress['rows_read'] = len(self.data)
             self.data.columns = self.data.columns.str.lower().str.strip()
             return self.data
         except Exception as e:
-            logger.error(f"Ошибка извлечения: {e}")
+            logger.error("Ошибка извлечения: %s", e)
             raise
 
+    def extract_chunks(self) -> Iterator[pd.DataFrame]:
+        # Потоковое извлечение: в памяти находится не более одного пакета строк
+        logger.info("Начало потокового извлечения данных из %s для модели %s", self.file_path, self.model_type)
+        if self.file_path.endswith('.csv'):
+            chunks = pd.read_csv(self.file_path, dtype=str, chunksize=self.chunk_size)
+        elif self.file_path.endswith('.xlsx'):
+            chunks = self._read_excel_chunks()
+        elif self.file_path.endswith('.xls'):
+            # Старый формат xls не поддерживает построчное чтение, читаем целиком
+            data = pd.read_excel(self.file_path, dtype=str)
+            # Лист без строк данных дает один пустой пакет с заголовками столбцов
+            chunks = (data.iloc[start:start + self.chunk_size] for start in range(0, max(len(data), 1), self.chunk_size))
+        else:
+            raise ValueError("Неподдерживаемый формат файла")
+
+        for chunk in chunks:
+            chunk.columns = chunk.columns.astype(str).str.lower().str.strip()
+            self.progress['rows_read'] += len(chunk)
+            yield chunk
+
+    def _read_excel_chunks(self) -> Iterator[pd.DataFrame]:
+        # Режим read_only читает лист построчно, не загружая его в память целиком
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = ['' if value is None else str(value) for value in header]
+
+            buffer = []
+            start = 0
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                buffer.append(row[:len(columns)])
+                if len(buffer) >= self.chunk_size:
+                    yield pd.DataFrame(buffer, columns=columns, index=range(start, start + len(buffer)))
+                    start += len(buffer)
+                    buffer = []
+            if buffer or start == 0:
+                yield pd.DataFrame(buffer, columns=columns, index=range(start, start + len(buffer)))
+        finally:
+            workbook.close()
+
     def validate(self) -> Dict[str, List[str]]:
-        logger.info(f"Начало валидации данных для модели {self.model_type}")
+        logger.info("Начало валидации данных для модели %s", self.model_type)
+        self.progress['rows_validated'] += len(self.data)
 
         errors = {
             'missing_columns': [],
             'missing_values': [],
             'invalid_emails': [],
             'invalid_dates': [],
+            'invalid_numbers': [],
             'foreign_key_errors': [],
             'duplicate_ids': []
         }
@@ -64,62 +176,26 @@ class ETLPipeline:
         if errors['missing_columns']:
             return errors
 
-        # Проверка пропущенных значений
-        for field in required:
-            missing_count = self.data[field].isna().sum()
-            if missing_count > 0:
-                errors['missing_values'].append(f"{field}: {missing_count} пропущенных значений")
-
-        # Проверка email
-        if 'email' in self.data.columns:
-            email_rows = self.data['email'].notna()
-            if email_rows.any():
-                email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-                invalid_emails = self.data.loc[email_rows, 'email'].apply(
-                    lambda x: not bool(re.match(email_pattern, str(x)))
-                ).sum()
-                if invalid_emails > 0:
-                    errors['invalid_emails'].append(f"Найдено {invalid_emails} некорректных email")
-
-        # Проверка дат
-        date_fields = [col for col in self.data.columns if 'date' in col]
-        for field in date_fields:
-            if field in self.data.columns:
-                try:
-                    pd.to_datetime(self.data[field], errors='raise')
-                except:
-                    errors['invalid_dates'].append(f"Некорректный формат даты в поле {field}")
-
-        # Проверка внешних ключей
-        self._validate_foreign_keys(errors)
-
-        # Проверка дубликатов ID
-        if 'id' in self.data.columns:
-            duplicate_ids = self.data['id'].duplicated().sum()
-            if duplicate_ids > 0:
-                errors['duplicate_ids'].append(f"Найдено {duplicate_ids} дублирующихся ID")
+        # Проверка значений: обязательные поля, email, даты, числа, внешние ключи, дубликаты ID
+        self.validation_result = self._get_rules().evaluate(self.data)
+        for key, messages in self.validation_result.errors.items():
+            errors[key].extend(messages)
 
         return errors
 
-    def _validate_foreign_keys(self, errors: Dict[str, List[str]]):
-        # Только для сотрудников
-        if self.model_type == 'employees':
-            # Проверка department_id
-            if 'department_id' in self.data.columns:
-                valid_departments = {str(dept[0]) for dept in self.db.query(models.Department.id).all()}
-                invalid_dept = self.data[~self.data['department_id'].isin(valid_departments)]['department_id'].unique()
-                if len(invalid_dept) > 0:
-                    errors['foreign_key_errors'].append(f"Несуществующие department_id: {list(invalid_dept)}")
-
-            # Проверка workplace_id
-            if 'workplace_id' in self.data.columns:
-                valid_workplaces = {str(wp[0]) for wp in self.db.query(models.Workplace.id).all()}
-                invalid_wp = self.data[~self.data['workplace_id'].isin(valid_workplaces)]['workplace_id'].unique()
-                if len(invalid_wp) > 0:
-                    errors['foreign_key_errors'].append(f"Несуществующие workplace_id: {list(invalid_wp)}")
+    def _get_rules(self) -> RuleSet:
+        if self._rules is None:
+            self._rules = RuleSet.for_model(self._get_model_class(), self.db, self.reference_cache)
+        return self._rules
+
+    def _get_validation_result(self) -> ValidationResult:
+        # Маски последней проверки, если она выполнялась для текущих данных
+        if self.validation_result is None or not self.validation_result.index.equals(self.data.index):
+            self.validation_result = self._get_rules().evaluate(self.data)
+        return self.validation_result
 
     def transform(self) -> pd.DataFrame:
-        logger.info(f"Начало трансформации данных для модели {self.model_type}")
+        logger.info("Начало трансформации данных для модели %s", self.model_type)
 
         # Очистка текстовых данных
         text_columns = self.data.select_dtypes(include=['object']).columns
@@ -128,11 +204,24 @@ class ETLPipeline:
             mask = self.data[col].notna()
             self.data.loc[mask, col] = self.data.loc[mask, col].astype(str).str.strip()
 
+        model_class = self._get_model_class()
+
         # Обработка дат
-        date_columns = [col for col in self.data.columns if 'date' in col]
+        date_columns = [col for col in get_columns_of_type(model_class, Date) if col in self.data.columns]
         for col in date_columns:
             self.data[col] = pd.to_datetime(self.data[col], errors='coerce').dt.date
 
+        # Обработка числовых значений
+        numeric_columns = [col for col in get_columns_of_type(model_class, Numeric) if col in self.data.columns]
+        for col in numeric_columns:
+            self.data[col] = pd.to_numeric(self.data[col], errors='coerce')
+
+        # Приведение строковых полей модели (ID, внешние ключи) к строковому типу
+        string_columns = [col for col in get_columns_of_type(model_class, String) if col in self.data.columns]
+        for col in string_columns:
+            mask = self.data[col].notna()
+            self.data.loc[mask, col] = self.data.loc[mask, col].astype(str).str.strip()
+
         # Приведение ID к строковому типу
         if 'id' in self.data.columns:
             self.data['id'] = self.data['id'].astype(str).str.strip()
@@ -141,78 +230,268 @@ class ETLPipeline:
         return self.data
 
     def load(self) -> int:
-        logger.info(f"Начало загрузки данных для модели {self.model_type}")
+        logger.info("Начало загрузки данных для модели %s", self.model_type)
+
+        model_class = self._get_model_class()
+
+        try:
+            added_count, skipped_count = self._load_frame(model_class)
+
+            self.db.commit()
+            self.skipped_count = skipped_count
+            logger.info("Загрузка завершена. Добавлено: %s, Обновлено: %s, Без изменений: %s, Пропущено: %s",
+                        added_count, self.updated_count, self.unchanged_count, skipped_count)
+            return added_count
+
+        except Exception as e:
+            logger.error("Ошибка загрузки: %s", e)
+            self.db.rollback()
+            raise
 
+    def _get_model_class(self):
         model_class = self.model_mapping.get(self.model_type)
         if not model_class:
             raise ValueError(f"Неизвестный тип модели: {self.model_type}")
-
+        return model_class
+
+    def _skip_mask(self, model_class, data: pd.DataFrame) -> pd.Series:
+        # Строки, не прошедшие проверку, и строки с обязательными полями,
+        # ставшими пустыми после трансформации (некорректные даты и числа)
+        skip_mask = self._get_validation_result().invalid_rows.reindex(data.index, fill_value=False)
+        required = [column for column in get_required_fields(model_class) if column in data.columns]
+        if required:
+            skip_mask = skip_mask | data[required].isna().any(axis=1)
+        return skip_mask
+
+    def _load_frame(self, model_class) -> Tuple[int, int]:
+        # Загрузка текущего self.data без фиксации транзакции
+        if self.bulk:
+            return self._load_bulk(model_class)
+        return self._load_rows(model_class)
+
+    def _load_rows(self, model_class) -> Tuple[int, int]:
+        # Построчная загрузка: по одному SELECT и одному объекту ORM на строку
         added_count = 0
         skipped_count = 0
+        skip_mask = self._skip_mask(model_class, self.data)
 
-        # Подготовка данных для проверки внешних ключей
-        valid_departments = {str(dept[0]) for dept in self.db.query(models.Department.id).all()}
-        valid_workplaces = {str(wp[0]) for wp in self.db.query(models.Workplace.id).all()}
+        for index, row in self.data.iterrows():
+            try:
+                # Проверяем существование записи с таким ID
+                existing = self.db.query(model_class).filter_by(id=str(row['id'])).first()
+                if existing and self.on_conflict == 'skip':
+                    skipped_count += 1
+                    continue
 
-        try:
-            for _, row in self.data.iterrows():
-                try:
-                    # Проверяем существование записи с таким ID
-                    existing = self.db.query(model_class).filter_by(id=str(row['id'])).first()
-                    if existing:
-                        skipped_count += 1
-                        continue
-
-                    # Проверка внешних ключей
-                    department_id = str(row.get('department_id', ''))
-                    workplace_id = str(row.get('workplace_id', ''))
-
-                    if department_id not in valid_departments:
-                        logger.warning(f"Пропуск строки {row['id']}: несуществующий department_id {department_id}")
-                        skipped_count += 1
-                        continue
-
-                    if workplace_id not in valid_workplaces:
-                        logger.warning(f"Пропуск строки {row['id']}: несуществующий workplace_id {workplace_id}")
-                        skipped_count += 1
-                        continue
-
-                    # Проверка email
-                    if 'email' in row and pd.notna(row['email']):
-                        email = str(row['email'])
-                        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-                        if not re.match(email_pattern, email):
-                            logger.warning(f"Пропуск строки {row['id']}: некорректный email {email}")
-                            skipped_count += 1
-                            continue
+                # Строки, не прошедшие проверку
+                if skip_mask[index]:
+                    logger.warning("Пропуск строки %s: не пройдена проверка данных", row['id'])
+                    skipped_count += 1
+                    continue
 
-                    # Подготовка данных для модели
-                    model_data = {}
+                if existing:
+                    # Обновление существующей записи значениями из файла
                     for column in self.data.columns:
-                        if column in row and pd.notna(row[column]):
-                            model_data[column] = row[column]
+                        if column == 'id' or column not in model_class.__table__.columns:
+                            continue
+                        if pd.isna(row[column]):
+                            if self.on_conflict == 'update':
+                                continue
+                            setattr(existing, column, None)
+                        else:
+                            setattr(existing, column, row[column])
+                    if self.db.is_modified(existing):
+                        self.updated_count += 1
+                        self.progress['rows_loaded'] += 1
+                    else:
+                        self.unchanged_count += 1
+                    continue
 
-                    # Создание объекта модели
-                    model_instance = model_class(**model_data)
-                    self.db.add(model_instance)
-                    added_count += 1
+                # Подготовка данных для модели
+                model_data = {}
+                for column in self.data.columns:
+                    if column in row and pd.notna(row[column]):
+                        model_data[column] = row[column]
 
-                except Exception as e:
-                    logger.warning(f"Ошибка при обработке строки {row.get('id', 'unknown')}: {e}")
-                    skipped_count += 1
-                    continue
+                # Создание объекта модели
+                model_instance = model_class(**model_data)
+                self.db.add(model_instance)
+                added_count += 1
 
-            self.db.commit()
-            logger.info(f"Загрузка завершена. Добавлено: {added_count}, Пропущено: {skipped_count}")
-            return added_count
+            except Exception as e:
+                logger.warning("Ошибка при обработке строки %s: %s", row.get('id', 'unknown'), e)
+                skipped_count += 1
+                continue
 
-        except Exception as e:
-            logger.error(f"Ошибка загрузки: {e}")
-            self.db.rollback()
-            raise
+        self.progress['rows_loaded'] += added_count
+        return added_count, skipped_count
 
-    def run(self):
-        logger.info(f"Запуск ETL процесса для модели {self.model_type}")
+    def _load_bulk(self, model_class) -> Tuple[int, int]:
+        # Пакетная загрузка: один SELECT существующих записей и один executemany
+        # INSERT (или upsert) на пакет
+        added_count = 0
+        skipped_count = 0
+        skip_masks = self._skip_mask(model_class, self.data)
+        rule_masks = self._get_validation_result().masks
+
+        # В INSERT попадают только столбцы таблицы модели
+        table_columns = [col for col in self.data.columns if col in model_class.__table__.columns]
+
+        for start in range(0, len(self.data), self.chunk_size):
+            chunk = self.data.iloc[start:start + self.chunk_size]
+            ids = chunk['id'].astype(str)
+
+            # Маски пропуска строк из результата проверки
+            valid_mask = ~skip_masks.loc[chunk.index]
+            for rule_name, mask in rule_masks.items():
+                rejected = mask.reindex(chunk.index, fill_value=False)
+                if rejected.any():
+                    logger.warning("Пропуск %s строк: %s", int(rejected.sum()), rule_name)
+
+            if self.on_conflict == 'skip':
+                existing_ids = set(self.db.execute(
+                    select(model_class.id).where(model_class.id.in_(ids.unique().tolist()))
+                ).scalars())
+                new_mask = valid_mask & ~ids.isin(existing_ids)
+
+                records = [
+                    {key: value for key, value in record.items() if pd.notna(value)}
+                    for record in chunk.loc[new_mask, table_columns].to_dict('records')
+                ]
+                if records:
+                    self.db.execute(insert(model_class), records)
+
+                added_count += len(records)
+                self.progress['rows_loaded'] += len(records)
+                skipped_count += int((~new_mask).sum())
+                continue
+
+            # Текущие значения существующих записей для определения изменений
+            current = self._fetch_current(model_class, ids[valid_mask].unique().tolist(), table_columns)
+            existing_mask = ids.isin(current.index)
+            new_mask = valid_mask & ~existing_mask
+            matched_mask = valid_mask & existing_mask
+            changed_mask = pd.Series(False, index=chunk.index)
+            if matched_mask.any():
+                changed_mask = self._changed_mask(
+                    model_class, chunk.loc[matched_mask, table_columns],
+                    current.loc[ids[matched_mask]].set_axis(chunk.index[matched_mask])
+                ).reindex(chunk.index, fill_value=False)
+
+            self._upsert(model_class, chunk.loc[new_mask, table_columns], chunk.loc[changed_mask, table_columns])
+
+            added_count += int(new_mask.sum())
+            self.updated_count += int(changed_mask.sum())
+            self.unchanged_count += int((matched_mask & ~changed_mask).sum())
+            self.progress['rows_loaded'] += int((new_mask | changed_mask).sum())
+            skipped_count += int((~valid_mask).sum())
+
+        return added_count, skipped_count
+
+    def _fetch_current(self, model_class, ids: List[str], columns: List[str]) -> pd.DataFrame:
+        table = model_class.__table__
+        rows = self.db.execute(select(*[table.c[column] for column in columns]).where(table.c.id.in_(ids))).all()
+        return pd.DataFrame(rows, columns=columns, dtype=object).set_index('id', drop=False)
+
+    def _normalize(self, model_class, column: str, values: pd.Series) -> pd.Series:
+        # Приведение значений файла и БД к сравнимому виду
+        column_type = model_class.__table__.columns[column].type
+        if isinstance(column_type, Numeric):
+            return pd.to_numeric(values, errors='coerce').astype(float).round(column_type.scale or 0)
+        if isinstance(column_type, Date):
+            return pd.to_datetime(values, errors='coerce')
+        return values.where(values.isna(), values.astype(str))
+
+    def _changed_mask(self, model_class, rows: pd.DataFrame, current: pd.DataFrame) -> pd.Series:
+        changed = pd.Series(False, index=rows.index)
+        for column in rows.columns:
+            if column == 'id':
+                continue
+            new_values = self._normalize(model_class, column, rows[column])
+            old_values = self._normalize(model_class, column, current[column])
+            same = new_values.eq(old_values).fillna(False).astype(bool) | (new_values.isna() & old_values.isna())
+            if self.on_conflict == 'update':
+                # Пустые значения файла не перезаписывают текущие
+                same |= new_values.isna()
+            changed |= ~same
+        return changed
+
+    def _upsert(self, model_class, new_rows: pd.DataFrame, changed_rows: pd.DataFrame):
+        # Набор upsert-операций на пакет вместо SELECT и UPDATE на каждую строку
+        if new_rows.empty and changed_rows.empty:
+            return
+
+        table = model_class.__table__
+        columns = list(new_rows.columns)
+        update_columns = [column for column in columns if column != 'id']
+        dialect = self.db.get_bind().dialect.name
+
+        def to_records(rows: pd.DataFrame) -> List[Dict[str, Any]]:
+            return [
+                {key: (None if pd.isna(value) else value) for key, value in record.items()}
+                for record in rows.to_dict('records')
+            ]
+
+        if dialect in ('sqlite', 'postgresql') and update_columns:
+            # INSERT ... ON CONFLICT (id) DO UPDATE
+            dialect_insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+            statement = dialect_insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.id],
+                set_={column: self._conflict_value(statement.excluded[column], table.c[column])
+                      for column in update_columns}
+            )
+            self.db.execute(statement, to_records(pd.concat([new_rows, changed_rows])))
+
+        elif dialect == 'mssql' and update_columns:
+            # MERGE для SQL Server, с fast_executemany параметры передаются одним пакетом.
+            # text() не отслеживается событиями сессии, затронутые строки отмечаются явно
+            records = to_records(pd.concat([new_rows, changed_rows]))
+            rollups.record_rows(self.db, table, records)
+            self.db.execute(self._merge_statement(table, columns), records)
+            change_tracking.mark_changed(self.db, table.name)
+
+        else:
+            # Диалект без upsert: executemany INSERT новых и UPDATE по первичному ключу измененных записей
+            if not new_rows.empty:
+                self.db.execute(insert(model_class), [
+                    {key: value for key, value in record.items() if value is not None}
+                    for record in to_records(new_rows)
+                ])
+            if not changed_rows.empty and update_columns:
+                records = to_records(changed_rows)
+                if self.on_conflict == 'update':
+                    records = [{key: value for key, value in record.items() if value is not None} for record in records]
+                self.db.execute(update(model_class), records)
+
+    def _conflict_value(self, incoming, current):
+        if self.on_conflict == 'update':
+            return func.coalesce(incoming, current)
+        return incoming
+
+    def _merge_statement(self, table, columns: List[str]):
+        quote = self.db.get_bind().dialect.identifier_preparer.quote
+        source_columns = ", ".join(f":{column} AS {quote(column)}" for column in columns)
+        update_set = ", ".join(
+            f"target.{quote(column)} = COALESCE(source.{quote(column)}, target.{quote(column)})"
+            if self.on_conflict == 'update' else f"target.{quote(column)} = source.{quote(column)}"
+            for column in columns if column != 'id'
+        )
+        insert_columns = ", ".join(quote(column) for column in columns)
+        insert_values = ", ".join(f"source.{quote(column)}" for column in columns)
+        return text(
+            f"MERGE INTO {quote(table.name)} WITH (HOLDLOCK) AS target "
+            f"USING (SELECT {source_columns}) AS source "
+            f"ON target.{quote('id')} = source.{quote('id')} "
+            f"WHEN MATCHED THEN UPDATE SET {update_set} "
+            f"WHEN NOT MATCHED THEN INSERT ({insert_columns}) VALUES ({insert_values});"
+        )
+
+    def run(self, streaming: bool = False):
+        if streaming:
+            return self._run_streaming()
+
+        logger.info("Запуск ETL процесса для модели %s", self.model_type)
 
         # Извлечение
         self.extract()
@@ -231,3 +510,92 @@ class ETLPipeline:
             logger.warning("Пропущены этапы трансформации и загрузки из-за критических ошибок валидации")
 
         return validation_errors, added_count
+
+    def _run_streaming(self):
+        # Валидация, трансформация и загрузка выполняются для каждого пакета строк,
+        # все пакеты загружаются в одной транзакции. ID предыдущих пакетов хранятся не
+        # в памяти, а в etl_run_ids в той же транзакции
+        logger.info("Запуск потокового ETL процесса для модели %s", self.model_type)
+
+        validation_errors = None
+        added_count = 0
+        skipped_count = 0
+        critical_errors = False
+        columns = None
+        run_id = uuid.uuid4().hex
+
+        model_class = self._get_model_class()
+
+        try:
+            for chunk in self.extract_chunks():
+                columns = chunk.columns
+                if chunk.empty:
+                    continue
+                self.data = chunk
+                first_row, last_row = chunk.index[0] + 1, chunk.index[-1] + 1
+                logger.info("Обработка строк %s-%s", first_row, last_row)
+
+                chunk_errors = self.validate()
+
+                # Дубликаты ID между пакетами
+                if not chunk_errors['missing_columns'] and not chunk_errors['duplicate_ids']:
+                    repeated = self._repeated_ids(run_id, chunk)
+                    if repeated.any():
+                        chunk_errors['duplicate_ids'].append(
+                            f"Найдено {int(repeated.sum())} ID, повторяющих ID из предыдущих строк "
+                            f"({format_rows(repeated)})"
+                        )
+
+                if validation_errors is None:
+                    validation_errors = {key: [] for key in chunk_errors}
+                for key, messages in chunk_errors.items():
+                    if key == 'missing_columns':
+                        validation_errors[key].extend(messages)
+                    else:
+                        validation_errors[key].extend(f"Строки {first_row}-{last_row}: {message}" for message in messages)
+
+                critical_errors = bool(validation_errors['missing_columns'] or validation_errors['duplicate_ids'])
+                if critical_errors:
+                    break
+
+                self.transform()
+                added, skipped = self._load_frame(model_class)
+                added_count += added
+                skipped_count += skipped
+
+            if validation_errors is None:
+                # Файл без строк данных: проверяются прочитанные заголовки столбцов
+                self.data = pd.DataFrame(columns=columns)
+                validation_errors = self.validate()
+                critical_errors = bool(validation_errors['missing_columns'])
+
+            if critical_errors:
+                self.db.rollback()
+                logger.warning("Загрузка отменена из-за критических ошибок валидации")
+                return validation_errors, 0
+
+            self.db.execute(delete(ETL_RUN_IDS).where(ETL_RUN_IDS.c.run_id == run_id))
+            self.db.commit()
+            self.skipped_count = skipped_count
+            logger.info("Потоковая загрузка завершена. Добавлено: %s, Обновлено: %s, Без изменений: %s, Пропущено: %s",
+                        added_count, self.updated_count, self.unchanged_count, skipped_count)
+            return validation_errors, added_count
+
+        except Exception as e:
+            logger.error("Ошибка потоковой загрузки: %s", e)
+            self.db.rollback()
+            raise
+
+    def _repeated_ids(self, run_id: str, chunk: pd.DataFrame) -> pd.Series:
+        # Маска строк пакета с ID из предыдущих пакетов запуска; новые ID пакета
+        # добавляются к ID запуска
+        ids = chunk['id'].dropna().astype(str)
+        unique_ids = ids.unique().tolist()
+        seen = set(self.db.execute(
+            select(ETL_RUN_IDS.c.row_id)
+            .where(ETL_RUN_IDS.c.run_id == run_id, ETL_RUN_IDS.c.row_id.in_(unique_ids))
+        ).scalars())
+        new_ids = [row_id for row_id in unique_ids if row_id not in seen]
+        if new_ids:
+            self.db.execute(insert(ETL_RUN_IDS), [{'run_id': run_id, 'row_id': row_id} for row_id in new_ids])
+        return ids.isin(seen).reindex(chunk.index, fill_value=False)
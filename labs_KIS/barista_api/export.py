@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import logging
+import os
+from enum import Enum
+from typing import Iterator, List, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import BigInteger, Date, Integer, Numeric, select
+
+from database import SessionLocal
+from filters import ListQuery
+from pagination import Keyset
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger("coffee_business_api")
+
+# Выгрузка таблиц потоком: строки читаются курсором на стороне сервера (yield_per)
+# пакетами по EXPORT_BATCH_SIZE, каждый пакет сразу кодируется и отправляется клиенту.
+# Память не зависит от размера таблицы, первые байты уходят до чтения всех строк
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+
+EXPORT_MEDIA_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+ExportFormat = Enum("ExportFormat", {name: name for name in EXPORT_MEDIA_TYPES}, type=str)
+
+
+def _batches(model, keyset: Keyset, list_query: ListQuery) -> Iterator[Sequence[tuple]]:
+    # Отдельная сессия на время выгрузки: ответ передается после завершения обработчика
+    statement = keyset.order(list_query.filter(select(*model.__table__.columns)))
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        exported = 0
+        for rows in result.partitions():
+            exported += len(rows)
+            yield rows
+        logger.info("Выгрузка %s завершена: %s записей", model.__tablename__, exported)
+    finally:
+        db.close()
+
+
+def _drain(buffer: io.StringIO) -> bytes:
+    data = buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def _csv(model, columns: List[str], batches: Iterator[Sequence[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield _drain(buffer)
+    for rows in batches:
+        writer.writerows(rows)
+        yield _drain(buffer)
+
+
+def _ndjson(model, columns: List[str], batches: Iterator[Sequence[tuple]]) -> Iterator[bytes]:
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + "\n" for row in rows
+        ).encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    # Файл только для записи: ParquetWriter пишет в него группы строк, записанные
+    # байты забираются после каждого пакета
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_type(column_type):
+    if isinstance(column_type, Date):
+        return pa.date32()
+    if isinstance(column_type, Numeric):
+        return pa.decimal128(column_type.precision or 38, column_type.scale or 0)
+    if isinstance(column_type, (Integer, BigInteger)):
+        return pa.int64()
+    return pa.string()
+
+
+def _parquet(model, columns: List[str], batches: Iterator[Sequence[tuple]]) -> Iterator[bytes]:
+    # Каждый пакет записывается отдельной группой строк
+    schema = pa.schema([(column.name, _arrow_type(column.type)) for column in model.__table__.columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in batches:
+            arrays = [pa.array([row[index] for row in rows], type=field.type) for index, field in enumerate(schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {
+    'csv': _csv,
+    'ndjson': _ndjson,
+    'parquet': _parquet,
+}
+
+
+def export_response(model, keyset: Keyset, list_query: ListQuery, export_format: str) -> StreamingResponse:
+    if export_format == 'parquet' and pa is None:
+        raise HTTPException(status_code=501, detail="Выгрузка в parquet недоступна: не установлен пакет pyarrow")
+
+    logger.info("Выгрузка %s в формате %s", model.__tablename__, export_format)
+    columns = [column.name for column in model.__table__.columns]
+    body = EXPORT_WRITERS[export_format](model, columns, _batches(model, list_query.keyset(keyset), list_query))
+    filename = f"{model.__tablename__}.{export_format}"
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[export_format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
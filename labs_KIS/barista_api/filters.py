@@ -0,0 +1,171 @@
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from inspect import Parameter, Signature
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, Query
+from sqlalchemy import Date, Numeric
+
+import models
+from pagination import Keyset
+from reference_cache import IN_QUERY_CHUNK_SIZE
+
+# Фильтрация и сортировка списков: параметры запроса описываются декларативно
+# для каждого ресурса и компилируются в условия WHERE.
+#   поле=значение          равенство
+#   поле__in=a,b,c         список значений
+#   поле__gte, поле__lte   диапазон (для дат)
+#   sort=поле, sort=-поле  сортировка; допускается только по обязательному полю, для
+#                          которого есть индекс с этим полем после полей фильтров равенства
+
+
+class ListQuery:
+    def __init__(self, conditions: Sequence = (), sort_column=None, descending: bool = False):
+        self.conditions = list(conditions)
+        self.sort_column = sort_column
+        self.descending = descending
+
+    def filter(self, statement):
+        if self.conditions:
+            statement = statement.where(*self.conditions)
+        return statement
+
+    def keyset(self, default: Keyset) -> Keyset:
+        if self.sort_column is None:
+            return default
+        return Keyset(self.sort_column, default.id_column, descending=self.descending)
+
+
+# Список без фильтров с сортировкой по умолчанию
+NO_FILTERS = ListQuery()
+
+
+def _python_type(column):
+    if isinstance(column.type, Date):
+        return date
+    if isinstance(column.type, Numeric):
+        return Decimal
+    return str
+
+
+def _convert(column, value: str):
+    python_type = _python_type(column)
+    try:
+        if python_type is date:
+            return date.fromisoformat(value)
+        if python_type is Decimal:
+            return Decimal(value)
+    except (ValueError, InvalidOperation):
+        raise HTTPException(status_code=400, detail=f"Некорректное значение фильтра {column.name}: {value}")
+    return value
+
+
+def _indexed_after_equalities(table, column_name: str, equal_columns: set) -> bool:
+    # Индекс обслуживает сортировку, если поле идет в нем сразу после полей,
+    # зафиксированных фильтрами равенства
+    if column_name == 'id':
+        return True
+    for index in table.indexes:
+        names = [column.name for column in index.columns]
+        position = 0
+        while position < len(names) and names[position] in equal_columns:
+            position += 1
+        if position < len(names) and names[position] == column_name:
+            return True
+    return False
+
+
+class ResourceFilters:
+    def __init__(self, model, equal: Sequence[str] = (), ranges: Sequence[str] = ()):
+        self.model = model
+        self.table = model.__table__
+        self.equal = list(equal)
+        self.ranges = list(ranges)
+
+    def parameters(self) -> List[Parameter]:
+        params = []
+        for name in self.equal + self.ranges:
+            column = self.table.columns[name]
+            python_type = _python_type(column)
+            params.append(Parameter(name, Parameter.KEYWORD_ONLY, annotation=Optional[python_type],
+                                    default=Query(None)))
+            if name in self.equal:
+                params.append(Parameter(f"{name}__in", Parameter.KEYWORD_ONLY, annotation=Optional[str],
+                                        default=Query(None, description=f"Значения {name} через запятую")))
+            if name in self.ranges:
+                for suffix in ("gte", "lte"):
+                    params.append(Parameter(f"{name}__{suffix}", Parameter.KEYWORD_ONLY,
+                                            annotation=Optional[python_type], default=Query(None)))
+        params.append(Parameter("sort", Parameter.KEYWORD_ONLY, annotation=Optional[str],
+                                default=Query(None, description="Поле сортировки, '-' для обратного порядка")))
+        return params
+
+    def build(self, values: Dict[str, Any]) -> ListQuery:
+        conditions = []
+        equal_columns = set()
+        for name in self.equal + self.ranges:
+            column = self.table.columns[name]
+            value = values.get(name)
+            if value is not None:
+                conditions.append(column == value)
+                equal_columns.add(name)
+
+            raw_values = values.get(f"{name}__in")
+            if raw_values:
+                items = [_convert(column, item.strip()) for item in raw_values.split(",") if item.strip()]
+                if len(items) > IN_QUERY_CHUNK_SIZE:
+                    raise HTTPException(status_code=400,
+                                        detail=f"Слишком много значений в {name}__in (максимум {IN_QUERY_CHUNK_SIZE})")
+                conditions.append(column.in_(items))
+                if len(items) == 1:
+                    equal_columns.add(name)
+
+            if values.get(f"{name}__gte") is not None:
+                conditions.append(column >= values[f"{name}__gte"])
+            if values.get(f"{name}__lte") is not None:
+                conditions.append(column <= values[f"{name}__lte"])
+
+        sort_column = None
+        descending = False
+        sort = values.get("sort")
+        if sort:
+            descending = sort.startswith("-")
+            sort_name = sort.lstrip("-")
+            if sort_name not in self.table.columns:
+                raise HTTPException(status_code=400, detail=f"Неизвестное поле сортировки: {sort_name}")
+            if self.table.columns[sort_name].nullable:
+                # Курсор keyset-пагинации не может продолжить список после NULL
+                raise HTTPException(status_code=400,
+                                    detail=f"Сортировка по полю {sort_name} не поддерживается: поле допускает пустые значения")
+            if not _indexed_after_equalities(self.table, sort_name, equal_columns):
+                raise HTTPException(status_code=400,
+                                    detail=f"Сортировка по полю {sort_name} не поддерживается: нет подходящего индекса")
+            sort_column = getattr(self.model, sort_name)
+
+        return ListQuery(conditions, sort_column, descending)
+
+    def dependency(self) -> Callable[..., ListQuery]:
+        # Зависимость FastAPI с явной сигнатурой: параметры фильтров видны в документации API
+        def list_query(**values) -> ListQuery:
+            return self.build(values)
+
+        list_query.__signature__ = Signature(self.parameters(), return_annotation=ListQuery)
+        return list_query
+
+
+RESOURCE_FILTERS = {
+    "business_processes": ResourceFilters(models.BusinessProcess, equal=["project_id", "responsible_employee_id"]),
+    "clients": ResourceFilters(models.Client, equal=["favorite_coffee_type_id"]),
+    "departments": ResourceFilters(models.Department, equal=["manager_id"]),
+    "employees": ResourceFilters(models.Employee, equal=["department_id", "workplace_id"], ranges=["hire_date"]),
+    "projects": ResourceFilters(models.Project, ranges=["start_date"]),
+    "purchases": ResourceFilters(models.Purchase, equal=["supplier", "coffee_product_type_id", "employee_id"],
+                                 ranges=["date"]),
+    "service_requests": ResourceFilters(models.ServiceRequest, equal=["status_id", "workplace_id", "employee_id"],
+                                        ranges=["request_date"]),
+    "workplaces": ResourceFilters(models.Workplace, equal=["equipment_status_id"]),
+}
+
+
+def resource_filters(resource: str) -> Callable[..., ListQuery]:
+    return RESOURCE_FILTERS[resource].dependency()
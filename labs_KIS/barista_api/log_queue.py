@@ -0,0 +1,50 @@
+import atexit
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterable
+
+# Журналирование через очередь: обработчики запросов только кладут запись в очередь,
+# форматирование, запись в файл и ротация выполняются фоновым потоком QueueListener.
+# Время ответа не зависит от скорости диска и момента ротации файла журнала
+
+# Доля записей журнала чтений (coffee_business_api.reads), попадающих в журнал
+LOG_READ_SAMPLE_RATE = float(os.getenv('LOG_READ_SAMPLE_RATE', '1.0'))
+
+# Уровень журналов приложения
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+
+class SamplingFilter(logging.Filter):
+    # Пропускает случайную долю rate записей уровня ниже WARNING; предупреждения и ошибки
+    # не отбрасываются
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class DeferredQueueHandler(QueueHandler):
+    # Стандартный QueueHandler форматирует сообщение до постановки в очередь, то есть
+    # в потоке запроса. Здесь запись передается как есть: сообщение собирается из msg и args
+    # в потоке записи. В журнал передаются неизменяемые значения (ID, числа, строки)
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def start_queue_logging(loggers: Iterable[logging.Logger], *handlers: logging.Handler) -> QueueListener:
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    for logger in loggers:
+        logger.addHandler(queue_handler)
+        logger.propagate = False
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Записи, оставшиеся в очереди, дописываются при завершении процесса
+    atexit.register(listener.stop)
+    return listener
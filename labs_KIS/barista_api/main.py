@@ -1,10 +1,18 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from barista_api.api.v1.api import *
 import logging
 from logging.handlers import RotatingFileHandler
 import os
 
+import analytics
+from database import env_flag
+from log_queue import LOG_LEVEL, LOG_READ_SAMPLE_RATE, SamplingFilter, start_queue_logging
+import metrics
+import migrations
+from pagination import NEXT_CURSOR_HEADER, InvalidCursorError
+
 # Создаем директорию для логов если её нет
 if not os.path.exists("logs"):
     os.makedirs("logs")
@@ -14,7 +22,8 @@ if not os.path.exists("logs"):
 def setup_logging():
     # Создаем логгер
     logger = logging.getLogger("barista_api")
-    logger.setLevel(logging.INFO)
+    logger.setLevel(LOG_LEVEL)
+    logging.getLogger("coffee_business_api").setLevel(LOG_LEVEL)
 
     file_handler = RotatingFileHandler(
         "logs/barista.log",
@@ -28,10 +37,11 @@ def setup_logging():
     )
     file_handler.setFormatter(formatter)
 
-    # Добавляем обработчик к логгеру
-    logger.addHandler(file_handler)
+    # Выборка частых записей о чтении данных
+    logging.getLogger("coffee_business_api.reads").addFilter(SamplingFilter(LOG_READ_SAMPLE_RATE))
 
-    logger.propagate = False
+    # Файл пишется фоновым потоком, логгеры только ставят записи в очередь
+    start_queue_logging([logger, logging.getLogger("coffee_business_api")], file_handler)
 
     return logger
 
@@ -52,11 +62,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Заголовки ответа, доступные браузерному клиенту: курсор следующей страницы и ETag
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
+# Метрики HTTP запросов и запросов к БД: /metrics и заголовок Server-Timing
+if metrics.METRICS_ENABLED:
+    metrics.instrument_queries()
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Подключение маршрутов
 app.include_router(api_router, prefix="/api/v1")
 
+
+# Создание недостающих таблиц и индексов при запуске. На больших таблицах создание
+# индекса занимает время, поэтому по умолчанию миграция запускается отдельно: python migrations.py
+@app.on_event("startup")
+def migrate_database():
+    if env_flag('DB_MIGRATE_ON_STARTUP', 'false'):
+        migrations.upgrade()
+
+
+@app.on_event("startup")
+def check_settings():
+    analytics.check_closed_statuses()
+
+
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 async def home_page():
     return {"Текст": "Добро пожаловать в Barista API", "Управление": "http://127.0.0.1:8002/docs"}
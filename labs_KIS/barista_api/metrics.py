@@ -0,0 +1,232 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from database import env_flag
+
+# Метрики HTTP запросов и запросов к БД в текстовом формате Prometheus (/metrics).
+# Время запроса, число запросов к БД и время БД также передаются клиенту заголовком
+# Server-Timing: рост числа запросов к БД на один HTTP запрос показывает N+1
+METRICS_ENABLED = env_flag('METRICS_ENABLED', 'true')
+SERVER_TIMING_ENABLED = env_flag('SERVER_TIMING_ENABLED', 'true')
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Метка маршрута для запросов, не сопоставленных ни одному маршруту: путь запроса
+# в метке дал бы неограниченное число рядов
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            values = list(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in values)
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+        # На набор меток: число наблюдений по корзинам (без накопления), сумма, количество
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        names = self.labels + ("le",)
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+_metrics: List[Metric] = []
+
+REQUESTS = Counter("barista_http_requests_total", "HTTP запросы", ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = Gauge("barista_http_requests_in_flight", "HTTP запросы в обработке")
+REQUEST_DURATION = Histogram("barista_http_request_duration_seconds", "Время обработки HTTP запроса",
+                             ("method", "route"))
+RESPONSE_SIZE = Histogram("barista_http_response_size_bytes", "Размер тела ответа",
+                          ("method", "route"), buckets=SIZE_BUCKETS)
+REQUEST_QUERIES = Histogram("barista_http_request_db_queries", "Число запросов к БД на HTTP запрос",
+                            ("method", "route"), buckets=QUERY_COUNT_BUCKETS)
+REQUEST_DB_DURATION = Histogram("barista_http_request_db_duration_seconds", "Время запросов к БД на HTTP запрос",
+                                ("method", "route"))
+DB_QUERIES = Counter("barista_db_queries_total", "Запросы к БД, включая фоновые задачи ETL")
+DB_QUERY_DURATION = Histogram("barista_db_query_duration_seconds", "Время выполнения запроса к БД")
+ETL_JOB_QUERIES = Histogram("barista_etl_job_db_queries", "Число запросов к БД на ETL задачу",
+                            ("model_type",), buckets=(10, 100, 1000, 10000, 100000, 1000000))
+ETL_JOB_DB_DURATION = Histogram("barista_etl_job_db_duration_seconds", "Время запросов к БД на ETL задачу",
+                                ("model_type",), buckets=(0.1, 1, 10, 60, 300, 1800))
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class QueryStats:
+    # Запросы к БД текущего HTTP запроса или ETL задачи
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# Контекст копируется в поток синхронного обработчика и в greenlet AsyncSession,
+# поэтому обработчики событий курсора видят статистику своего HTTP запроса
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    # Учет запросов к БД, выполненных внутри блока в текущем контексте
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    DB_QUERIES.inc()
+    DB_QUERY_DURATION.observe(elapsed)
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def instrument_queries():
+    # Для всех движков, включая sync_engine асинхронного движка
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def server_timing(stats: QueryStats, elapsed: float) -> str:
+    return (f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+            f'app;dur={elapsed * 1000:.1f}')
+
+
+class MetricsMiddleware:
+    # ASGI middleware: в отличие от BaseHTTPMiddleware не буферизует потоковые ответы
+    # (выгрузки) и не меняет контекст выполнения обработчика
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Для потоковых ответов заголовок отражает время до начала передачи тела
+                if SERVER_TIMING_ENABLED:
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", server_timing(stats, time.perf_counter() - started))
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            with track_queries() as stats:
+                await self.app(scope, receive, send_with_metrics)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", UNMATCHED_ROUTE))
+            REQUESTS.inc(*labels, str(status))
+            REQUEST_DURATION.observe(time.perf_counter() - started, *labels)
+            RESPONSE_SIZE.observe(size, *labels)
+            REQUEST_QUERIES.observe(stats.queries, *labels)
+            REQUEST_DB_DURATION.observe(stats.db_time, *labels)
@@ -0,0 +1,92 @@
+import argparse
+import logging
+import time
+from typing import Iterable, List, Optional
+
+from sqlalchemy import Index, insert, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from database import Base, engine
+import models  # noqa: F401 - регистрация таблиц в Base.metadata
+import change_tracking
+import rollups
+
+logger = logging.getLogger("barista_api")
+
+# Миграция существующих БД: таблицы создаются вне приложения, поэтому новые
+# таблицы (сводки) и индексы, объявленные в models.py, добавляются отдельно
+
+
+def create_missing_tables(bind: Engine = engine) -> List[str]:
+    inspector = inspect(bind)
+    missing = [table for table in Base.metadata.tables.values() if not inspector.has_table(table.name)]
+    if missing:
+        Base.metadata.create_all(bind, tables=missing)
+        logger.info("Созданы таблицы: %s", ', '.join(table.name for table in missing))
+    return [table.name for table in missing]
+
+
+def missing_indexes(bind: Engine = engine) -> List[Index]:
+    inspector = inspect(bind)
+    missing = []
+    for table in Base.metadata.tables.values():
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in table.indexes if index.name not in existing)
+    return missing
+
+
+def create_missing_indexes(bind: Engine = engine) -> List[str]:
+    # Индексы создаются по одному: ошибка на одном не откатывает уже созданные
+    created = []
+    for index in missing_indexes(bind):
+        started = time.perf_counter()
+        index.create(bind, checkfirst=True)
+        logger.info("Создан индекс %s (%s) за %.2f с", index.name, index.table.name, time.perf_counter() - started)
+        created.append(index.name)
+    return created
+
+
+def rebuild_rollups(bind: Engine = engine, summary_tables: Optional[Iterable[str]] = None) -> List[str]:
+    # Полное построение сводных таблиц по исходным данным
+    selected = [rollup for rollup in rollups.all_rollups()
+                if summary_tables is None or rollup.summary.name in summary_tables]
+    with Session(bind=bind) as session:
+        rollups.rebuild(session, selected)
+        session.commit()
+    return [rollup.name for rollup in selected]
+
+
+def create_missing_table_versions(bind: Engine = engine) -> List[str]:
+    # Строки версий создаются заранее: иначе первая запись в таблицу из нескольких
+    # процессов одновременно вставляла бы одну и ту же строку
+    versions = change_tracking.table_versions
+    with bind.begin() as connection:
+        existing = set(connection.scalars(select(versions.c.table_name)))
+        missing = [name for name in sorted(Base.metadata.tables) if name not in existing and name != versions.name]
+        if missing:
+            connection.execute(insert(versions), [
+                {'table_name': name, 'version': 0, 'modified_at': change_tracking.utcnow()} for name in missing
+            ])
+    return missing
+
+
+def upgrade(bind: Engine = engine):
+    created_tables = create_missing_tables(bind)
+    # Новые сводки заполняются по уже накопленным данным
+    rebuild_rollups(bind, created_tables)
+    create_missing_table_versions(bind)
+    create_missing_indexes(bind)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Миграция таблиц и индексов БД")
+    parser.add_argument('--rebuild-rollups', action='store_true', help="Пересчитать все сводные таблицы")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    upgrade()
+    if args.rebuild_rollups:
+        print(f"Пересчитаны сводки: {', '.join(rebuild_rollups())}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Date, DECIMAL, Text, func
+from sqlalchemy import Column, String, Integer, BigInteger, ForeignKey, Date, DateTime, DECIMAL, Text, Index, func
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -40,6 +40,13 @@ class Employee(Base):
     phone = Column(String(20), nullable=True)
     email = Column(String(100), nullable=True)
 
+    # Индексы списка: (поле фильтра, ключ сортировки списка, id)
+    __table_args__ = (
+        Index('ix_employees_full_name', 'full_name', 'id'),
+        Index('ix_employees_department_id_full_name', 'department_id', 'full_name', 'id'),
+        Index('ix_employees_workplace_id_full_name', 'workplace_id', 'full_name', 'id'),
+        Index('ix_employees_hire_date', 'hire_date', 'id'),
+    )
 
 
 # Отделы компании
@@ -50,6 +57,11 @@ class Department(Base):
     name = Column(String(100), nullable=False)
     manager_id = Column(String(50), ForeignKey('employees.id'), nullable=True)
 
+    __table_args__ = (
+        Index('ix_departments_name', 'name', 'id'),
+        Index('ix_departments_manager_id', 'manager_id'),
+    )
+
     # Связи
     employees = relationship("Employee",
                              back_populates="department",
@@ -70,6 +82,11 @@ class Workplace(Base):
     equipment_details = Column(Text, nullable=True)
     equipment_status_id = Column(String(50), ForeignKey('equipment_service_statuses.id'), nullable=False)
 
+    __table_args__ = (
+        Index('ix_workplaces_location', 'location', 'id'),
+        Index('ix_workplaces_equipment_status_id_location', 'equipment_status_id', 'location', 'id'),
+    )
+
     # Связи
     equipment_status = relationship("EquipmentServiceStatus", back_populates="workplaces")
     employees = relationship("Employee", back_populates="workplace")
@@ -86,6 +103,10 @@ class Project(Base):
     start_date = Column(Date, nullable=False, default=func.current_date())
     end_date = Column(Date, nullable=True)
 
+    __table_args__ = (
+        Index('ix_projects_start_date', 'start_date', 'id'),
+    )
+
     # Связи
     business_processes = relationship("BusinessProcess", back_populates="project")
 
@@ -100,6 +121,11 @@ class Client(Base):
     phone = Column(String(20), nullable=True)
     email = Column(String(100), nullable=True)
 
+    __table_args__ = (
+        Index('ix_clients_full_name', 'full_name', 'id'),
+        Index('ix_clients_favorite_coffee_type_id_full_name', 'favorite_coffee_type_id', 'full_name', 'id'),
+    )
+
     # Связи
     favorite_coffee_type = relationship("CoffeeProductType", back_populates="clients")
 
@@ -114,6 +140,12 @@ class BusinessProcess(Base):
     description = Column(Text, nullable=True)
     project_id = Column(String(50), ForeignKey('projects.id'), nullable=False)
 
+    __table_args__ = (
+        Index('ix_business_processes_name', 'name', 'id'),
+        Index('ix_business_processes_project_id_name', 'project_id', 'name', 'id'),
+        Index('ix_business_processes_responsible_employee_id_name', 'responsible_employee_id', 'name', 'id'),
+    )
+
     # Связи
     responsible_employee = relationship("Employee", back_populates="business_processes")
     project = relationship("Project", back_populates="business_processes")
@@ -130,6 +162,13 @@ class Purchase(Base):
     amount = Column(DECIMAL(10, 2), nullable=False)
     coffee_product_type_id = Column(String(50), ForeignKey('coffee_product_types.id'), nullable=False)
 
+    __table_args__ = (
+        Index('ix_purchases_date', 'date', 'id'),
+        Index('ix_purchases_supplier_date', 'supplier', 'date', 'id'),
+        Index('ix_purchases_coffee_product_type_id_date', 'coffee_product_type_id', 'date', 'id'),
+        Index('ix_purchases_employee_id_date', 'employee_id', 'date', 'id'),
+    )
+
     # Связи
     employee = relationship("Employee", back_populates="purchases")
     coffee_product_type = relationship("CoffeeProductType", back_populates="purchases")
@@ -146,12 +185,80 @@ class ServiceRequest(Base):
     workplace_id = Column(String(50), ForeignKey('workplaces.id'), nullable=False)
     status_id = Column(String(50), ForeignKey('equipment_service_statuses.id'), nullable=False)
 
+    __table_args__ = (
+        Index('ix_service_requests_request_date', 'request_date', 'id'),
+        Index('ix_service_requests_status_id_request_date', 'status_id', 'request_date', 'id'),
+        Index('ix_service_requests_workplace_id_request_date', 'workplace_id', 'request_date', 'id'),
+        Index('ix_service_requests_employee_id_request_date', 'employee_id', 'request_date', 'id'),
+    )
+
     # Связи
     employee = relationship("Employee", back_populates="service_requests")
     workplace = relationship("Workplace", back_populates="service_requests")
     status = relationship("EquipmentServiceStatus", back_populates="service_requests")
 
 
+# Итоги закупок по дням (поддерживаются rollups.py, не редактируются напрямую)
+class PurchaseDailyTotal(Base):
+    __tablename__ = 'purchase_daily_totals'
+
+    day = Column(Date, primary_key=True)
+    supplier = Column(String(150), primary_key=True)
+    coffee_product_type_id = Column(String(50), primary_key=True)
+    employee_id = Column(String(50), primary_key=True)
+    # Начало недели (понедельник) и месяца дня - для группировки по периодам без функций СУБД
+    week_start = Column(Date, nullable=False)
+    month_start = Column(Date, nullable=False)
+    total_amount = Column(DECIMAL(14, 2), nullable=False)
+    purchases_count = Column(Integer, nullable=False)
+
+
+# Итоги заявок на обслуживание по рабочим местам и статусам (поддерживаются rollups.py)
+class ServiceRequestStatusTotal(Base):
+    __tablename__ = 'service_request_status_totals'
+
+    workplace_id = Column(String(50), primary_key=True)
+    status_id = Column(String(50), primary_key=True)
+    requests_count = Column(Integer, nullable=False)
+    oldest_request_date = Column(Date, nullable=False)
+    # Сумма порядковых номеров дат заявок (date.toordinal) для среднего возраста
+    request_days_sum = Column(BigInteger, nullable=False)
+
+
+# Число заявок на обслуживание по рабочим местам и месяцам (поддерживается rollups.py)
+class ServiceRequestMonthlyTotal(Base):
+    __tablename__ = 'service_request_monthly_totals'
+
+    workplace_id = Column(String(50), primary_key=True)
+    month_start = Column(Date, primary_key=True)
+    requests_count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('ix_service_request_monthly_totals_month_start', 'month_start', 'workplace_id'),
+    )
+
+
+# Версии таблиц для условных GET (ETag, Last-Modified): увеличиваются в транзакции,
+# изменившей таблицу (change_tracking.py), поэтому общие для всех процессов приложения
+class TableVersion(Base):
+    __tablename__ = 'table_versions'
+
+    table_name = Column(String(100), primary_key=True)
+    version = Column(BigInteger, nullable=False)
+    # Время последнего изменения, UTC
+    modified_at = Column(DateTime, nullable=False)
+
+
+# ID строк файла, уже обработанных потоковым ETL процессом (etl_pipeline.py): поиск
+# ID, повторяющихся в разных пакетах, без хранения ID в памяти. Строки запуска
+# удаляются перед фиксацией его транзакции, при откате не сохраняются
+class ETLRunId(Base):
+    __tablename__ = 'etl_run_ids'
+
+    run_id = Column(String(32), primary_key=True)
+    row_id = Column(String(50), primary_key=True)
+
+
 #связи для Employee
 Employee.department = relationship("Department",
                                    back_populates="employees",
@@ -0,0 +1,105 @@
+import base64
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Optional
+
+from fastapi import Response
+from sqlalchemy import Date, Integer, Numeric, and_, or_
+
+# Keyset-пагинация: курсор after содержит значение ключа сортировки и id последней
+# записи страницы, следующая страница выбирается условием WHERE по индексу
+# (sort, id) вместо OFFSET, поэтому любая страница стоит как первая
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+class Page(list):
+    # Список записей страницы и курсор следующей страницы
+    next_cursor: Optional[str] = None
+
+
+class Keyset:
+    def __init__(self, sort_column, id_column, descending: bool = False):
+        self.sort_column = sort_column
+        self.id_column = id_column
+        self.descending = descending
+
+    def order(self, statement):
+        # Порядок по (sort, id) в одном направлении: id - устойчивый разделитель равных значений
+        if self.descending:
+            return statement.order_by(self.sort_column.desc(), self.id_column.desc())
+        return statement.order_by(self.sort_column, self.id_column)
+
+    def apply(self, statement, skip: int, limit: int, after: Optional[str] = None):
+        # Выбирается на одну запись больше limit: по ней page() определяет, есть ли
+        # следующая страница
+        statement = self.order(statement)
+        if after is None:
+            return statement.offset(skip).limit(limit + 1)
+
+        sort_value, id_value = self.decode(after)
+        if self.descending:
+            condition = or_(self.sort_column < sort_value,
+                            and_(self.sort_column == sort_value, self.id_column < id_value))
+        else:
+            condition = or_(self.sort_column > sort_value,
+                            and_(self.sort_column == sort_value, self.id_column > id_value))
+        return statement.where(condition).limit(limit + 1)
+
+    def page(self, items: List[Any], limit: int) -> Page:
+        # items - результат apply(): лишняя запись отбрасывается, курсор выдается,
+        # только если она есть
+        result = Page(items[:limit])
+        if len(items) > limit and result:
+            last = result[-1]
+            result.next_cursor = self.encode(getattr(last, self.sort_column.key), getattr(last, self.id_column.key))
+        return result
+
+    def encode(self, sort_value, id_value) -> str:
+        if isinstance(sort_value, date):
+            sort_value = sort_value.isoformat()
+        elif isinstance(sort_value, Decimal):
+            sort_value = str(sort_value)
+        payload = json.dumps([sort_value, id_value], ensure_ascii=False, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode(self, cursor: str):
+        try:
+            payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            sort_value, id_value = json.loads(payload)
+            sort_value = _cursor_value(self.sort_column, sort_value)
+            id_value = _cursor_value(self.id_column, id_value)
+        except (ValueError, TypeError, InvalidOperation) as e:
+            raise InvalidCursorError("Некорректный курсор пагинации") from e
+        return sort_value, id_value
+
+
+def _cursor_value(column, value):
+    # Значение из курсора, присланного клиентом: скаляр типа столбца, не NULL
+    column_type = column.type
+    if isinstance(column_type, Date):
+        if not isinstance(value, str):
+            raise TypeError(value)
+        return date.fromisoformat(value)
+    if isinstance(column_type, Numeric):
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise TypeError(value)
+        return Decimal(str(value))
+    if isinstance(column_type, Integer):
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise TypeError(value)
+        return value
+    if not isinstance(value, str):
+        raise TypeError(value)
+    return value
+
+
+def set_next_cursor(response: Response, page: List[Any]):
+    next_cursor = getattr(page, 'next_cursor', None)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
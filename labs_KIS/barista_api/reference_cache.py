@@ -0,0 +1,92 @@
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Set, Tuple
+
+from sqlalchemy import Column, select
+from sqlalchemy.orm import Session
+
+import change_tracking
+
+logger = logging.getLogger("barista_api")
+
+# Размер списка IN (...) в одном запросе проверки ключей
+IN_QUERY_CHUNK_SIZE = 1000
+
+# При большем числе неизвестных ключей справочник читается целиком (один раз)
+FULL_SCAN_THRESHOLD = int(os.getenv('ETL_REFERENCE_FULL_SCAN_THRESHOLD', '50000'))
+
+# Общий кэш для всех запусков ETL вместо кэша на один запуск
+SHARED_REFERENCE_CACHE = os.getenv('ETL_SHARED_REFERENCE_CACHE', 'false').lower() in ('1', 'true', 'yes')
+
+
+class ReferenceCache:
+    # Кэш существующих значений ключей справочных таблиц для проверки внешних ключей.
+    # Запрашиваются только ключи, встречающиеся в данных; найденные и отсутствующие
+    # значения запоминаются, поэтому каждый ключ проверяется в БД не более одного раза
+
+    def __init__(self, full_scan_threshold: int = FULL_SCAN_THRESHOLD):
+        self.full_scan_threshold = full_scan_threshold
+        self._lock = threading.Lock()
+        self._existing: Dict[Tuple[str, str], Set[str]] = {}
+        self._missing: Dict[Tuple[str, str], Set[str]] = {}
+        self._complete: Set[Tuple[str, str]] = set()
+
+    def existing_values(self, db: Session, target: Column, values: Iterable[str]) -> Set[str]:
+        # Возвращает подмножество values, присутствующее в столбце target
+        key = (target.table.name, target.name)
+        values = set(values)
+
+        with self._lock:
+            existing = self._existing.setdefault(key, set())
+            missing = self._missing.setdefault(key, set())
+            if key in self._complete:
+                return values & existing
+            unknown = values - existing - missing
+
+        if unknown:
+            if len(unknown) > self.full_scan_threshold:
+                found = self._scan_table(db, target)
+                with self._lock:
+                    existing |= found
+                    self._complete.add(key)
+            else:
+                found = self._query_keys(db, target, unknown)
+                with self._lock:
+                    existing |= found
+                    missing |= unknown - found
+
+        return values & existing
+
+    def invalidate(self, tables: Iterable[str]):
+        tables = set(tables)
+        with self._lock:
+            for key in [key for key in self._existing if key[0] in tables]:
+                self._existing.pop(key, None)
+                self._missing.pop(key, None)
+                self._complete.discard(key)
+
+    def _query_keys(self, db: Session, target: Column, keys: Set[str]) -> Set[str]:
+        found = set()
+        keys = sorted(keys)
+        for start in range(0, len(keys), IN_QUERY_CHUNK_SIZE):
+            chunk = keys[start:start + IN_QUERY_CHUNK_SIZE]
+            found.update(str(value) for value in db.execute(select(target).where(target.in_(chunk))).scalars())
+        logger.info("Проверено %s ключей %s.%s, найдено %s", len(keys), target.table.name, target.name, len(found))
+        return found
+
+    def _scan_table(self, db: Session, target: Column) -> Set[str]:
+        found = {str(value) for value in db.execute(select(target)).scalars()}
+        logger.info("Справочник %s прочитан целиком: %s ключей", target.table.name, len(found))
+        return found
+
+
+# Общий кэш сбрасывается при фиксации записи в соответствующие таблицы
+shared_reference_cache = ReferenceCache()
+change_tracking.add_listener(shared_reference_cache.invalidate)
+
+
+def get_reference_cache() -> ReferenceCache:
+    if SHARED_REFERENCE_CACHE:
+        return shared_reference_cache
+    return ReferenceCache()
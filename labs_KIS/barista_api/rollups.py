@@ -0,0 +1,349 @@
+import hashlib
+import logging
+from datetime import date, datetime, timedelta
+from itertools import chain, groupby, product
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Column, Date, Table, and_, delete, event, func, inspect, insert, or_, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ClauseElement
+
+import models
+from reference_cache import IN_QUERY_CHUNK_SIZE
+
+logger = logging.getLogger("barista_api")
+
+# Сводные таблицы с инкрементальным обновлением. Запись в исходную таблицу отмечает
+# в сессии затронутые значения ключа секции (например, день закупки или рабочее место
+# и статус заявки); перед фиксацией
+# транзакции строки сводки этих секций пересчитываются из исходной таблицы.
+# Секция пересчитывается целиком, а не по разнице значений, поэтому результат
+# не зависит от способа записи: ORM, пакетные insert()/update()/delete() или ETL.
+# Пересчет секции выполняется под блокировкой секции до конца транзакции (_lock):
+# транзакции, изменившие одну секцию (закупки за сегодня), пересчитывают ее по
+# очереди, и при READ COMMITTED следующая видит зафиксированные строки предыдущей
+
+_KEYS = "rollup_keys"
+_FULL = "rollup_full"
+_PENDING = "rollup_pending"
+
+# Размер пакета INSERT строк сводки
+INSERT_BATCH_SIZE = 1000
+
+
+class Rollup:
+    def __init__(self, name: str, source: Table, summary: Table, key: Sequence[str], summary_key: Sequence[str],
+                 compute: Callable[[Session, Optional[List[Tuple]]], List[Dict[str, Any]]],
+                 partition: Optional[Callable[[Tuple], Tuple]] = None):
+        # key - столбцы исходной таблицы, определяющие секцию, summary_key - столбцы
+        # ключа секции в сводке; partition вычисляет ключ секции по значениям столбцов
+        # key (по умолчанию совпадает с ними). compute возвращает строки сводки для
+        # списка ключей секций (None - для всей таблицы)
+        self.name = name
+        self.source = source
+        self.summary = summary
+        self.key = tuple(key)
+        self.summary_key = tuple(summary_key)
+        self.compute = compute
+        self.partition = partition
+
+    def normalize(self, column: str, value):
+        # Значения ключа из параметров пакетной записи (строки ETL, datetime)
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, str) and isinstance(self.source.c[column].type, Date):
+            return date.fromisoformat(value[:10])
+        return value
+
+    def partition_key(self, values: Sequence[Any]) -> Optional[Tuple]:
+        # Ключ секции по значениям столбцов key; None, если значение неизвестно
+        if any(value is None for value in values):
+            return None
+        values = tuple(self.normalize(column, value) for column, value in zip(self.key, values))
+        return self.partition(values) if self.partition else values
+
+    def refresh(self, session: Session, keys: Optional[Iterable[Any]] = None):
+        if keys is None:
+            logger.info("Полный пересчет сводки %s", self.name)
+            _lock(session, self.name)
+            session.execute(delete(self.summary))
+            self._insert(session, self.compute(session, None))
+            return
+
+        # Ключи блокируются в одном порядке во всех транзакциях, чтобы не было взаимных блокировок
+        keys = sorted(keys)
+        _lock(session, self.name, shared=True)
+        for key in keys:
+            _lock(session, ":".join([self.name, *map(str, key)]))
+        summary_key = [self.summary.c[column] for column in self.summary_key]
+        chunk_size = IN_QUERY_CHUNK_SIZE // len(summary_key)
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            session.execute(delete(self.summary).where(key_filter(summary_key, chunk)))
+            self._insert(session, self.compute(session, chunk))
+
+    def _insert(self, session: Session, rows: List[Dict[str, Any]]):
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            session.execute(insert(self.summary), rows[start:start + INSERT_BATCH_SIZE])
+
+
+def _lock(session: Session, resource: str, shared: bool = False):
+    # Блокировка уровня приложения до конца транзакции. SQLite блокирует запись во всю
+    # базу до фиксации, отдельная блокировка не нужна
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        lock_id = int.from_bytes(hashlib.blake2b(resource.encode(), digest_size=8).digest(), 'big', signed=True)
+        lock = func.pg_advisory_xact_lock_shared if shared else func.pg_advisory_xact_lock
+        session.execute(select(lock(lock_id)))
+    elif dialect == 'mssql':
+        result = session.execute(text(
+            "DECLARE @result int; "
+            "EXEC @result = sp_getapplock @Resource = :resource, @LockMode = :mode, @LockOwner = 'Transaction'; "
+            "SELECT @result"
+        ), {'resource': resource, 'mode': 'Shared' if shared else 'Exclusive'}).scalar()
+        if result < 0:
+            raise RuntimeError(f"Не удалось получить блокировку {resource}: код {result}")
+
+
+def key_filter(columns: Sequence[Column], keys: List[Tuple]):
+    # Строки с ключом из списка (ключи отсортированы): для каждого набора значений
+    # первых столбцов значения последнего сравниваются списком IN
+    *prefix, last = columns
+    return or_(*(
+        and_(*(column == value for column, value in zip(prefix, values)), last.in_([key[-1] for key in group]))
+        for values, group in groupby(keys, key=lambda key: key[:-1])
+    ))
+
+
+_rollups: Dict[str, List[Rollup]] = {}
+
+
+def register(rollup: Rollup) -> Rollup:
+    _rollups.setdefault(rollup.source.name, []).append(rollup)
+    return rollup
+
+
+def all_rollups() -> List[Rollup]:
+    return list(chain.from_iterable(_rollups.values()))
+
+
+def touch(session: Session, rollup: Rollup, values: Iterable[Sequence[Any]]):
+    # values - значения столбцов ключа rollup.key для каждой записанной строки
+    keys = session.info.setdefault(_KEYS, {}).setdefault(rollup.name, set())
+    keys.update(key for key in map(rollup.partition_key, values) if key is not None)
+
+
+def touch_all(session: Session, rollup: Rollup):
+    logger.warning("Запись в %s без известных ключей: сводка %s будет пересчитана целиком", rollup.source.name, rollup.name)
+    session.info.setdefault(_FULL, set()).add(rollup.name)
+
+
+def record_rows(session: Session, table: Table, rows: List[Dict[str, Any]], existing: bool = True):
+    # Отметка секций для пакетной записи строк по первичному ключу. existing - строки
+    # могут уже существовать (update, upsert, MERGE), тогда отмечаются и их текущие секции
+    for rollup in _rollups.get(table.name, ()):
+        current = {}
+        if existing:
+            ids = [row['id'] for row in rows if row.get('id') is not None]
+            key_columns = [table.c[column] for column in rollup.key]
+            for start in range(0, len(ids), IN_QUERY_CHUNK_SIZE):
+                chunk = ids[start:start + IN_QUERY_CHUNK_SIZE]
+                for row_id, *values in session.execute(select(table.c.id, *key_columns).where(table.c.id.in_(chunk))):
+                    current[row_id] = values
+
+        values = []
+        for row in rows:
+            old = current.get(row.get('id'))
+            if old is None:
+                values.append([row.get(column) for column in rollup.key])
+                continue
+            # Текущая секция строки и новая: пустые и не переданные значения не меняют столбец
+            values.append(old)
+            values.append([old_value if row.get(column) is None else row[column]
+                           for column, old_value in zip(rollup.key, old)])
+        touch(session, rollup, values)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_keys(session, flush_context):
+    for instance in chain(session.new, session.dirty, session.deleted):
+        table = getattr(instance, "__table__", None)
+        if table is None or table.name not in _rollups:
+            continue
+        state = inspect(instance)
+        for rollup in _rollups[table.name]:
+            # Старое и новое значение столбцов ключа: изменение затрагивает обе секции.
+            # При изменении нескольких столбцов отмечаются все сочетания значений,
+            # лишняя секция только пересчитывается
+            values = [[value for value in state.attrs[column].history.sum() if not isinstance(value, ClauseElement)]
+                      for column in rollup.key]
+            if all(values):
+                touch(session, rollup, product(*values))
+            else:
+                # Значение по умолчанию вычислено СУБД, читается перед фиксацией
+                session.info.setdefault(_PENDING, []).append((rollup, instance))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_executed_keys(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    statement = orm_execute_state.statement
+    table = getattr(statement, "table", None)
+    if table is None or table.name not in _rollups:
+        return
+
+    session = orm_execute_state.session
+    parameters = orm_execute_state.parameters
+    rows = parameters if isinstance(parameters, list) else [parameters] if parameters else []
+    if rows:
+        # executemany insert()/upsert или update() по первичному ключу
+        upsert = getattr(statement, "_post_values_clause", None) is not None
+        record_rows(session, table, rows, existing=orm_execute_state.is_update or upsert)
+        return
+
+    for rollup in _rollups[table.name]:
+        whereclause = getattr(statement, "whereclause", None)
+        if orm_execute_state.is_insert or whereclause is None:
+            touch_all(session, rollup)
+            continue
+        if orm_execute_state.is_update and set(rollup.key) & {
+                getattr(column, "key", column) for column in getattr(statement, "_values", None) or {}}:
+            touch_all(session, rollup)
+            continue
+        key_columns = [table.c[column] for column in rollup.key]
+        touch(session, rollup, session.execute(select(*key_columns).where(whereclause).distinct()))
+
+
+# insert=True: пересчет выполняется раньше увеличения версий таблиц (change_tracking.py),
+# чтобы версии сводных таблиц учитывали изменения этой же транзакции
+@event.listens_for(Session, "before_commit", insert=True)
+def _refresh_touched(session):
+    if session.in_nested_transaction():
+        return
+    session.flush()
+
+    for rollup, instance in session.info.pop(_PENDING, ()):
+        state = inspect(instance)
+        if state.persistent:
+            touch(session, rollup, [[getattr(instance, column) for column in rollup.key]])
+
+    keys = session.info.pop(_KEYS, {})
+    full = session.info.pop(_FULL, set())
+    for rollup in all_rollups():
+        if rollup.name in full:
+            rollup.refresh(session)
+        elif keys.get(rollup.name):
+            rollup.refresh(session, keys[rollup.name])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_touched(session):
+    if session.in_nested_transaction():
+        return
+    for key in (_KEYS, _FULL, _PENDING):
+        session.info.pop(key, None)
+
+
+def rebuild(session: Session, rollups: Optional[Iterable[Rollup]] = None):
+    # Полное построение сводок (новая таблица сводки или восстановление после записи в обход API)
+    for rollup in all_rollups() if rollups is None else rollups:
+        rollup.refresh(session)
+
+
+# Итоги закупок по дням, поставщикам, типам кофе и сотрудникам
+def _purchase_daily_totals(session: Session, days: Optional[List[Tuple]]) -> List[Dict[str, Any]]:
+    purchase = models.Purchase
+    group = [purchase.date, purchase.supplier, purchase.coffee_product_type_id, purchase.employee_id]
+    query = select(*group, func.sum(purchase.amount), func.count()).group_by(*group)
+    if days is not None:
+        query = query.where(key_filter([purchase.date], days))
+    return [
+        {
+            'day': day,
+            'supplier': supplier,
+            'coffee_product_type_id': coffee_product_type_id,
+            'employee_id': employee_id,
+            'week_start': day - timedelta(days=day.weekday()),
+            'month_start': day.replace(day=1),
+            'total_amount': total_amount,
+            'purchases_count': purchases_count,
+        }
+        for day, supplier, coffee_product_type_id, employee_id, total_amount, purchases_count
+        in session.execute(query)
+    ]
+
+
+purchase_daily_totals = register(Rollup(
+    "purchase_daily_totals", models.Purchase.__table__, models.PurchaseDailyTotal.__table__,
+    key=["date"], summary_key=["day"], compute=_purchase_daily_totals,
+))
+
+
+# Заявки по рабочим местам и статусам: число, самая ранняя дата и сумма дат для среднего возраста.
+# Секция - рабочее место и статус: запись заявки пересчитывает только заявки с ее статусом
+def _service_request_status_totals(session: Session, keys: Optional[List[Tuple]]) -> List[Dict[str, Any]]:
+    request = models.ServiceRequest
+    group = [request.workplace_id, request.status_id, request.request_date]
+    query = select(*group, func.count()).group_by(*group)
+    if keys is not None:
+        query = query.where(key_filter([request.workplace_id, request.status_id], keys))
+
+    totals = {}
+    for workplace_id, status_id, request_date, requests_count in session.execute(query):
+        row = totals.setdefault((workplace_id, status_id), {
+            'workplace_id': workplace_id,
+            'status_id': status_id,
+            'requests_count': 0,
+            'oldest_request_date': request_date,
+            'request_days_sum': 0,
+        })
+        row['requests_count'] += requests_count
+        row['oldest_request_date'] = min(row['oldest_request_date'], request_date)
+        row['request_days_sum'] += request_date.toordinal() * requests_count
+    return list(totals.values())
+
+
+def _month_start(request_date: date) -> date:
+    return request_date.replace(day=1)
+
+
+def _next_month(month_start: date) -> date:
+    return (month_start + timedelta(days=32)).replace(day=1)
+
+
+# Заявки по рабочим местам и месяцам. Секция - рабочее место и месяц даты заявки
+def _service_request_monthly_totals(session: Session, keys: Optional[List[Tuple]]) -> List[Dict[str, Any]]:
+    request = models.ServiceRequest
+    group = [request.workplace_id, request.request_date]
+    query = select(*group, func.count()).group_by(*group)
+    if keys is not None:
+        # Месяц задается диапазоном дат: функции выделения месяца различаются в СУБД
+        query = query.where(or_(*(
+            and_(request.workplace_id == workplace_id, or_(*(
+                and_(request.request_date >= month_start, request.request_date < _next_month(month_start))
+                for _, month_start in group_keys
+            )))
+            for workplace_id, group_keys in groupby(keys, key=lambda key: key[0])
+        )))
+
+    totals = {}
+    for workplace_id, request_date, requests_count in session.execute(query):
+        key = (workplace_id, _month_start(request_date))
+        row = totals.setdefault(key, {'workplace_id': key[0], 'month_start': key[1], 'requests_count': 0})
+        row['requests_count'] += requests_count
+    return list(totals.values())
+
+
+service_request_status_totals = register(Rollup(
+    "service_request_status_totals", models.ServiceRequest.__table__, models.ServiceRequestStatusTotal.__table__,
+    key=["workplace_id", "status_id"], summary_key=["workplace_id", "status_id"],
+    compute=_service_request_status_totals,
+))
+
+service_request_monthly_totals = register(Rollup(
+    "service_request_monthly_totals", models.ServiceRequest.__table__, models.ServiceRequestMonthlyTotal.__table__,
+    key=["workplace_id", "request_date"], summary_key=["workplace_id", "month_start"],
+    compute=_service_request_monthly_totals,
+    partition=lambda values: (values[0], _month_start(values[1])),
+))
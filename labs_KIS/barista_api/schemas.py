@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, create_model
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Optional
+import os
 from decimal import Decimal
 
 
@@ -194,7 +195,7 @@ class DepartmentWithManager(Department):
 
 class EmployeeWithDetails(Employee):
     department: Optional['Department'] = None
-    workplace: Optional['Workplace'] = None
+    workplace: Optional['WorkplaceWithStatus'] = None
 
     class Config:
         from_attributes = True
@@ -243,4 +244,99 @@ class ProjectWithBusinessProcesses(Project):
     business_processes: list['BusinessProcess'] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# Bulk operation schemas
+# Максимальное число элементов в одном пакетном запросе
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', '10000'))
+
+
+def partial_schema(schema, name: str):
+    # Схема частичного обновления: id обязателен, остальные поля необязательны
+    fields = {
+        field_name: (Optional[field.annotation], None)
+        for field_name, field in schema.model_fields.items() if field_name != 'id'
+    }
+    return create_model(name, id=(str, ...), **fields)
+
+
+DepartmentPatch = partial_schema(DepartmentCreate, "DepartmentPatch")
+WorkplacePatch = partial_schema(WorkplaceCreate, "WorkplacePatch")
+EmployeePatch = partial_schema(EmployeeCreate, "EmployeePatch")
+ProjectPatch = partial_schema(ProjectCreate, "ProjectPatch")
+ClientPatch = partial_schema(ClientCreate, "ClientPatch")
+BusinessProcessPatch = partial_schema(BusinessProcessCreate, "BusinessProcessPatch")
+PurchasePatch = partial_schema(PurchaseCreate, "PurchasePatch")
+ServiceRequestPatch = partial_schema(ServiceRequestCreate, "ServiceRequestPatch")
+
+
+class BulkDelete(BaseModel):
+    ids: List[str] = Field(..., max_length=BULK_MAX_ITEMS)
+
+
+class BulkItemResult(BaseModel):
+    id: str
+    status: str
+    detail: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    processed: int
+    succeeded: int
+    failed: int
+    items: List[BulkItemResult]
+
+
+# Analytics schemas
+class SpendByPeriod(BaseModel):
+    period_start: date
+    total_amount: Decimal
+    purchases_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class SpendByGroup(BaseModel):
+    key: str
+    name: Optional[str] = None
+    total_amount: Decimal
+    purchases_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class WorkplaceRequestMetrics(BaseModel):
+    workplace_id: str
+    location: str
+    equipment_status_id: str
+    total_requests: int
+    open_requests: int
+    oldest_open_request_date: Optional[date] = None
+    average_open_age_days: Optional[float] = None
+
+
+class StatusRequestMetrics(BaseModel):
+    status_id: str
+    name: Optional[str] = None
+    is_open: bool
+    requests_count: int
+    oldest_request_date: Optional[date] = None
+    average_age_days: Optional[float] = None
+
+
+class WorkplaceMonthlyRequests(BaseModel):
+    workplace_id: str
+    location: Optional[str] = None
+    month_start: date
+    requests_count: int
+
+
+class EquipmentHealth(BaseModel):
+    equipment_status_id: str
+    name: str
+    workplaces_count: int
+    workplaces_with_open_requests: int
+    open_requests: int
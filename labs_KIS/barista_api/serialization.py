@@ -0,0 +1,78 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from typing_extensions import TypedDict
+
+from database import env_flag
+from pagination import Keyset
+
+# Быстрая сериализация списков: вместо ORM объектов выбираются только поля схемы ответа
+# кортежами строк, а JSON формируется одним вызовом dump_json адаптера, созданного
+# один раз на схему. Проверка каждой строки через response_model и повторное
+# кодирование jsonable_encoder не выполняются; формат ответа задается той же схемой
+FAST_LIST_SERIALIZATION = env_flag('FAST_LIST_SERIALIZATION', 'true')
+
+
+class JSONBytesResponse(Response):
+    # Тело ответа - готовые байты JSON
+    media_type = "application/json"
+
+
+class RowListSerializer:
+    def __init__(self, schema, model, keyset: Keyset, fields: Optional[Sequence[str]] = None):
+        self.schema = schema
+        self.model = model
+        self.keyset = keyset
+        # Поля ответа в порядке схемы; fields - подмножество полей (параметр fields=)
+        self.fields = [name for name in schema.model_fields if fields is None or name in fields]
+        self.projected = len(self.fields) < len(schema.model_fields)
+        self.columns = [model.__table__.c[name] for name in self.fields]
+        # Строка ответа описывается TypedDict с типами полей схемы: при сериализации
+        # применяются те же правила (даты, Decimal), что и для модели схемы
+        row_type = TypedDict(f"{schema.__name__}Row",
+                             {name: schema.model_fields[name].annotation for name in self.fields})
+        self.adapter = TypeAdapter(List[row_type])
+        self._projections: Dict[Tuple[str, ...], "RowListSerializer"] = {}
+
+    def project(self, fields: Sequence[str]) -> "RowListSerializer":
+        # Сериализатор подмножества полей, создается один раз на набор полей
+        unknown = [name for name in fields if name not in self.schema.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(unknown)}")
+        key = tuple(name for name in self.schema.model_fields if name in fields)
+        if len(key) == len(self.schema.model_fields):
+            return self
+        projection = self._projections.get(key)
+        if projection is None:
+            projection = self._projections[key] = RowListSerializer(self.schema, self.model, self.keyset, key)
+        return projection
+
+    def statement(self, keyset: Optional[Keyset] = None):
+        # Столбцы ключа сортировки нужны для курсора следующей страницы; они выбираются
+        # после полей ответа и в ответ не попадают
+        keyset = keyset or self.keyset
+        extra = [column for column in (keyset.sort_column, keyset.id_column) if column.key not in self.fields]
+        return select(*self.columns, *extra)
+
+    def dump_json(self, rows: Sequence[Any]) -> bytes:
+        # Порядок столбцов выборки совпадает с порядком полей схемы
+        fields = self.fields
+        return self.adapter.dump_json([dict(zip(fields, row)) for row in rows])
+
+
+def sparse_fields(rows: RowListSerializer) -> Callable[..., RowListSerializer]:
+    # Зависимость параметра fields=: в SELECT и в ответ попадают только перечисленные поля
+    def selected_rows(fields: Optional[str] = Query(None, description="Поля ответа через запятую, например id,name")):
+        if not fields:
+            return rows
+        return rows.project([name.strip() for name in fields.split(",") if name.strip()])
+
+    return selected_rows
+
+
+def json_response(response: Response, content: bytes) -> JSONBytesResponse:
+    # При возврате Response FastAPI не переносит заголовки, установленные через
+    # параметр response (курсор, ETag), поэтому они копируются явно
+    return JSONBytesResponse(content, headers=dict(response.headers))
@@ -0,0 +1,173 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List, Pattern
+
+import pandas as pd
+from sqlalchemy import Column, Date, Numeric, String
+from sqlalchemy.orm import Session
+
+from reference_cache import ReferenceCache
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Сколько номеров строк перечисляется в тексте ошибки
+MAX_REPORTED_ROWS = 20
+
+
+def format_rows(mask: pd.Series) -> str:
+    # Номера строк данных (с единицы) для сообщения об ошибке
+    rows = [str(index + 1) for index in mask.index[mask][:MAX_REPORTED_ROWS]]
+    suffix = ", ..." if mask.sum() > MAX_REPORTED_ROWS else ""
+    return f"строки: {', '.join(rows)}{suffix}"
+
+
+class Rule(ABC):
+    # Правило проверяет один столбец и возвращает маску некорректных строк.
+    # blocks_row - строки, не прошедшие правило, не загружаются
+    error_key = None
+    blocks_row = True
+
+    def __init__(self, column: str):
+        self.column = column
+
+    @abstractmethod
+    def evaluate(self, data: pd.DataFrame) -> pd.Series:
+        pass
+
+    @abstractmethod
+    def message(self, data: pd.DataFrame, invalid: pd.Series) -> str:
+        pass
+
+
+class NotNullRule(Rule):
+    error_key = 'missing_values'
+
+    def evaluate(self, data):
+        return data[self.column].isna()
+
+    def message(self, data, invalid):
+        return f"{self.column}: {invalid.sum()} пропущенных значений ({format_rows(invalid)})"
+
+
+class RegexRule(Rule):
+    def __init__(self, column: str, pattern: Pattern, error_key: str, description: str):
+        super().__init__(column)
+        self.pattern = pattern
+        self.error_key = error_key
+        self.description = description
+
+    def evaluate(self, data):
+        values = data[self.column]
+        return values.notna() & ~values.astype(str).str.fullmatch(self.pattern)
+
+    def message(self, data, invalid):
+        return f"Найдено {invalid.sum()} {self.description} ({format_rows(invalid)})"
+
+
+class DateRule(Rule):
+    error_key = 'invalid_dates'
+
+    def evaluate(self, data):
+        values = data[self.column]
+        return values.notna() & pd.to_datetime(values, errors='coerce').isna()
+
+    def message(self, data, invalid):
+        return f"Некорректный формат даты в поле {self.column}: {invalid.sum()} значений ({format_rows(invalid)})"
+
+
+class NumericRule(Rule):
+    error_key = 'invalid_numbers'
+
+    def evaluate(self, data):
+        values = data[self.column]
+        return values.notna() & pd.to_numeric(values, errors='coerce').isna()
+
+    def message(self, data, invalid):
+        return f"{self.column}: {invalid.sum()} некорректных числовых значений ({format_rows(invalid)})"
+
+
+class ForeignKeyRule(Rule):
+    error_key = 'foreign_key_errors'
+
+    def __init__(self, column: str, target: Column, db: Session, reference_cache: ReferenceCache):
+        super().__init__(column)
+        self.target = target
+        self.db = db
+        self.reference_cache = reference_cache
+
+    def evaluate(self, data):
+        values = data[self.column]
+        present = values.notna()
+        keys = values[present].astype(str).str.strip()
+        valid_ids = self.reference_cache.existing_values(self.db, self.target, keys.unique())
+        return present & ~values.astype(str).str.strip().isin(valid_ids)
+
+    def message(self, data, invalid):
+        invalid_values = data.loc[invalid, self.column].astype(str).str.strip().unique()
+        return f"Несуществующие {self.column}: {list(invalid_values)} ({format_rows(invalid)})"
+
+
+class UniqueRule(Rule):
+    error_key = 'duplicate_ids'
+    # Дубликаты делают некорректным весь файл, а не отдельные строки
+    blocks_row = False
+
+    def evaluate(self, data):
+        return data[self.column].duplicated()
+
+    def message(self, data, invalid):
+        return f"Найдено {invalid.sum()} дублирующихся ID ({format_rows(invalid)})"
+
+
+class ValidationResult:
+    def __init__(self, index: pd.Index):
+        self.index = index
+        self.errors: Dict[str, List[str]] = {}
+        # Индексы некорректных строк по виду ошибки
+        self.row_errors: Dict[str, List[int]] = {}
+        # Маски некорректных строк по правилам, блокирующим загрузку строки
+        self.masks: Dict[str, pd.Series] = {}
+        self.invalid_rows = pd.Series(False, index=index)
+
+
+class RuleSet:
+    # Набор правил компилируется один раз на модель и применяется ко всем строкам
+    # пакета векторно: одна маска на правило вместо вызова Python на каждую строку
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+
+    @classmethod
+    def for_model(cls, model_class, db: Session, reference_cache: ReferenceCache) -> "RuleSet":
+        rules = []
+        for column in model_class.__table__.columns:
+            if not column.nullable:
+                rules.append(NotNullRule(column.name))
+            if isinstance(column.type, Date):
+                rules.append(DateRule(column.name))
+            elif isinstance(column.type, Numeric):
+                rules.append(NumericRule(column.name))
+            elif isinstance(column.type, String) and column.name == 'email':
+                rules.append(RegexRule(column.name, EMAIL_PATTERN, 'invalid_emails', "некорректных email"))
+            if column.foreign_keys:
+                target = next(iter(column.foreign_keys)).column
+                rules.append(ForeignKeyRule(column.name, target, db, reference_cache))
+            if column.primary_key:
+                rules.append(UniqueRule(column.name))
+        return cls(rules)
+
+    def evaluate(self, data: pd.DataFrame) -> ValidationResult:
+        result = ValidationResult(data.index)
+        for rule in self.rules:
+            if rule.column not in data.columns:
+                continue
+            invalid = rule.evaluate(data)
+            if not invalid.any():
+                continue
+
+            result.errors.setdefault(rule.error_key, []).append(rule.message(data, invalid))
+            result.row_errors.setdefault(rule.error_key, []).extend(invalid.index[invalid].tolist())
+            if rule.blocks_row:
+                result.masks[f"{rule.error_key}:{rule.column}"] = invalid
+                result.invalid_rows |= invalid
+        return result
@@ -0,0 +1,366 @@
+# Набор нагрузочных измерений API на локальной БД SQLite: задержка списков на разной
+# глубине skip (и курсором after на той же глубине), пропускная способность CRUD
+# одиночных записей, скорость ETL загрузки /etl/upload-employees и пики памяти.
+# Запросы выполняются через TestClient, то есть проходят весь стек приложения.
+#
+# Запуск из корня репозитория:
+#   python labs_KIS/benchmarks/api_suite.py --rows 100000 --output bench.json
+#   python labs_KIS/benchmarks/api_suite.py --rows 100000 --output new.json --compare bench.json
+#
+# Результаты сохраняются в JSON: метаданные запуска и список измерений с именами,
+# по которым --compare сопоставляет запуски разных версий. При ухудшении p50 больше
+# допуска --tolerance скрипт завершается с кодом 1.
+#
+# По умолчанию создается временная БД. BENCHMARK_DB=путь.db сохраняет заполненную БД
+# между запусками: при --rows 10000000 заполнение занимает несколько минут
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import islice
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(BASE_DIR, 'barista_api'), BASE_DIR]
+
+DB_PATH = os.getenv('BENCHMARK_DB') or os.path.join(tempfile.mkdtemp(prefix='barista_bench_'), 'api_suite.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+import sqlalchemy  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import func, insert, select, text  # noqa: E402
+
+import database  # noqa: E402
+import migrations  # noqa: E402
+import models  # noqa: E402
+from barista_api.main import app  # noqa: E402
+
+BATCH_SIZE = 10000
+PAGE_SIZE = 100
+START_DATE = datetime.date(2020, 1, 1)
+
+LIST_RESOURCES = ("employees", "clients", "purchases", "service_requests")
+SKIP_DEPTHS = (0, 1000, 10000, 100000, 1000000)
+
+
+def scale(rows: int) -> dict:
+    # Закупки, заявки и клиенты - rows строк, сотрудники - каждая десятая
+    employees = max(rows // 10, 100)
+    return {
+        'statuses': 5,
+        'coffee_types': 10,
+        'departments': 20,
+        'workplaces': max(employees // 20, 5),
+        'employees': employees,
+        'clients': rows,
+        'purchases': rows,
+        'service_requests': rows,
+    }
+
+
+def generate(counts: dict):
+    # Строки таблиц генерируются лениво: память при заполнении не зависит от --rows
+    rnd = random.Random(42)
+    employees, workplaces = counts['employees'], counts['workplaces']
+    days = 1500
+
+    def day():
+        return START_DATE + datetime.timedelta(days=rnd.randrange(days))
+
+    return [
+        (models.EquipmentServiceStatus, ({'id': f'st{i}', 'name': f'Статус {i}'} for i in range(counts['statuses']))),
+        (models.CoffeeProductType, ({'id': f'ct{i}', 'name': f'Кофе {i}'} for i in range(counts['coffee_types']))),
+        (models.Workplace, ({'id': f'w{i}', 'location': f'Зал {rnd.randrange(1000)}',
+                             'equipment_details': 'Кофемашина, кофемолка' * 10,
+                             'equipment_status_id': f'st{i % counts["statuses"]}'} for i in range(workplaces))),
+        (models.Department, ({'id': f'd{i}', 'name': f'Отдел {i}', 'manager_id': None}
+                             for i in range(counts['departments']))),
+        (models.Employee, ({'id': f'e{i}', 'department_id': f'd{i % counts["departments"]}',
+                            'full_name': f'Сотрудник {rnd.randrange(10 ** 6):06}', 'position': 'Бариста',
+                            'workplace_id': f'w{i % workplaces}', 'hire_date': day(),
+                            'phone': '+7 900 000-00-00', 'email': f'user{i}@example.com'} for i in range(employees))),
+        (models.Client, ({'id': f'c{i}', 'favorite_coffee_type_id': f'ct{rnd.randrange(counts["coffee_types"])}',
+                          'full_name': f'Клиент {rnd.randrange(10 ** 6):06}', 'phone': None,
+                          'email': f'client{i}@example.com'} for i in range(counts['clients']))),
+        (models.Purchase, ({'id': f'p{i}', 'employee_id': f'e{rnd.randrange(employees)}', 'date': day(),
+                            'supplier': f'Поставщик {rnd.randrange(50)}', 'amount': rnd.randrange(100, 10000),
+                            'coffee_product_type_id': f'ct{rnd.randrange(counts["coffee_types"])}'}
+                           for i in range(counts['purchases']))),
+        (models.ServiceRequest, ({'id': f'sr{i}', 'employee_id': f'e{rnd.randrange(employees)}',
+                                  'request_date': day(), 'description': 'Не работает кофемашина',
+                                  'workplace_id': f'w{rnd.randrange(workplaces)}',
+                                  'status_id': f'st{rnd.randrange(counts["statuses"])}'}
+                                 for i in range(counts['service_requests']))),
+    ]
+
+
+def seed(rows: int) -> dict:
+    counts = scale(rows)
+    database.Base.metadata.create_all(database.engine)
+    with database.engine.connect() as connection:
+        existing = connection.execute(select(func.count()).select_from(models.Purchase)).scalar()
+    if existing == counts['purchases']:
+        print(f"БД {DB_PATH} уже заполнена, заполнение пропущено")
+        return {'seconds': None, 'rows': counts}
+    if existing:
+        raise SystemExit(f"БД {DB_PATH} заполнена для другого --rows ({existing} закупок)")
+
+    started = time.perf_counter()
+    with database.engine.begin() as connection:
+        for model, values in generate(counts):
+            while True:
+                batch = list(islice(values, BATCH_SIZE))
+                if not batch:
+                    break
+                connection.execute(insert(model.__table__), batch)
+    # Строки вставлены в обход сессии, поэтому сводные таблицы строятся целиком
+    migrations.rebuild_rollups(database.engine)
+    with database.engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    seconds = time.perf_counter() - started
+    print(f"Заполнение {sum(counts.values())} строк: {seconds:.1f} с")
+    return {'seconds': round(seconds, 3), 'rows': counts}
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def latency_result(name: str, timings, **extra) -> dict:
+    result = {
+        'name': name,
+        'unit': 'ms',
+        'samples': len(timings),
+        'p50': round(statistics.median(timings) * 1000, 3),
+        'p95': round(percentile(timings, 0.95) * 1000, 3),
+        'mean': round(statistics.fmean(timings) * 1000, 3),
+    }
+    result.update(extra)
+    return result
+
+
+def timed_requests(client: TestClient, repeats: int, method: str, url: str, **kwargs):
+    timings = []
+    response = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        response = client.request(method, url, **kwargs)
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return timings, response
+
+
+def bench_lists(client: TestClient, counts: dict, repeats: int) -> list:
+    results = []
+    for resource_name in LIST_RESOURCES:
+        url = f"/api/v1/{resource_name}/"
+        for depth in SKIP_DEPTHS:
+            if depth + PAGE_SIZE > counts[resource_name]:
+                break
+            timings, _ = timed_requests(client, repeats, "GET", url, params={'skip': depth, 'limit': PAGE_SIZE})
+            results.append(latency_result(f"list.{resource_name}.skip={depth}", timings))
+            if depth == 0:
+                continue
+            # Та же страница курсором: курсор берется у предыдущей страницы
+            previous = client.get(url, params={'skip': depth - PAGE_SIZE, 'limit': PAGE_SIZE})
+            cursor = previous.headers.get('x-next-cursor')
+            if cursor:
+                timings, _ = timed_requests(client, repeats, "GET", url, params={'after': cursor, 'limit': PAGE_SIZE})
+                results.append(latency_result(f"list.{resource_name}.after={depth}", timings))
+    return results
+
+
+def bench_crud(client: TestClient, operations: int) -> list:
+    # Полный цикл создания, чтения, изменения и удаления отдельных клиентов
+    ids = [f"bench-c{i}" for i in range(operations)]
+    body = {'favorite_coffee_type_id': 'ct1', 'full_name': 'Клиент теста', 'phone': None, 'email': None}
+    steps = [
+        ("create", lambda client_id: client.post("/api/v1/clients/", json={'id': client_id, **body})),
+        ("read", lambda client_id: client.get(f"/api/v1/clients/{client_id}")),
+        ("update", lambda client_id: client.put(f"/api/v1/clients/{client_id}",
+                                                json={'id': client_id, **body, 'full_name': 'Клиент изменен'})),
+        ("delete", lambda client_id: client.delete(f"/api/v1/clients/{client_id}")),
+    ]
+    results = []
+    for step, request in steps:
+        timings = []
+        for client_id in ids:
+            started = time.perf_counter()
+            response = request(client_id)
+            timings.append(time.perf_counter() - started)
+            response.raise_for_status()
+        results.append(latency_result(f"crud.clients.{step}", timings,
+                                      ops_per_second=round(len(timings) / sum(timings), 1)))
+    return results
+
+
+def employees_csv(rows: int, counts: dict) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['id', 'department_id', 'full_name', 'position', 'workplace_id', 'hire_date', 'phone', 'email'])
+    for i in range(rows):
+        writer.writerow([f'etl-e{i}', f'd{i % counts["departments"]}', f'Загруженный сотрудник {i}', 'Бариста',
+                         f'w{i % counts["workplaces"]}', '2024-01-15', '+7 900 000-00-00', f'etl{i}@example.com'])
+    return buffer.getvalue().encode('utf-8')
+
+
+def bench_etl(client: TestClient, counts: dict, rows: int) -> list:
+    content = employees_csv(rows, counts)
+    # Повторные запуски на сохраненной БД загружают те же строки заново
+    with database.engine.begin() as connection:
+        connection.execute(models.Employee.__table__.delete().where(models.Employee.id.like('etl-e%')))
+
+    started = time.perf_counter()
+    response = client.post("/api/v1/etl/upload-employees", files={'file': ('employees.csv', content, 'text/csv')})
+    response.raise_for_status()
+    job_id = response.json()["ID задачи"]
+    while True:
+        job = client.get(f"/api/v1/etl/jobs/{job_id}").json()
+        if job["Статус"] in ("success", "error"):
+            break
+        time.sleep(0.05)
+    seconds = time.perf_counter() - started
+    if job["Статус"] != "success":
+        raise RuntimeError(f"ETL задача завершилась с ошибкой: {job['Текст']}")
+    return [{
+        'name': 'etl.upload_employees',
+        'unit': 'ms',
+        'samples': 1,
+        'p50': round(seconds * 1000, 3),
+        'rows': rows,
+        'file_bytes': len(content),
+        'rows_per_second': round(rows / seconds, 1),
+        'added': job["Добавлено записей"],
+        'db_queries': job.get("Запросов к БД"),
+    }]
+
+
+def bench_memory(client: TestClient, counts: dict, etl_rows: int) -> list:
+    # Пик памяти Python (tracemalloc) на операцию; трассировка замедляет выполнение,
+    # поэтому выполняется отдельно от замеров времени
+    scenarios = [
+        ("memory.list.purchases.limit=1000", lambda: client.get("/api/v1/purchases/", params={'limit': 1000})),
+        ("memory.list.employees_with_details.limit=1000",
+         lambda: client.get("/api/v1/employees/with-details", params={'limit': 1000})),
+        ("memory.export.purchases.csv", lambda: client.get("/api/v1/purchases/export", params={'format': 'csv'})),
+        ("memory.etl.upload_employees", lambda: bench_etl(client, counts, etl_rows)),
+    ]
+    results = []
+    for name, scenario in scenarios:
+        tracemalloc.start()
+        try:
+            scenario()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        results.append({'name': name, 'unit': 'bytes', 'samples': 1, 'p50': peak})
+    return results
+
+
+def max_rss_bytes():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux - килобайты, macOS - байты
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path, encoding='utf-8') as file:
+        baseline = {result['name']: result for result in json.load(file)['results']}
+    regressions = []
+    print(f"\nСравнение с {baseline_path} (p50, допуск {tolerance:.0%})")
+    for result in results:
+        previous = baseline.get(result['name'])
+        if previous is None or not previous.get('p50'):
+            continue
+        ratio = result['p50'] / previous['p50']
+        mark = ""
+        if ratio > 1 + tolerance:
+            mark = "  <- ухудшение"
+            regressions.append(result['name'])
+        print(f"   {result['name']}: {previous['p50']} -> {result['p50']} {result['unit']} (x{ratio:.2f}){mark}")
+    if regressions:
+        print(f"Ухудшений: {len(regressions)}")
+    return not regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочные измерения Barista API на SQLite")
+    parser.add_argument('--rows', type=int, default=10000, help="Число закупок, заявок и клиентов (10000 - 10000000)")
+    parser.add_argument('--repeats', type=int, default=20, help="Повторов каждого запроса списка")
+    parser.add_argument('--crud-ops', type=int, default=200, help="Число записей в цикле CRUD")
+    parser.add_argument('--etl-rows', type=int, default=10000, help="Строк в файле ETL загрузки")
+    parser.add_argument('--scenarios', default="lists,crud,etl,memory",
+                        help="Сценарии через запятую: lists, crud, etl, memory")
+    parser.add_argument('--output', help="Файл результатов JSON")
+    parser.add_argument('--compare', help="Файл результатов предыдущего запуска для сравнения")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Допустимое ухудшение p50 при сравнении")
+    args = parser.parse_args()
+    scenarios = {name.strip() for name in args.scenarios.split(',') if name.strip()}
+
+    seeded = seed(args.rows)
+    counts = seeded['rows']
+    client = TestClient(app)
+
+    results = []
+    if 'lists' in scenarios:
+        results.extend(bench_lists(client, counts, args.repeats))
+    if 'crud' in scenarios:
+        results.extend(bench_crud(client, args.crud_ops))
+    if 'etl' in scenarios:
+        results.extend(bench_etl(client, counts, args.etl_rows))
+    if 'memory' in scenarios:
+        results.extend(bench_memory(client, counts, args.etl_rows))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'platform': platform.platform(),
+            'database': DB_PATH,
+            'args': vars(args),
+            'seed': seeded,
+            'max_rss_bytes': max_rss_bytes(),
+        },
+        'results': results,
+    }
+
+    for result in results:
+        extra = {key: value for key, value in result.items() if key not in ('name', 'unit', 'samples', 'p50')}
+        print(f"{result['name']}: {result['p50']} {result['unit']} {extra if extra else ''}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2, default=str)
+        print(f"\nРезультаты записаны в {args.output}")
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# Сравнение сериализации списков: ORM объекты + response_model (прежний путь)
+# и строки + TypeAdapter.dump_json (serialization.py).
+#
+# Запуск из корня репозитория:
+#   python labs_KIS/benchmarks/list_serialization.py --rows 20000 --limit 1000
+#
+# Используется временная БД SQLite, рабочая БД из .env не затрагивается
+import argparse
+import asyncio
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(BASE_DIR, 'barista_api'), BASE_DIR]
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='barista_bench_'), 'list_serialization.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import APIRoute, serialize_response  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+import crud  # noqa: E402
+import database  # noqa: E402
+import models  # noqa: E402
+from barista_api.main import app  # noqa: E402
+
+BATCH_SIZE = 5000
+
+
+def seed(rows: int):
+    start = datetime.date(2020, 1, 1)
+    tables = [
+        (models.EquipmentServiceStatus, [{'id': 'ok', 'name': 'Исправно'}]),
+        (models.CoffeeProductType, [{'id': 'ct1', 'name': 'Арабика'}]),
+        (models.Workplace, [{'id': 'w1', 'location': 'Зал', 'equipment_status_id': 'ok'}]),
+        (models.Department, [{'id': 'd1', 'name': 'Бар', 'manager_id': None}]),
+        (models.Employee, [{'id': f'e{i:06}', 'department_id': 'd1', 'full_name': f'Сотрудник {i:06}',
+                            'position': 'Бариста', 'workplace_id': 'w1', 'hire_date': start,
+                            'phone': '+7 900 000-00-00', 'email': f'user{i}@example.com'} for i in range(rows)]),
+        (models.Purchase, [{'id': f'p{i:06}', 'employee_id': f'e{i % rows:06}',
+                            'date': start + datetime.timedelta(days=i % 1500), 'supplier': f'Поставщик {i % 50}',
+                            'amount': (i % 10000) / 100, 'coffee_product_type_id': 'ct1'} for i in range(rows)]),
+    ]
+    with database.engine.begin() as connection:
+        for model, values in tables:
+            for offset in range(0, len(values), BATCH_SIZE):
+                connection.execute(insert(model.__table__), values[offset:offset + BATCH_SIZE])
+
+
+def set_fast_mode(enabled: bool):
+    # Флаг импортирован модулями маршрутов по имени
+    for module in list(sys.modules.values()):
+        if hasattr(module, 'FAST_LIST_SERIALIZATION'):
+            module.FAST_LIST_SERIALIZATION = enabled
+
+
+def timed(function, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def response_field(path: str):
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods:
+            return route.response_field
+    raise LookupError(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сериализация списков: ORM + response_model и строки + dump_json")
+    parser.add_argument('--rows', type=int, default=20000, help="Число сотрудников и закупок")
+    parser.add_argument('--limit', type=int, default=1000, help="Размер страницы")
+    parser.add_argument('--repeats', type=int, default=30, help="Повторов каждого измерения")
+    args = parser.parse_args()
+
+    database.Base.metadata.create_all(database.engine)
+    seed(args.rows)
+    client = TestClient(app)
+
+    print(f"БД: {DB_PATH}, строк: {args.rows}, страница: {args.limit}\n")
+    resources = [
+        ("employees", "/api/v1/employees/", crud.get_employees, crud.EMPLOYEE_ROWS),
+        ("purchases", "/api/v1/purchases/", crud.get_purchases, crud.PURCHASE_ROWS),
+    ]
+    for name, path, list_items, rows in resources:
+        field = response_field(path)
+        db = database.SessionLocal()
+        try:
+            objects = list_items(db, limit=args.limit)
+            row_page = crud.get_rows(db, rows, limit=args.limit)
+
+            def orm_serialization():
+                content = asyncio.run(serialize_response(field=field, response_content=objects))
+                return JSONResponse(content).body
+
+            def row_serialization():
+                return rows.dump_json(row_page)
+
+            assert orm_serialization() == row_serialization()
+            orm_time = timed(orm_serialization, args.repeats)
+            row_time = timed(row_serialization, args.repeats)
+            print(f"== {name}: сериализация {args.limit} записей")
+            print(f"   ORM + response_model: {orm_time * 1000:.2f} мс")
+            print(f"   строки + dump_json:   {row_time * 1000:.2f} мс (x{orm_time / row_time:.1f})")
+
+            def request():
+                response = client.get(path, params={'limit': args.limit})
+                response.raise_for_status()
+
+            set_fast_mode(False)
+            orm_request = timed(request, args.repeats)
+            set_fast_mode(True)
+            fast_request = timed(request, args.repeats)
+            print(f"== {name}: GET ?limit={args.limit} целиком (запрос к БД, сериализация, HTTP)")
+            print(f"   ORM + response_model: {orm_request * 1000:.2f} мс")
+            print(f"   строки + dump_json:   {fast_request * 1000:.2f} мс (x{orm_request / fast_request:.1f})\n")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
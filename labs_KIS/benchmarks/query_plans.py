@@ -0,0 +1,158 @@
+# Планы и время запросов списков до и после создания индексов из models.py.
+#
+# Запуск из корня репозитория:
+#   python labs_KIS/benchmarks/query_plans.py --rows 100000
+#
+# Используется временная БД SQLite (EXPLAIN QUERY PLAN), рабочая БД из .env
+# не затрагивается. Запросы формируются теми же функциями crud, что и в API.
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(BASE_DIR, 'barista_api'), BASE_DIR]
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='barista_bench_'), 'query_plans.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+
+from sqlalchemy import event, insert, text  # noqa: E402
+
+import crud  # noqa: E402
+import database  # noqa: E402
+import migrations  # noqa: E402
+import models  # noqa: E402
+from filters import RESOURCE_FILTERS  # noqa: E402
+
+BATCH_SIZE = 5000
+
+
+def seed(rows: int):
+    rnd = random.Random(42)
+    employees = max(rows // 20, 10)
+    workplaces = max(employees // 4, 5)
+    departments = 20
+    start = datetime.date(2020, 1, 1)
+
+    tables = [
+        (models.EquipmentServiceStatus, [{'id': f'st{i}', 'name': f'Статус {i}'} for i in range(5)]),
+        (models.CoffeeProductType, [{'id': f'ct{i}', 'name': f'Кофе {i}'} for i in range(10)]),
+        (models.Workplace, [{'id': f'w{i}', 'location': f'Зал {rnd.randrange(1000)}',
+                             'equipment_status_id': f'st{i % 5}'} for i in range(workplaces)]),
+        (models.Department, [{'id': f'd{i}', 'name': f'Отдел {i}', 'manager_id': None} for i in range(departments)]),
+        (models.Employee, [{'id': f'e{i}', 'department_id': f'd{i % departments}',
+                            'full_name': f'Сотрудник {rnd.randrange(10 ** 6):06}', 'position': 'Бариста',
+                            'workplace_id': f'w{i % workplaces}',
+                            'hire_date': start + datetime.timedelta(days=rnd.randrange(1500))}
+                           for i in range(employees)]),
+        (models.Client, [{'id': f'c{i}', 'favorite_coffee_type_id': f'ct{i % 10}',
+                          'full_name': f'Клиент {rnd.randrange(10 ** 6):06}'} for i in range(rows)]),
+        (models.Purchase, [{'id': f'p{i}', 'employee_id': f'e{rnd.randrange(employees)}',
+                            'date': start + datetime.timedelta(days=rnd.randrange(1500)),
+                            'supplier': f'Поставщик {rnd.randrange(50)}', 'amount': rnd.randrange(100, 10000),
+                            'coffee_product_type_id': f'ct{rnd.randrange(10)}'} for i in range(rows)]),
+        (models.ServiceRequest, [{'id': f'sr{i}', 'employee_id': f'e{rnd.randrange(employees)}',
+                                  'request_date': start + datetime.timedelta(days=rnd.randrange(1500)),
+                                  'description': 'Заявка', 'workplace_id': f'w{rnd.randrange(workplaces)}',
+                                  'status_id': f'st{rnd.randrange(5)}'} for i in range(rows)]),
+    ]
+    with database.engine.begin() as connection:
+        for model, values in tables:
+            for offset in range(0, len(values), BATCH_SIZE):
+                connection.execute(insert(model.__table__), values[offset:offset + BATCH_SIZE])
+        connection.execute(text("ANALYZE"))
+
+
+def drop_declared_indexes():
+    for table in database.Base.metadata.tables.values():
+        for index in table.indexes:
+            index.drop(database.engine, checkfirst=True)
+
+
+def list_query(resource: str, **values):
+    return RESOURCE_FILTERS[resource].build(values)
+
+
+SCENARIOS = [
+    ("Сотрудники, первая страница", lambda db: crud.get_employees(db, limit=100)),
+    ("Сотрудники отдела", lambda db: crud.get_employees(db, limit=100, list_query=list_query(
+        'employees', department_id='d3'))),
+    ("Сотрудники с подробностями (JOIN)", lambda db: crud.get_employees_with_details(db, limit=100)),
+    ("Клиенты, первая страница", lambda db: crud.get_clients(db, limit=100)),
+    ("Закупки, первая страница", lambda db: crud.get_purchases(db, limit=100)),
+    ("Закупки, вторая страница (курсор)", lambda db: crud.get_purchases(
+        db, limit=100, after=crud.get_purchases(db, limit=100).next_cursor)),
+    ("Закупки сотрудника", lambda db: crud.get_purchases(db, limit=100, list_query=list_query(
+        'purchases', employee_id='e7'))),
+    ("Закупки по типу кофе за месяц", lambda db: crud.get_purchases(db, limit=100, list_query=list_query(
+        'purchases', coffee_product_type_id='ct2', date__gte=datetime.date(2022, 3, 1),
+        date__lte=datetime.date(2022, 3, 31)))),
+    ("Заявки, первая страница", lambda db: crud.get_service_requests(db, limit=100)),
+    ("Заявки по статусу", lambda db: crud.get_service_requests(db, limit=100, list_query=list_query(
+        'service_requests', status_id='st1'))),
+    ("Заявки рабочего места", lambda db: crud.get_service_requests(db, limit=100, list_query=list_query(
+        'service_requests', workplace_id='w3'))),
+]
+
+
+def measure(repeats: int):
+    # Последний выполненный сценарием SELECT разбирается через EXPLAIN QUERY PLAN
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(database.engine, "before_cursor_execute", capture)
+    results = {}
+    try:
+        for name, scenario in SCENARIOS:
+            db = database.SessionLocal()
+            try:
+                scenario(db)
+                statement, parameters = statements[-1]
+                timings = []
+                for _ in range(repeats):
+                    db.expunge_all()
+                    started = time.perf_counter()
+                    scenario(db)
+                    timings.append(time.perf_counter() - started)
+                plan = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+                results[name] = (sorted(timings)[len(timings) // 2], [row[-1] for row in plan])
+            finally:
+                db.close()
+    finally:
+        event.remove(database.engine, "before_cursor_execute", capture)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Планы запросов списков до и после создания индексов")
+    parser.add_argument('--rows', type=int, default=50000, help="Число закупок, заявок и клиентов")
+    parser.add_argument('--repeats', type=int, default=20, help="Повторов каждого запроса")
+    args = parser.parse_args()
+
+    database.Base.metadata.create_all(database.engine)
+    drop_declared_indexes()
+    seed(args.rows)
+
+    before = measure(args.repeats)
+    created = migrations.create_missing_indexes(database.engine)
+    with database.engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    after = measure(args.repeats)
+
+    print(f"БД: {DB_PATH}, строк: {args.rows}, создано индексов: {len(created)}\n")
+    for name, _ in SCENARIOS:
+        before_time, before_plan = before[name]
+        after_time, after_plan = after[name]
+        print(f"== {name}: {before_time * 1000:.2f} мс -> {after_time * 1000:.2f} мс "
+              f"(x{before_time / after_time:.1f})")
+        print("   до:    " + "; ".join(before_plan))
+        print("   после: " + "; ".join(after_plan))
+
+
+if __name__ == "__main__":
+    main()